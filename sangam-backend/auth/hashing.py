@@ -0,0 +1,124 @@
+# auth/hashing.py
+"""
+Password hashing off the event loop.
+
+bcrypt is deliberately slow (~100-300ms per call). Running it in FastAPI's
+default threadpool lets a burst of logins starve every other sync route, so
+hashing and verification run on a small dedicated process pool instead.
+
+Admission control: at most HASH_POOL_SIZE jobs run and HASH_MAX_QUEUE more
+may wait. Anything beyond that is rejected straight away with a 503 and a
+Retry-After header instead of piling up.
+
+Cost changes: min/max rounds are pinned to BCRYPT_ROUNDS, so hashes made
+with a different cost are flagged on verify and transparently rehashed.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_POOL_SIZE = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight = 0  # running + queued jobs; only touched from the event loop
+
+
+# ----------------------------------------------------------------------------
+# Worker functions (run inside the pool processes, so they must be top-level)
+# ----------------------------------------------------------------------------
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+# ----------------------------------------------------------------------------
+# Pool management
+# ----------------------------------------------------------------------------
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # "spawn" so workers don't inherit the server's threads or DB connections
+        _pool = ProcessPoolExecutor(
+            max_workers=HASH_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    """Stops the worker processes (called on app shutdown)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run(fn, *args):
+    global _in_flight
+    if _in_flight >= HASH_POOL_SIZE + HASH_MAX_QUEUE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry shortly",
+            headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+        )
+    _in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool for the next call
+        shutdown_pool()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password service restarting, please retry shortly",
+            headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+        )
+    finally:
+        _in_flight -= 1
+
+
+# ----------------------------------------------------------------------------
+# Public API
+# ----------------------------------------------------------------------------
+
+async def hash_password(password: str) -> str:
+    """Hashes a password on the worker pool"""
+    return await _run(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the worker pool.
+
+    Returns (is_valid, new_hash). new_hash is set when the stored hash was
+    made with a different bcrypt cost and should be saved in its place.
+    """
+    return await _run(_verify_and_update, password, hashed_password)
+
+
+def queue_depth() -> int:
+    """Number of hashing jobs currently running or waiting"""
+    return _in_flight
@@ -1,37 +1,69 @@
 # auth/routes.py
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from auth.utils import get_current_user
 
 from models import User
-from auth import schemas, utils
+from auth import schemas, utils, hashing, sessions
 
 router = APIRouter(tags=["auth"])
 
+
+async def _get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
 @router.get("/users/me")
 def read_users_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
 @router.post("/signup", response_model=schemas.UserOut)
-def signup(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.username == user_in.username).first()
+async def signup(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await _get_user_by_username(db, user_in.username)
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
-    hashed = utils.get_password_hash(user_in.password)
+    # bcrypt runs on the hashing pool, not in this process
+    hashed = await hashing.hash_password(user_in.password)
     user = User(username=user_in.username, hashed_password=hashed)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    utils.invalidate_principal(user_id=user.id, username=user.username)
     return user
 
 @router.post("/login", response_model=schemas.Token)
-def login(req: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == req.username).first()
+async def login(req: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await _get_user_by_username(db, req.username)
     if not user:
         raise HTTPException(status_code=401, detail="Email not registered!")
-    if not utils.verify_password(req.password, user.hashed_password):
+    is_valid, new_hash = await hashing.verify_password(req.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Wrong Password!")
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made - store the upgraded one
+        user.hashed_password = new_hash
+        await db.commit()
+
+    return await db.run_sync(sessions.issue_tokens, user.id, user.username)
+
+@router.post("/token/refresh", response_model=schemas.Token)
+async def refresh_token(req: schemas.RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    POST /token/refresh - Exchange a refresh token for a new token pair
+
+    The old refresh token stops working (rotation). No password check is
+    done, so this is much cheaper than logging in again.
+    """
+    return await db.run_sync(sessions.rotate, req.refresh_token)
 
-    token = utils.create_access_token(subject=user.username)
-    return {"access_token": token, "token_type": "bearer"}
+@router.post("/token/revoke", status_code=204)
+async def revoke_token(req: schemas.RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    POST /token/revoke - Log out: revokes the refresh token and every
+    access token issued from the same login
+    """
+    await db.run_sync(sessions.revoke, req.refresh_token)
+    return None
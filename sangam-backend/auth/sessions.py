@@ -0,0 +1,192 @@
+# auth/sessions.py
+"""
+Refresh-token sessions.
+
+/login creates a session and hands out an access token plus a refresh
+token. When the access token expires the client calls /token/refresh
+instead of logging in again, which costs one indexed lookup and one HMAC
+rather than a bcrypt verify.
+
+Refresh tokens are rotated on every use. Presenting an already-rotated
+token means it was copied somewhere, so the whole login (family) is revoked.
+The rotation claims the old session with one conditional UPDATE, so of two
+concurrent refreshes with the same token only one gets a new token - the
+other counts as a replay.
+
+Revoked sessions are checked against an in-memory set (auth/utils.py).
+With several API workers each worker has its own set, so every worker
+polls the sessions table for recent revocations every
+REVOCATION_SYNC_SECONDS (watch_revocations()). A logout or replay
+revocation therefore reaches the other workers within that interval.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from db import AsyncSessionLocal
+from models import User, UserSession
+from auth import utils
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# How far back each poll looks - well past the interval, so a revocation
+# committed a little after its revoked_at timestamp is still picked up
+REVOCATION_SYNC_WINDOW_SECONDS = REVOCATION_SYNC_SECONDS * 2 + 60
+
+logger = logging.getLogger("sangam.auth")
+
+invalid_refresh_token = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Invalid or expired refresh token",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def _hash_secret(secret: str) -> str:
+    return hmac.new(utils.SECRET_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+def _split_token(refresh_token: str) -> Tuple[int, str]:
+    session_id, _, secret = refresh_token.partition(".")
+    if not session_id.isdigit() or not secret:
+        raise invalid_refresh_token
+    return int(session_id), secret
+
+
+def create_session(db: Session, user_id: int, family_id: Optional[int] = None) -> Tuple[UserSession, str]:
+    """
+    Adds a new session row and returns it with its refresh token.
+    The caller commits.
+    """
+    secret = secrets.token_urlsafe(32)
+    session = UserSession(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=_hash_secret(secret),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(session)
+    db.flush()  # Get the session ID
+    if family_id is None:
+        session.family_id = session.id
+    return session, f"{session.id}.{secret}"
+
+
+def issue_tokens(db: Session, user_id: int, username: str, family_id: Optional[int] = None) -> dict:
+    """Creates a session and returns the token response body (commits)"""
+    session, refresh_token = create_session(db, user_id, family_id)
+    db.commit()
+    return {
+        "access_token": utils.create_access_token(subject=username, user_id=user_id, session_id=session.id),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": utils.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def _load(db: Session, refresh_token: str) -> Tuple[UserSession, str]:
+    session_id, secret = _split_token(refresh_token)
+    # One primary-key lookup, joined to get the username for the new token
+    row = db.query(UserSession, User.username).join(User, User.id == UserSession.user_id).filter(
+        UserSession.id == session_id
+    ).first()
+    if not row or not hmac.compare_digest(row[0].token_hash, _hash_secret(secret)):
+        raise invalid_refresh_token
+    return row
+
+
+def revoke_family(db: Session, family_id: int):
+    """Revokes every session of one login (caller commits)"""
+    now = datetime.utcnow()
+    sessions = db.query(UserSession).filter(
+        UserSession.family_id == family_id,
+        UserSession.revoked_at.is_(None)
+    ).all()
+    for session in sessions:
+        session.revoked_at = now
+    utils.mark_sessions_revoked(s.id for s in sessions)
+
+
+def _replayed(db: Session, session: UserSession):
+    """The token was already rotated - someone is replaying it"""
+    revoke_family(db, session.family_id)
+    db.commit()
+    raise invalid_refresh_token
+
+
+def rotate(db: Session, refresh_token: str) -> dict:
+    """Exchanges a refresh token for a new access + refresh token pair"""
+    session, username = _load(db, refresh_token)
+
+    if session.replaced_by_id is not None:
+        _replayed(db, session)
+    if session.revoked_at is not None or session.expires_at <= datetime.utcnow():
+        raise invalid_refresh_token
+
+    new_session, new_refresh_token = create_session(db, session.user_id, session.family_id)
+    # The check above can race with a concurrent refresh of the same token;
+    # only one UPDATE matches the unclaimed row
+    claimed = db.execute(
+        update(UserSession)
+        .where(UserSession.id == session.id, UserSession.replaced_by_id.is_(None), UserSession.revoked_at.is_(None))
+        .values(replaced_by_id=new_session.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.rollback()  # drops the new session
+        _replayed(db, session)
+    db.commit()
+
+    return {
+        "access_token": utils.create_access_token(subject=username, user_id=session.user_id, session_id=new_session.id),
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer",
+        "expires_in": utils.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def revoke(db: Session, refresh_token: str):
+    """Logs out the login the refresh token belongs to"""
+    session, _ = _load(db, refresh_token)
+    revoke_family(db, session.family_id)
+    db.commit()
+
+
+def load_revoked_sessions(db: Session):
+    """
+    Fills the in-memory revoked set on startup. Only sessions revoked within
+    the access token lifetime matter - older access tokens are expired anyway.
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=utils.ACCESS_TOKEN_EXPIRE_MINUTES)
+    rows = db.query(UserSession.id).filter(UserSession.revoked_at >= cutoff).all()
+    utils.mark_sessions_revoked(row.id for row in rows)
+
+
+
+def sync_revoked_sessions(db: Session) -> int:
+    """Adds sessions revoked recently (by any worker) to the in-memory set"""
+    cutoff = datetime.utcnow() - timedelta(seconds=REVOCATION_SYNC_WINDOW_SECONDS)
+    rows = db.query(UserSession.id).filter(UserSession.revoked_at >= cutoff).all()
+    utils.mark_sessions_revoked(row.id for row in rows)
+    return len(rows)
+
+
+async def watch_revocations():
+    """Runs sync_revoked_sessions() every REVOCATION_SYNC_SECONDS (started on startup)"""
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(sync_revoked_sessions)
+        except Exception:
+            logger.exception("Could not load revoked sessions")
@@ -1,30 +1,65 @@
 # auth/utils.py
-from passlib.context import CryptContext
-from jose import jwt
-from datetime import datetime, timedelta
 import os
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, HTTPBearer
+from fastapi.security import HTTPBearer
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from db import get_async_db
+from models import User
+from auth.cache import TTLCache
 
 # IMPORTANT: replace with a strong secret or load from env in production
 SECRET_KEY = os.getenv("SANGAM_SECRET_KEY", "sangam-key-for-version-v0")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# Resolved users are cached so authenticated routes don't have to look up
+# the user row on every request. Entries are dropped on signup/deletion.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+_principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Verified token claims, keyed by a digest of the raw token. An entry lives
+# until the token's own "exp", so a cached token is never accepted past expiry.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "8192"))
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# Ids of revoked refresh sessions. Access tokens carry their session id, so
+# checking revocation is a single set lookup. An id only needs to be kept
+# until every access token issued under it has expired. Each worker process
+# has its own set; revocations made by other workers arrive through
+# sessions.watch_revocations() within REVOCATION_SYNC_SECONDS.
+_revoked_sessions = {}  # session id -> monotonic time after which it can be forgotten
+_revoked_lock = threading.Lock()
+
+
+# Usernames allowed to use admin endpoints (comma-separated)
+ADMIN_USERS = {name.strip() for name in os.getenv("SANGAM_ADMIN_USERS", "").split(",") if name.strip()}
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
-def create_access_token(subject: str, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight view of the authenticated user (no ORM session attached)"""
+    id: int
+    username: str
+
+
+def create_access_token(subject: str, user_id: Optional[int] = None, session_id: Optional[int] = None, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
     to_encode = {"sub": subject, "exp": expire}
+    if user_id is not None:
+        # Carrying the id lets get_current_principal skip the username lookup
+        to_encode["uid"] = user_id
+    if session_id is not None:
+        to_encode["sid"] = session_id
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -45,13 +80,120 @@ def get_current_user(token = Depends(bearer_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    # HTTPBearer wraps the token, so we access it via .credentials
+    claims = claims_from_token(token.credentials)
+    if claims is None:
+        raise credentials_exception
+    return claims
+
+
+def claims_from_token(token_string: str) -> Optional[dict]:
+    """
+    Verified claims of an access token, or None if it is invalid, expired
+    or revoked. Also used outside dependencies (e.g. by middleware).
+    """
+    # Hot tokens skip the decode + HMAC check entirely
+    token_digest = hashlib.sha256(token_string.encode()).digest()
+    claims = _token_cache.get(token_digest)
+    if claims is not None:
+        return None if is_session_revoked(claims["session_id"]) else claims
+
     try:
-        # HTTPBearer wraps the token, so we access it via .credentials
-        token_string = token.credentials
         payload = jwt.decode(token_string, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return {"username": username}
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        return None
+
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+
+    claims = {"username": username, "user_id": payload.get("uid"), "session_id": payload.get("sid")}
+    if is_session_revoked(claims["session_id"]):
+        return None
+    ttl = payload["exp"] - time.time()
+    if ttl > 0:
+        _token_cache.set(token_digest, claims, ttl=ttl)
+    return claims
+
+
+def is_session_revoked(session_id: Optional[int]) -> bool:
+    return session_id is not None and session_id in _revoked_sessions
+
+
+def mark_sessions_revoked(session_ids):
+    """Adds session ids to the in-memory revoked set"""
+    now = time.monotonic()
+    forget_after = now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    with _revoked_lock:
+        for session_id in session_ids:
+            _revoked_sessions[session_id] = forget_after
+        # Drop ids whose access tokens have all expired by now
+        for session_id in [sid for sid, t in _revoked_sessions.items() if t <= now]:
+            del _revoked_sessions[session_id]
+
+
+def token_cache_stats() -> dict:
+    """Hit/miss counters for the verified-token cache"""
+    return _token_cache.stats()
+
+
+async def get_current_principal(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Resolves the token to a Principal (id + username).
+
+    Tokens issued by /login carry the user id, so on a cache hit no query is
+    made at all. On a miss we load the user once and cache the result.
+    Older tokens without an id fall back to a lookup by username.
+    """
+    username = current_user["username"]
+    user_id = current_user.get("user_id")
+
+    cache_key = user_id if user_id is not None else ("username", username)
+    principal = _principal_cache.get(cache_key)
+
+    if principal is None:
+        if user_id is not None:
+            user = await db.get(User, user_id)
+        else:
+            result = await db.execute(select(User).where(User.username == username))
+            user = result.scalars().first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        principal = Principal(id=user.id, username=user.username)
+        _principal_cache.set(cache_key, principal)
+
+    # SQLite can reuse the id of a deleted user, so the name must still match
+    if principal.username != username:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+async def get_current_admin(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    """Like get_current_principal, but only for users listed in SANGAM_ADMIN_USERS"""
+    if current_user.username not in ADMIN_USERS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+def is_admin(claims: Optional[dict]) -> bool:
+    return claims is not None and claims["username"] in ADMIN_USERS
+
+
+def invalidate_principal(user_id: Optional[int] = None, username: Optional[str] = None):
+    """Drops cached principals for a user (called on signup and deletion)"""
+    if user_id is not None:
+        _principal_cache.pop(user_id)
+    if username is not None:
+        _principal_cache.pop(("username", username))
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    invalidate_principal(user_id=target.id, username=target.username)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Async vs Sync Route Benchmark - concurrency ceiling
+
+Fires many concurrent requests at two identical endpoints: a sync `def`
+route using a sync Session, and an `async def` route using an AsyncSession.
+Each request runs a query that takes --query-ms on the database side.
+
+Sync routes can't run more requests at once than FastAPI's threadpool has
+threads (40 by default). Async routes are only limited by the connection
+pool, so their peak in-flight count goes up to the pool size. Throughput
+then depends on how much concurrency the database itself can absorb.
+
+Requires httpx (already needed by FastAPI's TestClient).
+
+Usage:
+    python benchmarks/bench_async_concurrency.py [--requests 400] [--query-ms 20] [--pool 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+
+def build_app(query_ms: int, pool: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    options = {"pool_size": pool, "max_overflow": 0, "connect_args": {"check_same_thread": False}}
+    sync_engine = create_engine(f"sqlite:///{path}", **options)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **options)
+
+    def _sleep_ms(ms):
+        time.sleep(ms / 1000)
+        return ms
+
+    # A SQL function that stands in for a slow query
+    for target in (sync_engine, async_engine.sync_engine):
+        @event.listens_for(target, "connect")
+        def _register(dbapi_connection, connection_record):
+            dbapi_connection.create_function("sleep_ms", 1, _sleep_ms)
+
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine)
+    query = text("SELECT sleep_ms(:ms)")
+
+    stats = {"in_flight": 0, "peak": 0}
+
+    def enter():
+        stats["in_flight"] += 1
+        stats["peak"] = max(stats["peak"], stats["in_flight"])
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_route():
+        enter()
+        try:
+            with SyncSession() as db:
+                db.execute(query, {"ms": query_ms})
+        finally:
+            stats["in_flight"] -= 1
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_route():
+        enter()
+        try:
+            async with AsyncSession() as db:
+                await db.execute(query, {"ms": query_ms})
+        finally:
+            stats["in_flight"] -= 1
+        return {"ok": True}
+
+    return app, stats, sync_engine, async_engine
+
+
+async def run(path: str, requests: int, query_ms: int, pool: int):
+    app, stats, sync_engine, async_engine = build_app(query_ms, pool)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)  # warm up the pool
+        stats["peak"] = 0
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+    ok = sum(1 for r in responses if r.status_code == 200)
+    print(f"{path:<7} ok={ok:<5} time={elapsed:6.2f}s  req/sec={ok / elapsed:7.1f}  "
+          f"peak concurrent handlers={stats['peak']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--query-ms", type=int, default=20)
+    parser.add_argument("--pool", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.requests} concurrent requests, {args.query_ms}ms per query, pool size {args.pool}")
+    for path in ("/sync", "/async"):
+        asyncio.run(run(path, args.requests, args.query_ms, args.pool))
+
+
+if __name__ == "__main__":
+    main()
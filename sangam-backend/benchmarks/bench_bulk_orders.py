@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Bulk Orders Benchmark - POST /orders/bulk vs one request per order
+
+Runs against the real app on a fresh temporary SQLite file:
+1. creates N orders one POST /orders/ at a time, then N more in bulk batches
+2. marks N orders Shipped one PUT at a time, then the same in bulk
+3. deletes N orders one DELETE at a time, then the same in bulk
+
+Single-item routes commit (and fsync) once per order; the bulk route once
+per batch with a handful of set-based statements. The analytics rollups
+are checked for drift at the end.
+
+Requires httpx (already needed by FastAPI's TestClient).
+
+Usage:
+    python benchmarks/bench_bulk_orders.py [--orders 500] [--batch 250]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Fresh database and cheap password hashing - must be set before the app is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bulk.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+ORDER = {
+    "customer_name": "Bench Customer",
+    "product": "Lamp",
+    "category": "Home Decor",
+    "amount": 25.0,
+    "payment_method": "COD",
+    "payment_status": "Paid",
+    "delivery_status": "Pending",
+    "source": "Website",
+}
+
+
+def report(label: str, count: int, elapsed: float):
+    print(f"  {label:<28} {count:>6} orders  {elapsed:7.2f}s  {count / elapsed:9.1f} orders/sec")
+
+
+async def run(n: int, batch: int):
+    import migrations
+    from auth import hashing
+    from db import engine, dispose_engines, SessionLocal
+    from main import app
+    from orders import analytics
+
+    migrations.upgrade(engine)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            await client.post("/signup", json={"username": "bulk@example.com", "password": "bench-password"})
+            response = await client.post("/login", json={"username": "bulk@example.com", "password": "bench-password"})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            async def bulk(body: dict) -> dict:
+                response = await client.post("/orders/bulk", json=body, headers=headers)
+                assert response.status_code == 200, response.text
+                return response.json()
+
+            print("Create")
+            start = time.perf_counter()
+            single_ids = []
+            for _ in range(n):
+                single_ids.append((await client.post("/orders/", json=ORDER, headers=headers)).json()["id"])
+            report("single POST /orders/", n, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            bulk_ids = []
+            for offset in range(0, n, batch):
+                result = await bulk({"create": [ORDER] * min(batch, n - offset)})
+                bulk_ids += [item["id"] for item in result["created"]]
+            report(f"bulk (batches of {batch})", n, time.perf_counter() - start)
+
+            print("Mark Shipped")
+            start = time.perf_counter()
+            for order_id in single_ids:
+                await client.put(f"/orders/{order_id}", json={"delivery_status": "Shipped"}, headers=headers)
+            report("single PUT /orders/{id}", n, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, n, batch):
+                ids = bulk_ids[offset:offset + batch]
+                await bulk({"update": [{"id": i, "delivery_status": "Shipped"} for i in ids]})
+            report(f"bulk (batches of {batch})", n, time.perf_counter() - start)
+
+            print("Delete")
+            start = time.perf_counter()
+            for order_id in single_ids:
+                await client.delete(f"/orders/{order_id}", headers=headers)
+            report("single DELETE /orders/{id}", n, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, n, batch):
+                await bulk({"delete": bulk_ids[offset:offset + batch]})
+            report(f"bulk (batches of {batch})", n, time.perf_counter() - start)
+    finally:
+        hashing.shutdown_pool()
+        await dispose_engines()
+
+    with SessionLocal() as db:
+        print(f"Analytics rollup drift: {len(analytics.drift(db))} row(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=250)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders, args.batch))
+
+
+if __name__ == "__main__":
+    main()
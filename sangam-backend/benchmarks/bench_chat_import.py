@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Chat Import Benchmark - POST /chats/import vs POST /chats/create-with-messages
+
+Writes an NDJSON file of N chats with M messages each (every 1000th line
+invalid), uploads it to the real app on a fresh temporary SQLite file and
+polls GET /imports/{id} until the job ends. Reports the import rate in
+chats/sec and messages/sec, and the process's peak RSS before and after.
+
+For comparison, --baseline chats of the same size are then created one
+request at a time through POST /chats/create-with-messages (ORM objects,
+unit-of-work flush). The chat counters are checked for drift at the end.
+
+Requires httpx (already needed by FastAPI's TestClient).
+
+Usage:
+    python benchmarks/bench_chat_import.py [--chats 20000] [--messages 50] [--baseline 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Fresh database and cheap password hashing - must be set before the app is imported
+_workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'chats.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+PLATFORMS = ["WhatsApp", "Facebook", "Instagram"]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def chat(n: int, messages: int, with_times: bool = True) -> dict:
+    start = datetime(2024, 1, 1) + timedelta(hours=n)
+    return {
+        "customer_name": f"Customer {n}",
+        "platform": PLATFORMS[n % 3],
+        "status": "unread" if n % 2 else "read",
+        "messages": [
+            {
+                "text": f"Message {i} - is the handmade lamp still available in blue?",
+                "sender": "them" if i % 3 else "me",
+                **({"created_at": (start + timedelta(minutes=i)).isoformat()} if with_times else {}),
+            }
+            for i in range(messages)
+        ],
+    }
+
+
+def write_ndjson(path: str, chats: int, messages: int):
+    with open(path, "w", encoding="utf-8") as file:
+        for n in range(chats):
+            if n % 1000 == 999:
+                file.write('{"platform": "WhatsApp"}\n')  # no customer_name - rejected
+            else:
+                file.write(json.dumps(chat(n, messages)) + "\n")
+
+
+async def file_chunks(path: str, size: int = 64 * 1024):
+    """The file as a streamed request body (AsyncClient needs an async iterator)"""
+    with open(path, "rb") as file:
+        while chunk := file.read(size):
+            yield chunk
+
+
+async def run(chats: int, messages: int, baseline: int):
+    import migrations
+    from auth import hashing
+    from chats import counters
+    from db import engine, dispose_engines, SessionLocal
+    from imports import jobs
+    from main import app
+
+    path = os.path.join(_workdir, "chats.ndjson")
+    start = time.perf_counter()
+    write_ndjson(path, chats, messages)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"Wrote {chats} chats x {messages} messages ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    migrations.upgrade(engine)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            await client.post("/signup", json={"username": "chats@example.com", "password": "bench-password"})
+            response = await client.post("/login", json={"username": "chats@example.com", "password": "bench-password"})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            rss_before = peak_rss_mb()
+            start = time.perf_counter()
+            response = await client.post(
+                "/chats/import?filename=chats.ndjson",
+                content=file_chunks(path),
+                headers={**headers, "Content-Type": "application/x-ndjson"},
+            )
+            assert response.status_code == 202, response.text
+            job = response.json()
+            print(f"Upload (spooled to disk): {time.perf_counter() - start:.2f}s")
+
+            start = time.perf_counter()
+            while job["status"] not in ("completed", "failed"):
+                await asyncio.sleep(0.5)
+                job = (await client.get(f"/imports/{job['id']}", headers=headers)).json()
+                progress = job["bytes_processed"] / job["bytes_total"] * 100
+                print(f"  {progress:5.1f}%  {job['rows_processed']:>9} chats", end="\r")
+            elapsed = time.perf_counter() - start
+
+            imported_messages = job["rows_inserted"] * messages
+            print(f"\nJob {job['status']}: {job['rows_inserted']} chats inserted, {job['rows_failed']} rejected "
+                  f"in {elapsed:.1f}s")
+            print(f"  /chats/import:               {job['rows_inserted'] / elapsed:9,.0f} chats/sec  "
+                  f"{imported_messages / elapsed:11,.0f} messages/sec")
+            if job["error"]:
+                print(f"  error: {job['error']}")
+            print(f"Peak RSS: {rss_before:.0f} MB before the upload, {peak_rss_mb():.0f} MB after")
+
+            if baseline:
+                start = time.perf_counter()
+                for n in range(baseline):
+                    body = chat(chats + n, messages, with_times=False)  # the endpoint sets the times
+                    response = await client.post("/chats/create-with-messages", json=body, headers=headers)
+                    assert response.status_code == 201, response.text
+                elapsed = time.perf_counter() - start
+                print(f"  /chats/create-with-messages: {baseline / elapsed:9,.0f} chats/sec  "
+                      f"{baseline * messages / elapsed:11,.0f} messages/sec  ({baseline} chats, one per request)")
+    finally:
+        hashing.shutdown_pool()
+        jobs.shutdown_pool()
+        await dispose_engines()
+
+    with SessionLocal() as db:
+        chat_drift, unread_drift = counters.drift(db)
+        print(f"Chat counter drift: {len(chat_drift)} chat(s), {len(unread_drift)} unread counter(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=20_000)
+    parser.add_argument("--messages", type=int, default=50, help="messages per chat")
+    parser.add_argument("--baseline", type=int, default=200, help="chats created through create-with-messages (0 = skip)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="IMPORT_CHUNK_SIZE (messages + chats per insert)")
+    args = parser.parse_args()
+    if args.chunk_size:
+        # Read when imports.jobs is imported (inside run)
+        os.environ["IMPORT_CHUNK_SIZE"] = str(args.chunk_size)
+    asyncio.run(run(args.chats, args.messages, args.baseline))
+
+
+if __name__ == "__main__":
+    main()
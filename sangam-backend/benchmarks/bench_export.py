@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Export Benchmark - streaming export vs loading the full list
+
+Seeds a temporary SQLite database with orders, then for growing row counts
+compares
+- stream: exports.encode() (yield_per chunks, what /orders/export does)
+- list:   loading every Order and its OrderResponse model at once (what
+          exporting through GET /orders/?all=true costs)
+
+and reports time to first byte, total time and peak Python memory
+(tracemalloc). The streaming peak should stay flat as rows grow.
+
+Usage:
+    python benchmarks/bench_export.py [--rows 10000 50000 100000] [--format csv]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'export.db')}"
+os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def seed(total: int):
+    """Inserts orders for user 1 until it has total rows"""
+    from sqlalchemy import func, insert, select
+    from db import engine
+    from models import Order, User
+
+    with engine.begin() as connection:
+        if connection.execute(select(func.count()).select_from(User)).scalar() == 0:
+            connection.execute(insert(User), [{"id": 1, "username": "export@example.com", "hashed_password": "x"}])
+        existing = connection.execute(select(func.count()).select_from(Order)).scalar()
+        start = datetime(2024, 1, 1)
+        rows = [
+            {
+                "user_id": 1, "order_id": f"ORD-{n:06d}", "customer_name": f"Customer {n % 500}",
+                "customer_contact": "+1 555 0100", "product": "Handmade lamp", "category": "Home Decor",
+                "amount": 10 + n % 90, "payment_method": "COD", "payment_status": "Paid",
+                "delivery_status": "Pending", "source": "Instagram", "process_status": "production",
+                "order_date": start + timedelta(minutes=n), "note": "Gift wrap please",
+            }
+            for n in range(existing + 1, total + 1)
+        ]
+        if rows:
+            connection.execute(insert(Order), rows)
+
+
+async def measure_stream(fmt: str):
+    from sqlalchemy import select
+    import exports
+    from models import Order
+    from orders.routes import EXPORT_COLUMNS
+
+    table = Order.__table__
+    statement = select(*(table.c[c] for c in EXPORT_COLUMNS)).where(table.c.user_id == 1).order_by(table.c.order_date, table.c.id)
+    start = time.perf_counter()
+    first = None
+    size = 0
+    async for chunk in exports.encode(statement, EXPORT_COLUMNS, fmt):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+async def measure_list():
+    from sqlalchemy import select
+    from db import AsyncReadSessionLocal
+    from models import Order
+    import schemas
+
+    start = time.perf_counter()
+    async with AsyncReadSessionLocal() as db:
+        result = await db.execute(select(Order).where(Order.user_id == 1))
+        body = [schemas.OrderResponse.model_validate(o).model_dump_json() for o in result.scalars().all()]
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, sum(len(b) for b in body)
+
+
+async def run(row_counts, fmt: str):
+    import migrations
+    from db import engine, dispose_engines
+
+    migrations.upgrade(engine)
+    try:
+        seed(100)
+        await measure_stream(fmt)  # warm up imports and statement compilation
+        for rows in row_counts:
+            seed(rows)
+            for label, measure in (("stream", lambda: measure_stream(fmt)), ("list", measure_list)):
+                tracemalloc.start()
+                first, total, size = await measure()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{rows:>8} rows  {label:<6}  first byte {first * 1000:8.1f}ms  total {total:6.2f}s  "
+                      f"{size / 1e6:7.1f}MB out  peak memory {peak / 1e6:7.1f}MB")
+    finally:
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    args = parser.parse_args()
+    asyncio.run(run(sorted(args.rows), args.format))
+
+
+if __name__ == "__main__":
+    main()
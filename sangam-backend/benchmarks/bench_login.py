@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Login Benchmark - logins/sec against the password hashing pool size
+
+Measures how many bcrypt verifications (the expensive part of /login) the
+dedicated hashing pool completes per second for a range of pool sizes,
+and how many requests get rejected by admission control.
+
+Usage:
+    python benchmarks/bench_login.py [--requests 64] [--sizes 1,2,4]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from auth import hashing
+
+
+async def run(pool_size: int, requests: int, hashed: str):
+    hashing.HASH_POOL_SIZE = pool_size
+    hashing.shutdown_pool()
+    # Warm the workers so process start-up isn't counted
+    await asyncio.gather(*(hashing.verify_password("secret", hashed) for _ in range(pool_size)))
+
+    async def one_login():
+        try:
+            ok, _ = await hashing.verify_password("secret", hashed)
+            return ok
+        except HTTPException:
+            return None  # rejected with 503
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_login() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    accepted = sum(1 for r in results if r)
+    rejected = sum(1 for r in results if r is None)
+    print(f"pool={pool_size:<3} accepted={accepted:<5} rejected={rejected:<5} "
+          f"time={elapsed:6.2f}s  logins/sec={accepted / elapsed:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--sizes", default="1,2,4")
+    args = parser.parse_args()
+
+    hashed = hashing.pwd_context.hash("secret")
+    print(f"bcrypt rounds={hashing.BCRYPT_ROUNDS}, max queue={hashing.HASH_MAX_QUEUE}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        asyncio.run(run(size, args.requests, hashed))
+    hashing.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Order Creation Benchmark - parallel POST /orders/
+
+Creates a couple of users on a fresh temporary database and fires hundreds
+of POST /orders/ requests at the real app concurrently, then reports the
+throughput. That the order ids come out unique and consecutive is asserted
+by tests/test_order_numbers.py.
+
+Before order_counters, generate_order_id scanned the user's orders, so
+creates got slower as a shop grew.
+
+Requires httpx (already needed by FastAPI's TestClient).
+
+Usage:
+    python benchmarks/bench_order_ids.py [--requests 300] [--users 2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Fresh database and cheap password hashing - must be set before the app is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'orders.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+ORDER = {
+    "customer_name": "Bench Customer",
+    "product": "Lamp",
+    "category": "Home Decor",
+    "amount": 10.0,
+    "payment_method": "COD",
+    "payment_status": "Unpaid",
+    "delivery_status": "Pending",
+    "source": "Website",
+}
+
+
+async def login(client, username: str) -> dict:
+    await client.post("/signup", json={"username": username, "password": "bench-password"})
+    response = await client.post("/login", json={"username": username, "password": "bench-password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run(requests: int, users: int):
+    import migrations
+    from auth import hashing
+    from db import engine, dispose_engines
+    from main import app
+
+    migrations.upgrade(engine)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            headers = [await login(client, f"bench{i}@example.com") for i in range(users)]
+
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/orders/", json=ORDER, headers=headers[i % users])
+                for i in range(requests)
+            ))
+            elapsed = time.perf_counter() - start
+    finally:
+        hashing.shutdown_pool()
+        await dispose_engines()
+
+    failed = [r for r in responses if r.status_code != 201]
+    print(f"{requests} concurrent creates for {users} user(s) in {elapsed:.2f}s "
+          f"({requests / elapsed:.0f} req/sec), {len(failed)} failed")
+    for response in failed[:5]:
+        print(f"  {response.status_code}: {response.text[:200]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--users", type=int, default=2)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Realtime Benchmark - event fan-out to many idle WebSocket connections
+
+Starts the app under uvicorn in a subprocess (fresh database), opens
+--connections WebSockets on /ws for one user, and leaves them idle. Then
+creates --events orders through the API, one at a time, and times how long
+each order.created event takes to reach every connection.
+
+Reports the server's memory per open connection (from /proc, Linux only)
+and the fan-out latency: first and last connection to receive each event.
+The client runs in this process, so on a small machine the numbers include
+the client's own work reading 10k sockets.
+
+Each connection is a file descriptor on both sides - raise `ulimit -n`
+above --connections first.
+
+Requires the websockets package (what uvicorn uses for WebSockets).
+
+Usage:
+    python benchmarks/bench_realtime.py [--connections 10000] [--events 20] [--ws websockets-sansio]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import websockets
+
+BACKEND = Path(__file__).parent.parent
+
+ORDER = {
+    "customer_name": "Bench", "product": "Item", "category": "Other", "amount": 10.0,
+    "payment_method": "COD", "payment_status": "Pending", "delivery_status": "Pending",
+    "source": "Website",
+}
+
+
+def rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def start_server(port: int, connections: int, ws: str) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir}/bench.db",
+        EVENT_MAX_CONNECTIONS_PER_USER=str(connections),
+        EVENT_HEARTBEAT_SECONDS="3600",  # idle means idle: no pings during the run
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--log-level", "warning", "--backlog", "4096", "--ws", ws],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+async def login(base_url: str) -> str:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                await client.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        credentials = {"username": "bench@example.com", "password": "bench-password"}
+        await client.post("/signup", json=credentials)
+        response = await client.post("/login", json=credentials)
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+
+async def run(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = start_server(args.port, args.connections, args.ws)
+    sockets = []
+    try:
+        token = await login(base_url)
+        baseline = rss_kb(server.pid)
+
+        start = time.perf_counter()
+        url = f"ws://127.0.0.1:{args.port}/ws?token={token}"
+        for batch in range(0, args.connections, 500):
+            count = min(500, args.connections - batch)
+            sockets += await asyncio.gather(*(
+                websockets.connect(url, ping_interval=None, open_timeout=60) for _ in range(count)
+            ))
+        connect_time = time.perf_counter() - start
+        await asyncio.sleep(1)
+        connected = rss_kb(server.pid)
+        per_connection = (connected - baseline) / len(sockets)
+        print(f"{len(sockets)} connections open in {connect_time:.1f}s  "
+              f"server RSS {baseline / 1024:.0f} -> {connected / 1024:.0f} MB "
+              f"(~{per_connection:.1f} KB per connection)")
+
+        first, last = [], []
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(base_url=base_url, headers=headers) as client:
+            for _ in range(args.events):
+                received = []
+
+                async def receive(ws):
+                    await ws.recv()
+                    received.append(time.perf_counter())
+
+                readers = [asyncio.create_task(receive(ws)) for ws in sockets]
+                sent = time.perf_counter()
+                (await client.post("/orders/", json=ORDER)).raise_for_status()
+                await asyncio.wait_for(asyncio.gather(*readers), 120)
+                first.append((min(received) - sent) * 1000)
+                last.append((max(received) - sent) * 1000)
+
+        print(f"{args.events} events, each to {len(sockets)} connections:")
+        print(f"  first delivery  median={statistics.median(first):8.1f}ms  max={max(first):8.1f}ms")
+        print(f"  all delivered   median={statistics.median(last):8.1f}ms  max={max(last):8.1f}ms  "
+              f"({len(sockets) / (statistics.median(last) / 1000):,.0f} deliveries/sec)")
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ws", default="auto", help="uvicorn's WebSocket implementation (--ws)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
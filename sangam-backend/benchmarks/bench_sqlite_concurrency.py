@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+SQLite Concurrency Benchmark - mixed readers and writers
+
+Compares the default SQLite settings with SQLITE_PROFILE=production (WAL +
+tuned pragmas + read-only reader engine). Writer threads hold long write
+transactions, like a big Instagram sync, while reader threads run the
+GET /orders/ query. It reports reader latency and throughput for each profile.
+
+Usage:
+    python benchmarks/bench_sqlite_concurrency.py [--seconds 5] [--readers 8] [--writers 1]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+import db
+from db import Base, configure_sqlite, engine_options
+from models import Order, User
+
+
+def make_engines(path: str, profile: str):
+    url = f"sqlite:///{path}"
+    write_engine = configure_sqlite(create_engine(url, **engine_options(url)), profile=profile)
+    ro_url = f"sqlite:///file:{path}?mode=ro&uri=true"
+    read_engine = configure_sqlite(create_engine(ro_url, **engine_options(ro_url)), read_only=True, profile=profile)
+    return write_engine, read_engine
+
+
+def order_row(i: int) -> dict:
+    return {
+        "user_id": 1, "order_id": f"BENCH-{i}", "customer_name": f"Customer {i}",
+        "product": "Ceramic Vase Set", "category": "Home Decor", "amount": 42.0,
+        "payment_method": "COD", "payment_status": "Paid", "delivery_status": "Pending",
+        "source": "Website", "order_date": datetime.utcnow(),
+    }
+
+
+def run(profile: str, seconds: float, readers: int, writers: int):
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "bench.db")
+    write_engine, read_engine = make_engines(path, profile)
+    Base.metadata.create_all(write_engine)
+    with write_engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, username="bench@example.com", hashed_password="x"))
+        conn.execute(insert(Order), [order_row(i) for i in range(5000)])
+
+    stop = threading.Event()
+    latencies, errors, written = [], [0], [0]
+    lock = threading.Lock()
+    counter = iter(range(5000, 10**9))
+
+    def reader():
+        query = select(Order).where(Order.user_id == 1).limit(50)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(query).all()
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    def writer():
+        while not stop.is_set():
+            try:
+                with write_engine.begin() as conn:
+                    # A long write transaction: enough inserts to spill the page
+                    # cache (which takes the exclusive lock in rollback mode) + a pause
+                    conn.execute(insert(Order), [order_row(next(counter)) for _ in range(20000)])
+                    time.sleep(0.2)
+                with lock:
+                    written[0] += 20000
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    write_engine.dispose()
+    read_engine.dispose()
+
+    if latencies:
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        worst = latencies[-1] * 1000
+    else:
+        p50 = p99 = worst = float("nan")
+    print(f"{profile:<11} reads/sec={len(latencies) / seconds:8.0f}  p50={p50:7.2f}ms  "
+          f"p99={p99:8.2f}ms  max={worst:8.2f}ms  rows written={written[0]:<6} errors={errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writer(s), {args.seconds}s per profile")
+    for profile in ("default", "production"):
+        run(profile, args.seconds, args.readers, args.writers)
+
+
+if __name__ == "__main__":
+    main()
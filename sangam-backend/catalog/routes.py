@@ -4,71 +4,105 @@ Catalog API Routes - Handle all product catalog operations
 
 Endpoints:
 - GET /catalog - Get all catalog items for the current user
+- GET /catalog/export - Stream the catalog as CSV/NDJSON
 - GET /catalog/{item_id} - Get a specific catalog item
 - POST /catalog - Create a new catalog item
+- POST /catalog/import - Import catalog items from a CSV file (background job)
 - PUT /catalog/{item_id} - Update a catalog item
 - DELETE /catalog/{item_id} - Delete a catalog item
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 # Fix imports to work from subdirectory
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from db import get_db
-from auth.utils import get_current_user
-from models import CatalogItem, User
+from db import get_async_db, get_async_read_db
+from auth.utils import get_current_principal, Principal
+from models import CatalogItem
+from imports import jobs as import_jobs
+from sync import changes as sync_changes
+import exports
 import schemas
+import versions
 
 router = APIRouter(prefix="/catalog", tags=["catalog"])
 
 
-@router.get("/", response_model=List[schemas.CatalogItemResponse])
-def get_catalog_items(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def catalog_query(user_id: int):
+    """All of the user's catalog items"""
+    return select(CatalogItem).where(CatalogItem.user_id == user_id)
+
+
+def owned_item(item_id: int, user_id: int):
+    """One catalog item, if it belongs to the user"""
+    return select(CatalogItem).where(CatalogItem.id == item_id, CatalogItem.user_id == user_id)
+
+
+@router.get("/", response_model=List[schemas.CatalogItemResponse], dependencies=[Depends(versions.etag("catalog"))])
+async def get_catalog_items(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     GET /catalog - Get all catalog items for the current user
     
     Returns: List of all products in the catalog
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Get all catalog items for this user
-    items = db.query(CatalogItem).filter(CatalogItem.user_id == user.id).all()
+    result = await db.execute(catalog_query(current_user.id))
+    items = result.scalars().all()
     
     return items
 
 
-@router.get("/{item_id}", response_model=schemas.CatalogItemResponse)
-def get_catalog_item(
+# Columns of a catalog export, in file order
+EXPORT_COLUMNS = ["id", "name", "image_url", "price", "category", "stock", "sold", "created_at", "updated_at"]
+
+
+def export_query(user_id: int):
+    """GET /catalog/export: the EXPORT_COLUMNS of the user's items, by category"""
+    table = CatalogItem.__table__
+    return (
+        select(*(table.c[name] for name in EXPORT_COLUMNS))
+        .where(table.c.user_id == user_id)
+        .order_by(table.c.category, table.c.id)
+    )
+
+
+@router.get("/export")
+async def export_catalog(
+    format: exports.ExportFormat = "csv",
+    gzip: bool = Query(False, description="Compress the download (.gz)"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    GET /catalog/export - Download the catalog as CSV or NDJSON
+    
+    Streamed in chunks straight from the database - see exports.py.
+    """
+    return exports.export_response(export_query(current_user.id), EXPORT_COLUMNS, format, "catalog", gzip)
+
+
+@router.get("/{item_id}", response_model=schemas.CatalogItemResponse, dependencies=[Depends(versions.etag("catalog"))])
+async def get_catalog_item(
     item_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     GET /catalog/{item_id} - Get a specific catalog item
     
     Returns: The catalog item if found and belongs to the user
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the item and make sure it belongs to this user
-    item = db.query(CatalogItem).filter(
-        CatalogItem.id == item_id,
-        CatalogItem.user_id == user.id
-    ).first()
+    result = await db.execute(owned_item(item_id, current_user.id))
+    item = result.scalars().first()
     
     if not item:
         raise HTTPException(
@@ -80,24 +114,19 @@ def get_catalog_item(
 
 
 @router.post("/", response_model=schemas.CatalogItemResponse, status_code=status.HTTP_201_CREATED)
-def create_catalog_item(
+async def create_catalog_item(
     item_data: schemas.CatalogItemCreate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     POST /catalog - Create a new catalog item
     
     Creates a new product in the catalog with name, price, stock, etc.
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Create new catalog item
     new_item = CatalogItem(
-        user_id=user.id,
+        user_id=current_user.id,
         name=item_data.name,
         image_url=item_data.image_url,
         price=item_data.price,
@@ -107,18 +136,43 @@ def create_catalog_item(
     )
     
     db.add(new_item)
-    db.commit()
-    db.refresh(new_item)
+    # Changes the ETag of the user's catalog GETs (see versions.py)
+    await db.run_sync(versions.bump, current_user.id, "catalog")
+    await db.commit()
+    await db.refresh(new_item)
     
     return new_item
 
 
+@router.post(
+    "/import",
+    response_model=schemas.ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=import_jobs.CSV_REQUEST_BODY,
+)
+async def import_catalog_items(
+    request: Request,
+    filename: Optional[str] = Query(None, description="Original file name, shown in the job"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    POST /catalog/import - Import catalog items from a CSV file
+    
+    The CSV file is the raw request body; it needs the CatalogItemCreate
+    columns (name, image_url, price, category; stock and sold optional).
+    Rows are validated and inserted by a background job - see imports/jobs.py.
+    Returns: the job - poll GET /imports/{id} for progress and row errors
+    """
+    return await import_jobs.start(request, db, current_user.id, "catalog", filename)
+
+
 @router.put("/{item_id}", response_model=schemas.CatalogItemResponse)
-def update_catalog_item(
+async def update_catalog_item(
     item_id: int,
     item_data: schemas.CatalogItemUpdate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     PUT /catalog/{item_id} - Update a catalog item
@@ -126,16 +180,9 @@ def update_catalog_item(
     Updates product information like price, stock, name, etc.
     The updated_at timestamp is automatically updated by the model.
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the item
-    item = db.query(CatalogItem).filter(
-        CatalogItem.id == item_id,
-        CatalogItem.user_id == user.id
-    ).first()
+    result = await db.execute(owned_item(item_id, current_user.id))
+    item = result.scalars().first()
     
     if not item:
         raise HTTPException(
@@ -149,33 +196,27 @@ def update_catalog_item(
         setattr(item, field, value)
     
     # The model will automatically update updated_at timestamp
-    db.commit()
-    db.refresh(item)
+    await db.run_sync(versions.bump, current_user.id, "catalog")
+    await db.commit()
+    await db.refresh(item)
     
     return item
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_catalog_item(
+async def delete_catalog_item(
     item_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     DELETE /catalog/{item_id} - Delete a catalog item
     
     Removes the product from the catalog
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the item
-    item = db.query(CatalogItem).filter(
-        CatalogItem.id == item_id,
-        CatalogItem.user_id == user.id
-    ).first()
+    result = await db.execute(owned_item(item_id, current_user.id))
+    item = result.scalars().first()
     
     if not item:
         raise HTTPException(
@@ -183,8 +224,10 @@ def delete_catalog_item(
             detail="Catalog item not found or you don't have permission to delete it"
         )
     
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.run_sync(sync_changes.record_deletes, current_user.id, "catalog", [item.id])
+    await db.run_sync(versions.bump, current_user.id, "catalog")
+    await db.commit()
     
     return None
 
@@ -0,0 +1,393 @@
+# chats/counters.py
+"""
+Chat counters.
+
+Each chat carries message_count, unread_count, last_sender and
+first_message_at, and chat_unread_counters holds the unread chats and
+unread messages per user and platform. The chat routes and the Instagram
+sync update both in the same transaction as every write, so the chat
+list and the unread badges (GET /chats/counters) never read messages:
+
+- count_message() advances an existing chat's counters (and its unread
+  badge) for one new, newest message, in SQL
+- add_message() does the same in Python for a chat created in the same
+  transaction (no other request can see it yet)
+- refresh() recomputes one chat's counters from its messages - used where
+  history decides the result (a chat marked unread again, synced messages)
+- record_changes() applies snapshot() deltas of chats to
+  chat_unread_counters, like orders/analytics.py does for order rollups
+
+unread_count keeps the chat list's definition: messages from the
+customer since the business last replied, while the chat is marked
+unread - 0 once it is read.
+
+If the counters ever drift from the messages (a bug, a manual edit),
+recompute them:
+
+    python -m chats.counters check      # report drift, exit 1 if any
+    python -m chats.counters rebuild    # recompute and replace
+"""
+
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import bindparam, case, delete, func, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from db import dialect_insert
+from models import Chat, ChatUnreadCounter, Message
+
+# Per-chat counter columns, in the order compute() returns them
+COLUMNS = ("message_count", "unread_count", "last_sender", "first_message_at")
+
+
+# ----------------------------------------------------------------------------
+# Per-chat counters
+# ----------------------------------------------------------------------------
+
+# Chat columns count_message() reads back from its UPDATE
+_COUNTED = ("user_id", "platform", "status", "unread_count", "message_count", "first_message_at")
+
+
+def count_message(db, chat: Chat, message: Message):
+    """
+    Counts a new message that is the newest of an existing chat: advances
+    its counters and last message, marks it read if the message is a reply,
+    and moves its share of chat_unread_counters. db is a sync Session
+    (routes call it via run_sync); the caller commits.
+
+    message_count is advanced by the UPDATE itself, not from the chat as
+    the route loaded it. That UPDATE also locks the row until commit, and
+    the status and unread_count it returns are what concurrent messages
+    left, so the before/after snapshots are never stale. The message's
+    created_at is set once the lock is held, so messages of a chat are
+    dated in the order they are counted.
+    """
+    table = Chat.__table__
+    row = db.execute(
+        update(table)
+        .where(table.c.id == chat.id)
+        .values(message_count=table.c.message_count + 1)
+        .returning(*(table.c[name] for name in _COUNTED))
+    ).one()
+    values = row._asdict()
+    before = snapshot(SimpleNamespace(**values))
+
+    message.created_at = datetime.utcnow()
+    if values["first_message_at"] is None:
+        values["first_message_at"] = message.created_at
+    if message.sender == "me":
+        values["status"], values["unread_count"] = "read", 0
+    elif values["status"] == "unread":
+        values["unread_count"] += 1
+    else:
+        values["unread_count"] = 0
+    values.update(
+        last_sender=message.sender,
+        last_message=message.text,
+        last_message_date=message.created_at,
+        updated_at=message.created_at,
+    )
+    db.execute(
+        update(table)
+        .where(table.c.id == chat.id)
+        .values({name: values[name] for name in values if name not in ("user_id", "platform", "message_count")})
+    )
+
+    # The chat object now matches the row, with nothing left to flush
+    for name, value in values.items():
+        set_committed_value(chat, name, value)
+    record_change(db, before, snapshot(chat))
+
+
+def add_message(chat: Chat, sender: str, created_at: datetime):
+    """
+    Counts a new message that is the newest of a chat created in this
+    transaction. Call it after setting the chat's status for this message
+    (a reply marks it read).
+    """
+    chat.message_count = (chat.message_count or 0) + 1
+    if chat.first_message_at is None or created_at < chat.first_message_at:
+        chat.first_message_at = created_at
+    chat.last_sender = sender
+    if sender == "me" or chat.status != "unread":
+        chat.unread_count = 0
+    else:
+        chat.unread_count = (chat.unread_count or 0) + 1
+
+
+def unread_count():
+    """
+    unread_count recomputed from the messages: a correlated subquery per
+    chat that reads only that chat's rows of ix_messages_chat_id_created_at_id
+    """
+    last_reply = (
+        select(func.max(Message.created_at))
+        .where(Message.chat_id == Chat.id, Message.sender == "me")
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+    waiting = (
+        select(func.count(Message.id))
+        .where(
+            Message.chat_id == Chat.id,
+            Message.sender == "them",
+            or_(last_reply.is_(None), Message.created_at > last_reply),
+        )
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+    return case((Chat.status == "unread", waiting), else_=0)
+
+
+def _computed():
+    """Chats with their counters recomputed from the messages"""
+    def per_chat(expression):
+        return select(expression).where(Message.chat_id == Chat.id).correlate(Chat).scalar_subquery()
+
+    last_sender = (
+        select(Message.sender)
+        .where(Message.chat_id == Chat.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+    return select(
+        Chat.id,
+        Chat.user_id,
+        Chat.platform,
+        Chat.status,
+        per_chat(func.count(Message.id)).label("message_count"),
+        unread_count().label("unread_count"),
+        last_sender.label("last_sender"),
+        per_chat(func.min(Message.created_at)).label("first_message_at"),
+    )
+
+
+def refresh(db, chat: Chat):
+    """
+    Recomputes one chat's counters from its messages. db is a sync
+    Session - routes call it via run_sync; pending changes are flushed
+    first (sessions don't autoflush).
+    """
+    db.flush()
+    row = db.execute(_computed().where(Chat.id == chat.id)).one()
+    for name in COLUMNS:
+        setattr(chat, name, getattr(row, name))
+
+
+# ----------------------------------------------------------------------------
+# Per-user, per-platform unread counters
+# ----------------------------------------------------------------------------
+
+def snapshot(chat) -> Optional[dict]:
+    """The fields of a chat that decide its share of chat_unread_counters"""
+    if chat is None:
+        return None
+    unread = chat.status == "unread"
+    return {
+        "user_id": chat.user_id,
+        "platform": chat.platform,
+        "unread_chats": 1 if unread else 0,
+        "unread_messages": (chat.unread_count or 0) if unread else 0,
+    }
+
+
+def _dialect_name(db) -> str:
+    # db is a Session (routes) or a Connection (commands, migrations)
+    return (db.get_bind().dialect if hasattr(db, "get_bind") else db.dialect).name
+
+
+def _upsert(dialect_name: str):
+    """INSERT a counter row, or add to the existing one"""
+    table = ChatUnreadCounter.__table__
+    statement = dialect_insert(dialect_name)(table)
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            "unread_chats": table.c.unread_chats + statement.excluded.unread_chats,
+            "unread_messages": table.c.unread_messages + statement.excluded.unread_messages,
+        },
+    )
+
+
+def record_changes(db, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Applies (before, after) snapshot pairs to chat_unread_counters: (None,
+    new) for a created chat, (old, new) for a changed one, (old, None) for
+    a delete. Deltas for the same row are merged first and written in one
+    executemany upsert. The caller commits.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for before, after in changes:
+        for values, sign in ((before, -1), (after, 1)):
+            if values is not None:
+                delta = deltas[(values["user_id"], values["platform"])]
+                delta[0] += sign * values["unread_chats"]
+                delta[1] += sign * values["unread_messages"]
+
+    rows = [
+        {"user_id": user_id, "platform": platform, "unread_chats": chats, "unread_messages": messages}
+        for (user_id, platform), (chats, messages) in deltas.items()
+        if chats or messages
+    ]
+    if rows:
+        db.execute(_upsert(_dialect_name(db)), rows)
+
+
+def record_change(db, before: Optional[dict], after: Optional[dict]):
+    """record_changes() for a single chat"""
+    record_changes(db, [(before, after)])
+
+
+def totals_query(user_id: int):
+    return (
+        select(ChatUnreadCounter.platform, ChatUnreadCounter.unread_chats, ChatUnreadCounter.unread_messages)
+        .where(ChatUnreadCounter.user_id == user_id, ChatUnreadCounter.unread_chats > 0)
+        .order_by(ChatUnreadCounter.platform)
+    )
+
+
+def totals(db, user_id: int) -> List[dict]:
+    """The user's unread counters per platform (only platforms with unread chats)"""
+    result = db.execute(totals_query(user_id))
+    return [dict(row) for row in result.mappings()]
+
+
+# ----------------------------------------------------------------------------
+# Rebuild / drift check
+# ----------------------------------------------------------------------------
+
+def compute(db, user_id: Optional[int] = None) -> Tuple[Dict[int, tuple], Dict[tuple, list]]:
+    """
+    Counters recomputed from the messages: chat id -> (user_id, COLUMNS
+    values), and (user_id, platform) -> [unread_chats, unread_messages]
+    """
+    query = _computed()
+    if user_id is not None:
+        query = query.where(Chat.user_id == user_id)
+
+    chats, unread = {}, defaultdict(lambda: [0, 0])
+    for row in db.execute(query.execution_options(yield_per=1000)):
+        chats[row.id] = (row.user_id,) + tuple(getattr(row, name) for name in COLUMNS)
+        if row.status == "unread":
+            counter = unread[(row.user_id, row.platform)]
+            counter[0] += 1
+            counter[1] += row.unread_count
+    return chats, unread
+
+
+def stored(db, user_id: Optional[int] = None) -> Tuple[Dict[int, tuple], Dict[tuple, list]]:
+    """Counters as currently stored, in the shape compute() returns"""
+    chats_query = select(Chat.id, Chat.user_id, *(Chat.__table__.c[name] for name in COLUMNS))
+    counters_query = select(ChatUnreadCounter.__table__).where(
+        or_(ChatUnreadCounter.unread_chats != 0, ChatUnreadCounter.unread_messages != 0)
+    )
+    if user_id is not None:
+        chats_query = chats_query.where(Chat.user_id == user_id)
+        counters_query = counters_query.where(ChatUnreadCounter.user_id == user_id)
+
+    chats = {row[0]: tuple(row[1:]) for row in db.execute(chats_query)}
+    unread = {
+        (row.user_id, row.platform): [row.unread_chats, row.unread_messages]
+        for row in db.execute(counters_query)
+    }
+    return chats, unread
+
+
+def _differences(expected, actual) -> Tuple[List[tuple], List[tuple]]:
+    (expected_chats, expected_unread), (actual_chats, actual_unread) = expected, actual
+    chats = [
+        (chat_id, actual_chats.get(chat_id), want)
+        for chat_id, want in sorted(expected_chats.items())
+        if actual_chats.get(chat_id) != want
+    ]
+    unread = [
+        (key, actual_unread.get(key), expected_unread.get(key))
+        for key in sorted(set(expected_unread) | set(actual_unread))
+        if actual_unread.get(key) != expected_unread.get(key)
+    ]
+    return chats, unread
+
+
+def drift(db, user_id: Optional[int] = None) -> Tuple[List[tuple], List[tuple]]:
+    """
+    (chat id, stored, expected) for every chat whose counters differ, and
+    (key, stored, expected) for every unread counter that differs
+    """
+    return _differences(compute(db, user_id), stored(db, user_id))
+
+
+# Sets one chat's counters (executemany); bind names can't be column names
+_update_chat = (
+    update(Chat.__table__)
+    .where(Chat.__table__.c.id == bindparam("chat_id"))
+    .values({name: bindparam(f"new_{name}") for name in COLUMNS})
+)
+
+
+def rebuild(db, user_id: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Rewrites the counters of every chat that drifted and replaces the
+    unread counters with recomputed ones. Returns (chats fixed, counter
+    rows written); the caller commits.
+    """
+    expected = compute(db, user_id)
+    chats, unread = _differences(expected, stored(db, user_id))
+    if chats:
+        db.execute(_update_chat, [
+            {"chat_id": chat_id, **{f"new_{name}": value for name, value in zip(COLUMNS, want[1:])}}
+            for chat_id, _, want in chats
+        ])
+    if unread:
+        table = ChatUnreadCounter.__table__
+        statement = delete(table)
+        if user_id is not None:
+            statement = statement.where(table.c.user_id == user_id)
+        db.execute(statement)
+        rows = [
+            {"user_id": key[0], "platform": key[1], "unread_chats": counts[0], "unread_messages": counts[1]}
+            for key, counts in expected[1].items()
+        ]
+        if rows:
+            db.execute(table.insert(), rows)
+        return len(chats), len(rows)
+    return len(chats), 0
+
+
+def main(argv: list) -> int:
+    import argparse
+
+    import migrations
+    from db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m chats.counters")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="only this user's chats")
+    args = parser.parse_args(argv)
+
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        chats, unread = drift(connection, args.user_id)
+        for chat_id, have, want in chats[:50]:
+            print(f"drift chat {chat_id}: stored={have} expected={want}")
+        for key, have, want in unread[:50]:
+            print(f"drift unread {key}: stored={have} expected={want}")
+        print(f"{len(chats)} chat(s) and {len(unread)} unread counter(s) drifted")
+
+        if args.command == "rebuild":
+            fixed, rows = rebuild(connection, args.user_id)
+            print(f"Rebuilt {fixed} chat(s) and {rows} unread counter row(s)")
+            return 0
+    return 1 if chats or unread else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -3,17 +3,24 @@
 Chats API Routes - Handle all chat/conversation operations
 
 Endpoints:
-- GET /chats - Get all chats for the current user
+- GET /chats - The current user's chat list (summaries; ?include_messages=true for full chats)
+- GET /chats/export - Stream all chats and messages as CSV/NDJSON
+- GET /chats/counters - Unread chats and messages per platform (badges)
 - GET /chats/{chat_id} - Get a specific chat with all messages
 - POST /chats - Create a new chat
 - PUT /chats/{chat_id} - Update a chat (e.g., mark as read)
 - DELETE /chats/{chat_id} - Delete a chat
+- GET /chats/{chat_id}/messages - A chat's messages, newest first, one page at a time
 - POST /chats/{chat_id}/messages - Add a message to a chat
+- POST /chats/create-with-messages - Create a chat with initial messages
+- POST /chats/import - Import many chats with their messages (NDJSON, background job)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
@@ -22,58 +29,175 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from db import get_db
-from auth.utils import get_current_user
-from models import Chat, Message, User
+from db import get_async_db, get_async_read_db
+from auth.utils import get_current_principal, Principal
+from models import Chat, Message
+from chats import counters
+from imports import jobs as import_jobs
+from realtime import hub
+from sync import changes as sync_changes
+import exports
+import pagination
 import schemas
+import versions
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 
-@router.get("/", response_model=List[schemas.ChatResponse])
-def get_chats(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def owned_chat(chat_id: int, user_id: int):
+    """One chat, if it belongs to the user"""
+    return select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
+
+
+async def get_chat_with_messages(db: AsyncSession, chat_id: int, user_id: int):
+    """
+    Loads one of the user's chats together with its messages.
+
+    ChatResponse includes the messages, and lazy loading isn't possible from
+    async code, so they are always loaded eagerly (selectinload).
+    """
+    result = await db.execute(owned_chat(chat_id, user_id).options(selectinload(Chat.messages)))
+    return result.scalars().first()
+
+
+def summary_query(user_id: int):
+    """
+    The user's chat list as ChatSummary columns, newest first - one query
+    that reads only chats (the counters are kept on them, see chats/counters.py)
+    """
+    return (
+        select(
+            Chat.id,
+            Chat.customer_name,
+            Chat.platform,
+            Chat.status,
+            Chat.last_message,
+            Chat.last_message_date,
+            Chat.unread_count,
+            Chat.message_count,
+            Chat.last_sender,
+        )
+        .where(Chat.user_id == user_id)
+        .order_by(Chat.last_message_date.desc())
+    )
+
+
+def chats_query(user_id: int):
+    """The user's full chats, newest first, with their messages (one extra IN query)"""
+    return (
+        select(Chat)
+        .where(Chat.user_id == user_id)
+        .order_by(Chat.last_message_date.desc())
+        .options(selectinload(Chat.messages))
+    )
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.ChatSummary], List[schemas.ChatResponse]],
+    dependencies=[Depends(versions.etag("chats"))],
+)
+async def get_chats(
+    include_messages: bool = Query(False, description="Return full chats with every message"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    GET /chats - Get all chats for the current user
+    GET /chats - Get all chats for the current user, newest first
+    
+    By default returns summaries for the chat list: the chat's own columns,
+    including its unread and message counts, from a single query - no
+    messages are loaded.
     
-    Returns: List of all chats with their messages
+    ?include_messages=true returns full chats with all their messages
+    (one extra IN query for all chats via selectinload, however many there are).
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    if not include_messages:
+        result = await db.execute(summary_query(current_user.id))
+        return [schemas.ChatSummary.model_validate(row) for row in result.mappings()]
     
-    # Get all chats for this user, ordered by last message date (newest first)
-    chats = db.query(Chat).filter(Chat.user_id == user.id).order_by(
-        Chat.last_message_date.desc()
-    ).all()
+    result = await db.execute(chats_query(current_user.id))
+    return [schemas.ChatResponse.model_validate(chat) for chat in result.scalars().all()]
+
+
+# Columns of a chat export - one row per message, with its chat's fields
+EXPORT_COLUMNS = [
+    "chat_id", "customer_name", "platform", "status", "last_message_date",
+    "message_id", "sender", "text", "created_at",
+]
+
+
+def export_query(user_id: int):
+    """GET /chats/export: one row per message with its chat's fields"""
+    chats = Chat.__table__
+    messages = Message.__table__
+    return (
+        select(
+            chats.c.id.label("chat_id"),
+            chats.c.customer_name,
+            chats.c.platform,
+            chats.c.status,
+            chats.c.last_message_date,
+            messages.c.id.label("message_id"),
+            messages.c.sender,
+            messages.c.text,
+            messages.c.created_at,
+        )
+        .select_from(chats.outerjoin(messages, messages.c.chat_id == chats.c.id))
+        .where(chats.c.user_id == user_id)
+        # Matches ix_chats_user_id_last_message_date + ix_messages_chat_id_created_at_id
+        .order_by(chats.c.last_message_date, chats.c.id, messages.c.created_at, messages.c.id)
+    )
+
+
+@router.get("/export")
+async def export_chats(
+    format: exports.ExportFormat = "csv",
+    gzip: bool = Query(False, description="Compress the download (.gz)"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    GET /chats/export - Download all chats and their messages as CSV or NDJSON
+    
+    One row per message (chats without messages get one row with empty
+    message columns), streamed in chunks - see exports.py.
+    """
+    return exports.export_response(export_query(current_user.id), EXPORT_COLUMNS, format, "chats", gzip)
+
+
+@router.get("/counters", response_model=schemas.ChatCounters, dependencies=[Depends(versions.etag("chats"))])
+async def get_counters(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /chats/counters - Unread badges: unread chats and messages per platform
     
-    return chats
+    Reads the user's few chat_unread_counters rows (one per platform), which
+    every chat write keeps up to date - the cost doesn't depend on how many
+    chats or messages there are.
+    """
+    platforms = await db.run_sync(counters.totals, current_user.id)
+    return schemas.ChatCounters(
+        unread_chats=sum(row["unread_chats"] for row in platforms),
+        unread_messages=sum(row["unread_messages"] for row in platforms),
+        platforms=platforms,
+    )
 
 
-@router.get("/{chat_id}", response_model=schemas.ChatResponse)
-def get_chat(
+@router.get("/{chat_id}", response_model=schemas.ChatResponse, dependencies=[Depends(versions.etag("chats"))])
+async def get_chat(
     chat_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     GET /chats/{chat_id} - Get a specific chat with all messages
     
     Returns: The chat with all its messages
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the chat and make sure it belongs to this user
-    chat = db.query(Chat).filter(
-        Chat.id == chat_id,
-        Chat.user_id == user.id
-    ).first()
+    chat = await get_chat_with_messages(db, chat_id, current_user.id)
     
     if not chat:
         raise HTTPException(
@@ -85,43 +209,44 @@ def get_chat(
 
 
 @router.post("/", response_model=schemas.ChatResponse, status_code=status.HTTP_201_CREATED)
-def create_chat(
+async def create_chat(
     chat_data: schemas.ChatCreate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     POST /chats - Create a new chat/conversation
     
     Creates a new chat thread with a customer from a specific platform
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Create new chat
     new_chat = Chat(
-        user_id=user.id,
+        user_id=current_user.id,
         customer_name=chat_data.customer_name,
         platform=chat_data.platform,
         status=chat_data.status,
-        last_message_date=datetime.utcnow()
+        last_message_date=datetime.utcnow(),
+        messages=[]  # New chat - nothing to load later
     )
     
     db.add(new_chat)
-    db.commit()
-    db.refresh(new_chat)
+    # An unread chat counts towards the unread badges (see chats/counters.py)
+    await db.run_sync(counters.record_change, None, counters.snapshot(new_chat))
+    # Changes the ETag of the user's chats GETs (see versions.py)
+    await db.run_sync(versions.bump, current_user.id, "chats")
+    await db.commit()
+    # Live update for the user's open dashboards (see realtime/hub.py)
+    hub.publish(current_user.id, "chat.created", schemas.SyncChat.model_validate(new_chat))
     
     return new_chat
 
 
 @router.put("/{chat_id}", response_model=schemas.ChatResponse)
-def update_chat(
+async def update_chat(
     chat_id: int,
     chat_data: schemas.ChatUpdate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     PUT /chats/{chat_id} - Update a chat
@@ -130,16 +255,8 @@ def update_chat(
     - Mark chat as read/unread
     - Update last message
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the chat
-    chat = db.query(Chat).filter(
-        Chat.id == chat_id,
-        Chat.user_id == user.id
-    ).first()
+    chat = await get_chat_with_messages(db, chat_id, current_user.id)
     
     if not chat:
         raise HTTPException(
@@ -149,6 +266,7 @@ def update_chat(
     
     # Update only provided fields
     update_data = chat_data.dict(exclude_unset=True)
+    before, previous_status = counters.snapshot(chat), chat.status
     for field, value in update_data.items():
         setattr(chat, field, value)
     
@@ -156,17 +274,26 @@ def update_chat(
     if "last_message" in update_data:
         chat.last_message_date = datetime.utcnow()
     
-    db.commit()
-    db.refresh(chat)
+    if chat.status != previous_status:
+        if chat.status == "unread":
+            # Marked unread again: what counts as unread depends on the history
+            await db.run_sync(counters.refresh, chat)
+        else:
+            chat.unread_count = 0
+    await db.run_sync(counters.record_change, before, counters.snapshot(chat))
+    
+    await db.run_sync(versions.bump, current_user.id, "chats")
+    await db.commit()
+    hub.publish(current_user.id, "chat.updated", schemas.SyncChat.model_validate(chat))
     
     return chat
 
 
 @router.delete("/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_chat(
+async def delete_chat(
     chat_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     DELETE /chats/{chat_id} - Delete a chat and all its messages
@@ -174,16 +301,9 @@ def delete_chat(
     Note: Due to cascade="all, delete-orphan" in the model,
     all messages will be automatically deleted too
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the chat
-    chat = db.query(Chat).filter(
-        Chat.id == chat_id,
-        Chat.user_id == user.id
-    ).first()
+    result = await db.execute(owned_chat(chat_id, current_user.id))
+    chat = result.scalars().first()
     
     if not chat:
         raise HTTPException(
@@ -191,18 +311,79 @@ def delete_chat(
             detail="Chat not found or you don't have permission to delete it"
         )
     
-    db.delete(chat)
-    db.commit()
+    await db.delete(chat)
+    await db.run_sync(counters.record_change, counters.snapshot(chat), None)
+    # Clients drop the chat's messages with it
+    await db.run_sync(sync_changes.record_deletes, current_user.id, "chats", [chat.id])
+    await db.run_sync(versions.bump, current_user.id, "chats")
+    await db.commit()
+    hub.publish(current_user.id, "chat.deleted", {"id": chat_id})
     
     return None
 
 
+def messages_query(chat_id: int, user_id: int, position: Optional[dict] = None):
+    """
+    A page of a chat's messages, newest first, continuing before a decoded
+    cursor position if there is one. messages.user_id scopes the page to
+    the user without reading the chat.
+    """
+    query = select(Message).where(Message.chat_id == chat_id, Message.user_id == user_id)
+    if position is not None:
+        query = query.where(pagination.after((Message.created_at, Message.id), (position["created_at"], position["id"]), True))
+    return query.order_by(Message.created_at.desc(), Message.id.desc())
+
+
+@router.get("/{chat_id}/messages", response_model=schemas.MessagePage, dependencies=[Depends(versions.etag("chats"))])
+async def get_messages(
+    chat_id: int,
+    limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+    before: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /chats/{chat_id}/messages - A chat's message history, newest first
+    
+    Each page continues before the last message of the previous one
+    (keyset pagination on ix_messages_chat_id_created_at_id), so any page
+    of a long thread is one index range read of `limit` rows.
+    
+    Returns: {items, next_cursor, has_more} - pass next_cursor as ?before=
+    to load older messages
+    """
+    position = None
+    if before:
+        position = pagination.decode_cursor(before)
+        if position.get("chat") != chat_id or "created_at" not in position or "id" not in position:
+            # A cursor only continues the chat it was made for
+            raise pagination.invalid_cursor
+    
+    result = await db.execute(messages_query(chat_id, current_user.id, position).limit(limit + 1))
+    messages, next_cursor = pagination.page(
+        result.scalars().all(),
+        limit,
+        lambda last: {"chat": chat_id, "created_at": last.created_at, "id": last.id},
+    )
+    
+    if not messages and not before:
+        # Empty first page: an empty chat, or not one of the user's chats
+        exists = await db.execute(select(Chat.id).where(Chat.id == chat_id, Chat.user_id == current_user.id))
+        if exists.scalar() is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Chat not found or you don't have permission to view it"
+            )
+    
+    return schemas.MessagePage(items=messages, next_cursor=next_cursor, has_more=next_cursor is not None)
+
+
 @router.post("/{chat_id}/messages", response_model=schemas.MessageResponse, status_code=status.HTTP_201_CREATED)
-def create_message(
+async def create_message(
     chat_id: int,
     message_data: schemas.MessageCreate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     POST /chats/{chat_id}/messages - Add a message to a chat
@@ -213,16 +394,9 @@ def create_message(
     
     Also updates the chat's last_message and last_message_date
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the chat and verify it belongs to the user
-    chat = db.query(Chat).filter(
-        Chat.id == chat_id,
-        Chat.user_id == user.id
-    ).first()
+    result = await db.execute(owned_chat(chat_id, current_user.id))
+    chat = result.scalars().first()
     
     if not chat:
         raise HTTPException(
@@ -233,22 +407,23 @@ def create_message(
     # Create new message
     new_message = Message(
         chat_id=chat_id,
+        user_id=current_user.id,
         text=message_data.text,
-        sender=message_data.sender,
-        created_at=datetime.utcnow()
+        sender=message_data.sender
     )
     
-    # Update chat's last message info
-    chat.last_message = message_data.text
-    chat.last_message_date = datetime.utcnow()
-    
-    # If message is from business, mark chat as read
-    if message_data.sender == "me":
-        chat.status = "read"
+    # Update the chat's last message info, message count, unread count and
+    # badges - locked in SQL, so concurrent messages all count - and date the
+    # message. A message from the business also marks the chat as read
+    # (see chats/counters.py)
+    await db.run_sync(counters.count_message, chat, new_message)
     
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    await db.run_sync(versions.bump, current_user.id, "chats")
+    await db.commit()
+    await db.refresh(new_message)
+    hub.publish(current_user.id, "message.created", schemas.MessageResponse.model_validate(new_message))
+    hub.publish(current_user.id, "chat.updated", schemas.SyncChat.model_validate(chat))
     
     return new_message
 
@@ -262,10 +437,10 @@ class CreateChatWithMessagesRequest(BaseModel):
 
 
 @router.post("/create-with-messages", response_model=schemas.ChatResponse, status_code=status.HTTP_201_CREATED)
-def create_chat_with_messages(
+async def create_chat_with_messages(
     request_data: CreateChatWithMessagesRequest,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     POST /chats/create-with-messages - Create a chat with initial messages
@@ -283,38 +458,66 @@ def create_chat_with_messages(
         ]
     }
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Create chat
     new_chat = Chat(
-        user_id=user.id,
+        user_id=current_user.id,
         customer_name=request_data.customer_name,
         platform=request_data.platform,
         status=request_data.status,
-        last_message_date=datetime.utcnow()
+        last_message_date=datetime.utcnow(),
+        messages=[]
     )
     db.add(new_chat)
-    db.flush()  # Get the chat ID
     
-    # Add messages
+    # Add messages through the relationship so they are inserted with the chat
+    # and the response can use them without another query
     if request_data.messages:
         for i, msg_data in enumerate(request_data.messages):
             message = Message(
-                chat_id=new_chat.id,
+                user_id=current_user.id,
                 text=msg_data.get("text", ""),
                 sender=msg_data.get("sender", "them"),
                 created_at=datetime.utcnow() - timedelta(minutes=len(request_data.messages) - i)
             )
-            db.add(message)
+            new_chat.messages.append(message)
+            counters.add_message(new_chat, message.sender, message.created_at)
         
         # Set last message
         new_chat.last_message = request_data.messages[-1].get("text", "")
     
-    db.commit()
-    db.refresh(new_chat)
+    await db.run_sync(counters.record_change, None, counters.snapshot(new_chat))
+    await db.run_sync(versions.bump, current_user.id, "chats")
+    await db.commit()
+    hub.publish(current_user.id, "chat.created", schemas.SyncChat.model_validate(new_chat))
     
     return new_chat
 
+
+@router.post(
+    "/import",
+    response_model=schemas.ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=import_jobs.NDJSON_REQUEST_BODY,
+)
+async def import_chats(
+    request: Request,
+    filename: Optional[str] = Query(None, description="Original file name, shown in the job"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    POST /chats/import - Import chats and their messages from an NDJSON file
+    
+    For whole conversation histories (e.g. a WhatsApp or Facebook export).
+    Each line of the raw request body is one chat:
+    
+        {"customer_name": "Alice", "platform": "WhatsApp", "status": "read",
+         "messages": [{"text": "Hi!", "sender": "them", "created_at": "2024-05-01T10:00:00Z"}, ...]}
+    
+    The file is saved and the job returned right away; chats and messages
+    are inserted in bulk in the background, with last_message and the
+    counters set as they go (see imports/jobs.py). A rejected line is
+    reported by its line number and the other chats are still imported.
+    Returns: the job - poll GET /imports/{id} for progress and line errors
+    """
+    return await import_jobs.start(request, db, current_user.id, "chats", filename)
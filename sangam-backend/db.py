@@ -1,13 +1,223 @@
 # db.py
-from sqlalchemy import create_engine
+"""
+Database engine and session setup.
+
+Everything is configured from the environment so the same code runs on the
+local SQLite file and on a server database (PostgreSQL):
+
+    DATABASE_URL              default sqlite:///./sangam.db
+    DB_POOL_SIZE              connections kept open in the pool (default 5)
+    DB_MAX_OVERFLOW           extra connections allowed under load (default 10)
+    DB_POOL_TIMEOUT           seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE           seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING          test connections before use (default true)
+    DB_STATEMENT_CACHE_SIZE   compiled SQL statements cached per engine (default 500)
+    DB_ECHO                   log every SQL statement (default false)
+    DATABASE_READ_URL         optional read replica used by GET routes
+
+SQLite only:
+
+    SQLITE_PROFILE            "production" switches on WAL and the tuned pragmas
+                              below; "default" keeps SQLite's own settings
+    SQLITE_MMAP_SIZE          bytes of the file to memory-map (default 256MB)
+    SQLITE_CACHE_SIZE_KB      page cache per connection (default 64MB)
+    SQLITE_BUSY_TIMEOUT_MS    how long a writer waits for the lock (default 5000)
+
+GET routes use get_read_db(). On SQLite that is a separate read-only
+engine, so in WAL mode list endpoints never queue behind the single writer.
+
+The API routers use the async engines (aiosqlite / asyncpg) through
+get_async_db() and get_async_read_db(), so a request waiting on the
+database doesn't hold a threadpool thread. The sync engines remain for
+startup tasks, scripts and code run through AsyncSession.run_sync().
+"""
+
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./sangam.db"  # file will be created in sangam-backend folder
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sangam.db")  # file will be created in sangam-backend folder
+
+# Hosting providers often hand out "postgres://" URLs, which SQLAlchemy no longer accepts
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = "postgresql://" + DATABASE_URL[len("postgres://"):]
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+DB_ECHO = _env_bool("DB_ECHO", False)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default").strip().lower()
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def is_sqlite(url: str = DATABASE_URL) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url: str = DATABASE_URL) -> dict:
+    """Keyword arguments for create_engine() for the given database URL"""
+    options = {
+        "echo": DB_ECHO,
+        "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        # SQLite connections are shared across FastAPI's threadpool
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases use a single-connection pool with no sizing
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def sqlite_pragmas(read_only: bool = False, profile: str = SQLITE_PROFILE) -> list:
+    """PRAGMA statements run on every new SQLite connection"""
+    pragmas = []
+    if profile == "production":
+        if not read_only:
+            # WAL lets readers keep reading while a write is in progress
+            pragmas.append("PRAGMA journal_mode=WAL")
+        pragmas += [
+            "PRAGMA synchronous=NORMAL",  # safe with WAL, skips an fsync per commit
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+            f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",  # negative = size in KiB
+            f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def configure_sqlite(engine, read_only: bool = False, profile: str = SQLITE_PROFILE):
+    """Applies sqlite_pragmas() to every connection the engine opens"""
+    statements = sqlite_pragmas(read_only, profile)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    return engine
+
+
+def read_only_url(url: str = DATABASE_URL) -> str:
+    """
+    URL for the read engine: the replica if one is configured, otherwise
+    the same SQLite file opened in read-only mode (or the primary itself)
+    """
+    if DATABASE_READ_URL:
+        return DATABASE_READ_URL
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+        path = os.path.abspath(parsed.database)
+        return f"sqlite:///file:{path}?mode=ro&uri=true"
+    return url
+
+
+# Async driver used for each backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_url(url: str) -> str:
+    """Same database, but with the async driver"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}' databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def dialect_insert(dialect_name: str):
+    """
+    insert() of the given dialect, which has on_conflict_do_update() /
+    on_conflict_do_nothing() for upserts (SQLite and PostgreSQL only)
+    """
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    inserts = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+    if dialect_name not in inserts:
+        raise RuntimeError(f"Upserts are not supported on '{dialect_name}' databases")
+    return inserts[dialect_name]
+
+
+def begin_write(session):
+    """
+    Takes the write lock before a read-modify-write reads its rows. db is a
+    sync Session - routes call it via run_sync - and the lock is held until
+    it commits or rolls back.
+
+    On PostgreSQL the reads lock their rows themselves (SELECT ... FOR
+    UPDATE, i.e. .with_for_update()), so this does nothing. SQLite has no
+    row locks and ignores FOR UPDATE: there the transaction starts with
+    BEGIN IMMEDIATE, so a concurrent writer waits (busy timeout) until this
+    one commits and then reads the rows as this one left them.
+    """
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    # pysqlite only opens a transaction before the first write; if one is
+    # open, that write already holds the lock
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    configure_sqlite(engine)
+
+_read_url = read_only_url(DATABASE_URL)
+if _read_url == DATABASE_URL:
+    read_engine = engine
+else:
+    read_engine = create_engine(_read_url, **engine_options(_read_url))
+    if is_sqlite(_read_url):
+        configure_sqlite(read_engine, read_only=True)
+
+async_engine = create_async_engine(async_url(DATABASE_URL), **engine_options(DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    configure_sqlite(async_engine.sync_engine)
+
+if read_engine is engine:
+    async_read_engine = async_engine
+else:
+    async_read_engine = create_async_engine(async_url(_read_url), **engine_options(_read_url))
+    if is_sqlite(_read_url):
+        configure_sqlite(async_read_engine.sync_engine, read_only=True)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# expire_on_commit=False: objects are serialized after commit, and reloading
+# expired attributes would need I/O outside the session
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -17,3 +227,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for routes that only read (never commit through this one)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Async session for routes that only read"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def dispose_engines():
+    """Closes pooled async connections (called on app shutdown)"""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
@@ -0,0 +1,108 @@
+# exports.py
+"""
+Streaming CSV / NDJSON exports.
+
+The export endpoints (/orders/export, /chats/export, /catalog/export) hand
+a Core SELECT to export_response(). Rows are read with yield_per, so the
+driver fetches EXPORT_CHUNK_SIZE rows at a time from a server-side cursor,
+and each chunk is encoded and sent before the next one is fetched:
+
+- memory stays flat no matter how many rows there are
+- the header line is sent before the first query, so the download starts
+  immediately
+- with gzip=true the stream is compressed on the fly (a .gz download)
+
+The generator opens its own read session: FastAPI closes the request's
+dependencies before a streaming body is sent.
+"""
+
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, List, Literal
+
+from fastapi.responses import StreamingResponse
+
+from db import AsyncReadSessionLocal
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def stream_rows(statement, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[list]:
+    """Yields the statement's rows (as mappings) in chunks of chunk_size"""
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=chunk_size))
+        async for rows in result.mappings().partitions():
+            yield rows
+
+
+async def encode(statement, columns: List[str], fmt: ExportFormat) -> AsyncIterator[bytes]:
+    """The export body, one encoded chunk at a time"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+        async for rows in stream_rows(statement):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(row[c]) for c in columns] for row in rows)
+            yield buffer.getvalue().encode()
+    else:
+        async for rows in stream_rows(statement):
+            lines = [json.dumps({c: row[c] for c in columns}, default=_json_default) for row in rows]
+            yield ("\n".join(lines) + "\n").encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compresses a byte stream into a gzip stream chunk by chunk"""
+    compressor = zlib.compressobj(level=6, wbits=31)  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        # SYNC_FLUSH so each chunk goes out now instead of waiting in the compressor
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(statement, columns: List[str], fmt: ExportFormat, filename: str, gzip: bool = False) -> StreamingResponse:
+    """
+    StreamingResponse for an export download.
+    statement must select (at least) the given columns by name.
+    """
+    body = encode(statement, columns, fmt)
+    filename = f"{filename}.{fmt}"
+    media_type = MEDIA_TYPES[fmt]
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,10 @@
+# imports/__init__.py
+"""
+CSV imports of orders and catalog items.
+
+    jobs.py     uploads are spooled to a temporary file, then parsed,
+                validated and inserted in chunks by a background job
+    routes.py   GET /imports/ and /imports/{id} (progress and row errors)
+
+The uploads themselves are POST /orders/import and POST /catalog/import.
+"""
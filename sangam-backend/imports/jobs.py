@@ -0,0 +1,524 @@
+# imports/jobs.py
+"""
+File import jobs.
+
+POST /orders/import and POST /catalog/import take a CSV file, POST
+/chats/import an NDJSON file (one chat with its messages per line), as
+the raw request body, e.g.
+
+    curl -X POST "http://localhost:8000/orders/import?filename=orders.csv" \
+         -H "Authorization: Bearer <token>" -H "Content-Type: text/csv" \
+         --data-binary @orders.csv
+
+The body is written to a temporary file as it arrives, the header row is
+checked, and the job is returned right away (202). The import itself runs
+on a small thread pool of its own (IMPORT_WORKERS threads), outside the
+request:
+
+- the file is read line by line (CSV through csv.reader), so memory use
+  doesn't depend on the size of the file
+- every row is validated with the kind's schema (OrderImportRow /
+  CatalogItemCreate / ChatImportRow); rejected rows are stored with their
+  line number and the other rows are still imported
+- valid rows are inserted IMPORT_CHUNK_SIZE at a time with one executemany
+  INSERT. The order numbers for a chunk come from one counter update
+  (orders/numbering.py) and the analytics rollups move in the same
+  transaction
+- a chat's messages count towards the chunk size too. Chats are inserted
+  complete - last message and counters worked out in one pass over their
+  messages - and their messages follow in one more executemany INSERT, so
+  no ORM objects are built (see insert_chats())
+- each chunk is committed together with the job's progress counters, so
+  GET /imports/{id} shows how far the job is
+
+A job that fails part-way keeps the chunks committed before the failure
+(rows_inserted says how many). Columns the schema doesn't know, such as id
+or order_id in an export file, are ignored, and empty cells count as
+missing so optional fields get their defaults.
+
+Each API worker process imports the jobs uploaded to it. A job's
+heartbeat_at is refreshed by that worker: when the job is queued and
+started, with every chunk commit, and every IMPORT_HEARTBEAT_SECONDS
+while it waits in the queue (watch_jobs()). A pending or running job
+whose heartbeat is older than IMPORT_STALE_SECONDS has lost its worker (a
+crash or restart) and is marked failed by whichever worker sweeps next -
+jobs other live workers are still importing are left alone.
+
+    IMPORT_CHUNK_SIZE   rows per INSERT / commit (default 1000)
+    IMPORT_MAX_BYTES    largest accepted upload (default 1GB)
+    IMPORT_MAX_ERRORS   row errors stored per job (default 1000)
+    IMPORT_WORKERS      jobs imported at the same time (default 2)
+    IMPORT_DIR          where uploads are spooled (default: system temp dir)
+    IMPORT_HEARTBEAT_SECONDS  heartbeat and sweep interval (default 30)
+    IMPORT_STALE_SECONDS      heartbeat age at which a job is failed (default 300)
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import AsyncSessionLocal, SessionLocal
+from models import CatalogItem, Chat, ImportJob, ImportJobError, Message, Order
+from chats import counters
+from orders import analytics, numbering
+from realtime import hub
+import schemas
+import versions
+
+logger = logging.getLogger("sangam.imports")
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_DIR = os.getenv("IMPORT_DIR") or None
+IMPORT_HEARTBEAT_SECONDS = float(os.getenv("IMPORT_HEARTBEAT_SECONDS", "30"))
+IMPORT_STALE_SECONDS = float(os.getenv("IMPORT_STALE_SECONDS", "300"))
+
+# Jobs past IMPORT_WORKERS wait (status pending) instead of all competing for the writer
+_pool: Optional[ThreadPoolExecutor] = None
+
+# Ids of the jobs waiting in this process's pool (kept alive by watch_jobs())
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------------
+# Inserting validated rows
+# ----------------------------------------------------------------------------
+
+def _naive_utc(value: datetime) -> datetime:
+    """Order dates are stored as naive UTC, like datetime.utcnow()"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def insert_orders(db: Session, user_id: int, rows: List[schemas.OrderImportRow]):
+    """Inserts one chunk of orders with consecutive order numbers (caller commits)"""
+    now = datetime.utcnow()
+    first_number = numbering.reserve_order_numbers(db, user_id, len(rows))
+    values = []
+    for i, row in enumerate(rows):
+        data = row.dict()
+        data["process_status"] = data["process_status"] or "production"
+        data["order_date"] = _naive_utc(data["order_date"]) if data["order_date"] else now
+        values.append({**data, "user_id": user_id, "order_id": numbering.format_order_id(first_number + i)})
+    db.execute(insert(Order.__table__), values)
+    analytics.record_changes(db, [(None, analytics.snapshot(SimpleNamespace(**v))) for v in values])
+
+
+def insert_catalog_items(db: Session, user_id: int, rows: List[schemas.CatalogItemCreate]):
+    """Inserts one chunk of catalog items (caller commits)"""
+    db.execute(insert(CatalogItem.__table__), [{**row.dict(), "user_id": user_id} for row in rows])
+
+
+def insert_chats(db: Session, user_id: int, rows: List[schemas.ChatImportRow]):
+    """
+    Inserts one chunk of chats and all their messages (caller commits):
+    one executemany INSERT for the chats - returning their ids - and one
+    for the messages, whatever the number of each
+    """
+    now = datetime.utcnow()
+    chats, messages = [], []
+    for row in rows:
+        # Oldest first; messages without a time keep their place in the file
+        times = [_naive_utc(m.created_at) if m.created_at else now for m in row.messages]
+        ordered = sorted(zip(times, row.messages), key=lambda pair: pair[0])
+        chat = SimpleNamespace(
+            user_id=user_id, customer_name=row.customer_name, platform=row.platform, status=row.status,
+            last_message=ordered[-1][1].text if ordered else None,
+            last_message_date=ordered[-1][0] if ordered else now,
+            message_count=0, unread_count=0, last_sender=None, first_message_at=None,
+        )
+        for created_at, message in ordered:
+            counters.add_message(chat, message.sender, created_at)
+        chats.append(chat)
+        messages.append(ordered)
+
+    chat_ids = db.execute(
+        insert(Chat.__table__).returning(Chat.__table__.c.id, sort_by_parameter_order=True),
+        [vars(chat) for chat in chats],
+    ).scalars().all()
+    message_values = [
+        {"chat_id": chat_id, "user_id": user_id, "text": message.text, "sender": message.sender, "created_at": created_at}
+        for chat_id, ordered in zip(chat_ids, messages)
+        for created_at, message in ordered
+    ]
+    if message_values:
+        db.execute(insert(Message.__table__), message_values)
+    counters.record_changes(db, [(None, counters.snapshot(chat)) for chat in chats])
+
+
+# kind -> (schema each row is validated with, insert function, file format)
+IMPORTERS = {
+    "orders": (schemas.OrderImportRow, insert_orders, "csv"),
+    "catalog": (schemas.CatalogItemCreate, insert_catalog_items, "csv"),
+    "chats": (schemas.ChatImportRow, insert_chats, "ndjson"),
+}
+
+
+# ----------------------------------------------------------------------------
+# Reading the file
+# ----------------------------------------------------------------------------
+
+def read_csv(path: str) -> Iterator[Tuple[int, int, list]]:
+    """
+    (line number, bytes read so far, fields) for every record of the file,
+    the header first. Reads one line at a time; blank lines are skipped.
+    """
+    position = 0
+    line_number = 0
+
+    def lines(file):
+        nonlocal position, line_number
+        for raw in file:
+            line_number += 1
+            position += len(raw)
+            try:
+                # utf-8-sig drops the byte order mark Excel puts at the start
+                yield raw.decode("utf-8-sig" if line_number == 1 else "utf-8")
+            except UnicodeDecodeError:
+                raise ValueError(f"Line {line_number} is not UTF-8 text - save the file as CSV UTF-8") from None
+
+    with open(path, "rb") as file:
+        reader = csv.reader(lines(file))
+        last_line = 0
+        for record in reader:
+            # A quoted field can span lines - report the line the record starts on
+            start, last_line = last_line + 1, reader.line_num
+            if record:
+                yield start, position, record
+
+
+def read_ndjson(path: str) -> Iterator[Tuple[int, int, bytes]]:
+    """(line number, bytes read so far, line) for every non-blank line of the file"""
+    position = 0
+    with open(path, "rb") as file:
+        for line_number, raw in enumerate(file, start=1):
+            position += len(raw)
+            if raw.strip():
+                yield line_number, position, raw
+
+
+def read_header(path: str) -> List[str]:
+    records = read_csv(path)
+    try:
+        _, _, header = next(records, (0, 0, []))
+    finally:
+        records.close()
+    return [name.strip() for name in header]
+
+
+def check_header(kind: str, header: List[str]):
+    """400 unless the header names every required field of the kind's schema"""
+    schema, _, _ = IMPORTERS[kind]
+    missing = [name for name, field in schema.model_fields.items() if field.is_required() and name not in header]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"CSV header is missing required column(s): {', '.join(missing)}"
+        )
+
+
+def check_first_line(path: str):
+    """400 unless the first line of an NDJSON upload is a JSON object"""
+    line = next(read_ndjson(path), (0, 0, b""))[2]
+    try:
+        if isinstance(json.loads(line), dict):
+            return
+    except ValueError:
+        pass
+    raise HTTPException(status_code=400, detail="Expected NDJSON: one JSON object per line")
+
+
+def describe(error: ValidationError) -> str:
+    """The invalid fields and why, e.g. 'amount: Input should be a valid number'"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def schema_columns(schema, header: List[str]) -> List[Tuple[int, str]]:
+    """(position, field name) of the header columns the schema knows"""
+    return [(i, name) for i, name in enumerate(header) if name in schema.model_fields]
+
+
+def parse_row(schema, header: List[str], columns: List[Tuple[int, str]], record: list):
+    """Validates one CSV record; raises ValueError with the reason if it is rejected"""
+    if len(record) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, found {len(record)}")
+    values = {name: record[i] for i, name in columns if record[i].strip() != ""}
+    try:
+        return schema(**values)
+    except ValidationError as error:
+        raise ValueError(describe(error)) from None
+
+
+def parse_line(schema, line: bytes):
+    """Validates one NDJSON line; raises ValueError with the reason if it is rejected"""
+    try:
+        return schema.model_validate_json(line)
+    except ValidationError as error:
+        raise ValueError(describe(error)) from None
+
+
+# ----------------------------------------------------------------------------
+# Running a job
+# ----------------------------------------------------------------------------
+
+def _commit_chunk(db: Session, job: ImportJob, rows: list, errors: list, processed: int, position: int):
+    """Inserts a chunk's valid rows, stores its row errors and commits the progress"""
+    _, insert_rows, _ = IMPORTERS[job.kind]
+    if rows:
+        insert_rows(db, job.user_id, rows)
+        versions.bump(db, job.user_id, job.kind)  # kinds are named after their collection
+
+    room = max(IMPORT_MAX_ERRORS - job.rows_failed, 0)
+    if errors[:room]:
+        db.execute(insert(ImportJobError.__table__), [
+            {"job_id": job.id, "line": line, "message": message[:1000]}
+            for line, message in errors[:room]
+        ])
+
+    job.rows_processed += processed
+    job.rows_inserted += len(rows)
+    job.rows_failed += len(errors)
+    job.bytes_processed = position
+    job.heartbeat_at = datetime.utcnow()
+    db.commit()
+
+
+def _import(db: Session, job: ImportJob, path: str):
+    schema, _, file_format = IMPORTERS[job.kind]
+    job.status = "running"
+    job.started_at = job.heartbeat_at = datetime.utcnow()
+    db.commit()
+
+    try:
+        if file_format == "csv":
+            records = read_csv(path)
+            _, position, header = next(records)
+            header = [name.strip() for name in header]
+            columns = schema_columns(schema, header)
+            parse = lambda record: parse_row(schema, header, columns, record)
+        else:
+            records, position = read_ndjson(path), 0
+            parse = lambda line: parse_line(schema, line)
+        rows, errors, processed, size = [], [], 0, 0
+        for line, position, record in records:
+            processed += 1
+            size += 1
+            try:
+                row = parse(record)
+                rows.append(row)
+                if isinstance(row, schemas.ChatImportRow):
+                    size += len(row.messages)
+            except ValueError as error:
+                errors.append((line, str(error)))
+            if size >= IMPORT_CHUNK_SIZE:
+                _commit_chunk(db, job, rows, errors, processed, position)
+                rows, errors, processed, size = [], [], 0, 0
+        _commit_chunk(db, job, rows, errors, processed, position)
+        job.status = "completed"
+    except Exception as error:
+        db.rollback()
+        logger.exception("Import job %s failed", job.id)
+        job.status = "failed"
+        job.error = str(error) or type(error).__name__
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def run(job_id: int, path: str):
+    """Imports a job's spooled file, then deletes it (runs on the import pool)"""
+    with _queued_lock:
+        _queued.discard(job_id)
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        _import(db, job, path)
+        # Tells open dashboards to reload (published from this worker thread)
+        hub.publish(job.user_id, "import.finished", schemas.ImportJobResponse.model_validate(job))
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="sangam-import")
+    return _pool
+
+
+def shutdown_pool():
+    """Drops queued jobs (called on app shutdown; once their heartbeat is stale a sweep marks them failed)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def fail_interrupted(db: Session) -> int:
+    """
+    Marks pending/running jobs whose heartbeat is older than
+    IMPORT_STALE_SECONDS as failed - the worker that had them is gone and
+    nothing will ever pick them up again. Called on startup and by
+    keep_alive().
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS)
+    result = db.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.status.in_(("pending", "running")),
+            # Jobs from before heartbeats were recorded go by their age
+            func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff,
+        )
+        .values(status="failed", error="Interrupted - the server importing it stopped; upload the file again", finished_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount
+
+
+def keep_alive(db: Session) -> int:
+    """
+    Refreshes the heartbeat of the jobs queued in this process (running
+    jobs refresh it with every chunk), then fails abandoned ones. Returns
+    how many were failed. db is a sync Session (called via run_sync).
+    """
+    with _queued_lock:
+        queued = list(_queued)
+    if queued:
+        db.execute(
+            update(ImportJob)
+            .where(ImportJob.id.in_(queued), ImportJob.status == "pending")
+            .values(heartbeat_at=datetime.utcnow())
+        )
+    return fail_interrupted(db)
+
+
+async def watch_jobs():
+    """Runs keep_alive() every IMPORT_HEARTBEAT_SECONDS (started on startup)"""
+    while True:
+        await asyncio.sleep(IMPORT_HEARTBEAT_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(keep_alive)
+        except Exception:
+            logger.exception("Could not refresh import job heartbeats")
+
+
+# ----------------------------------------------------------------------------
+# Starting a job (called by the upload routes)
+# ----------------------------------------------------------------------------
+
+# OpenAPI descriptions of the raw request bodies, for /docs
+CSV_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"text/csv": {"schema": {"type": "string", "format": "binary"}}},
+    }
+}
+NDJSON_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}},
+    }
+}
+
+
+async def spool(request: Request, file_format: str = "csv") -> Tuple[str, int]:
+    """Writes the request body to a temporary file as it arrives; returns (path, size)"""
+    if request.headers.get("content-type", "").startswith("multipart/"):
+        content_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send the file as the raw request body (Content-Type: {content_type}), not as a form upload"
+        )
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Imports are limited to {IMPORT_MAX_BYTES} bytes"
+    )
+    if int(request.headers.get("content-length") or 0) > IMPORT_MAX_BYTES:
+        raise too_large
+
+    descriptor, path = tempfile.mkstemp(prefix="sangam-import-", suffix=f".{file_format}", dir=IMPORT_DIR)
+    size = 0
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > IMPORT_MAX_BYTES:
+                    raise too_large
+                file.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload - send the file as the request body")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size
+
+
+async def start(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    kind: str,
+    filename: Optional[str] = None,
+) -> ImportJob:
+    """Spools the upload, checks its header (first line) and queues the import job"""
+    file_format = IMPORTERS[kind][2]
+    path, size = await spool(request, file_format)
+    try:
+        if file_format == "csv":
+            check_header(kind, read_header(path))
+        else:
+            check_first_line(path)
+    except ValueError as error:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail=str(error))
+    except BaseException:
+        os.remove(path)
+        raise
+
+    now = datetime.utcnow()
+    job = ImportJob(
+        user_id=user_id,
+        kind=kind,
+        status="pending",
+        filename=filename,
+        bytes_total=size,
+        bytes_processed=0,
+        rows_processed=0,
+        rows_inserted=0,
+        rows_failed=0,
+        created_at=now,
+        heartbeat_at=now,
+    )
+    db.add(job)
+    await db.commit()
+    # Not a BackgroundTask: the request (and its metrics) ends with the response,
+    # and the job doesn't run in the request's SQL stats context
+    with _queued_lock:
+        _queued.add(job.id)
+    _get_pool().submit(run, job.id, path)
+    return job
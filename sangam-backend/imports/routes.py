@@ -0,0 +1,95 @@
+# imports/routes.py
+"""
+Import job routes - progress and errors of file imports
+
+Endpoints:
+- GET /imports - The user's recent import jobs, newest first
+- GET /imports/{job_id} - One job (poll this while it runs)
+- GET /imports/{job_id}/errors - The rows the job rejected, by line number
+
+The imports are started with POST /orders/import, POST /catalog/import
+and POST /chats/import (see imports/jobs.py).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from db import get_async_read_db
+from auth.utils import get_current_principal, Principal
+from models import ImportJob, ImportJobError
+import schemas
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+
+def jobs_query(user_id: int, limit: int):
+    """The user's most recent import jobs, newest first"""
+    return select(ImportJob).where(ImportJob.user_id == user_id).order_by(ImportJob.id.desc()).limit(limit)
+
+
+def errors_query(job_id: int, after_line: int, limit: int):
+    """A job's rejected rows after after_line, in file order"""
+    return (
+        select(ImportJobError)
+        .where(ImportJobError.job_id == job_id, ImportJobError.line > after_line)
+        .order_by(ImportJobError.line)
+        .limit(limit)
+    )
+
+
+async def _get_job(db: AsyncSession, user_id: int, job_id: int) -> ImportJob:
+    result = await db.execute(select(ImportJob).where(ImportJob.id == job_id, ImportJob.user_id == user_id))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/", response_model=List[schemas.ImportJobResponse])
+async def get_import_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /imports - The user's most recent import jobs, newest first
+    """
+    result = await db.execute(jobs_query(current_user.id, limit))
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=schemas.ImportJobResponse)
+async def get_import_job(
+    job_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /imports/{job_id} - One import job
+
+    bytes_processed / bytes_total is the progress of a running job;
+    status becomes completed or failed when it ends
+    """
+    return await _get_job(db, current_user.id, job_id)
+
+
+@router.get("/{job_id}/errors", response_model=List[schemas.ImportJobErrorResponse])
+async def get_import_job_errors(
+    job_id: int,
+    after_line: int = Query(0, ge=0, description="Only errors after this line (the last line of the previous page)"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /imports/{job_id}/errors - Rows the job rejected and why, in file order
+    """
+    await _get_job(db, current_user.id, job_id)
+    result = await db.execute(errors_query(job_id, after_line, limit))
+    return result.scalars().all()
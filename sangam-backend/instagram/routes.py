@@ -11,10 +11,13 @@ Endpoints:
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
+import time
 import requests
 from urllib.parse import urlencode
 
@@ -22,9 +25,13 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from db import get_db
-from auth.utils import get_current_user
+from db import get_async_db, get_async_read_db
+from auth.utils import get_current_principal, Principal
 from models import InstagramConnection, User, Chat, Message
+from chats import counters
+from monitoring import metrics
+from realtime import hub
+import versions
 
 router = APIRouter(prefix="/instagram", tags=["instagram"])
 
@@ -35,11 +42,46 @@ INSTAGRAM_APP_SECRET = os.getenv("INSTAGRAM_APP_SECRET", "")
 INSTAGRAM_REDIRECT_URI = os.getenv("INSTAGRAM_REDIRECT_URI", "http://localhost:8000/instagram/callback")
 FACEBOOK_API_VERSION = "v18.0"
 INSTAGRAM_API_BASE = f"https://graph.facebook.com/{FACEBOOK_API_VERSION}"
+GRAPH_API_TIMEOUT_SECONDS = float(os.getenv("GRAPH_API_TIMEOUT_SECONDS", "15"))
+
+
+def synced_chat_query(user_id: int, customer_name: str):
+    """The user's Instagram chat with a customer"""
+    return select(Chat).where(
+        Chat.user_id == user_id,
+        Chat.platform == "Instagram",
+        Chat.customer_name == customer_name
+    )
+
+
+def message_texts_query(chat_id: int):
+    """Texts of a chat's messages (to skip the ones already synced)"""
+    return select(Message.text).where(Message.chat_id == chat_id)
+
+
+async def _graph_get(url: str, params: dict, endpoint: str) -> requests.Response:
+    """
+    GET against the Graph API.
+
+    requests is blocking, so the call runs in the threadpool and the event
+    loop keeps serving other requests while we wait on Facebook.
+    Every call is timed into the Graph API latency histogram (/metrics),
+    labelled with endpoint - a fixed name per call site, never the URL,
+    which holds account and conversation ids.
+    """
+    started = time.perf_counter()
+    status_label = "error"
+    try:
+        response = await run_in_threadpool(requests.get, url, params=params, timeout=GRAPH_API_TIMEOUT_SECONDS)
+        status_label = response.status_code
+        return response
+    finally:
+        metrics.observe_graph_call(endpoint, time.perf_counter() - started, status_label)
 
 
 @router.get("/connect")
-def get_instagram_oauth_url(
-    current_user: dict = Depends(get_current_user)
+async def get_instagram_oauth_url(
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     GET /instagram/connect - Get Instagram OAuth URL
@@ -58,7 +100,7 @@ def get_instagram_oauth_url(
         "redirect_uri": INSTAGRAM_REDIRECT_URI,
         "scope": "instagram_basic,instagram_manage_messages,pages_read_engagement",
         "response_type": "code",
-        "state": current_user["username"]  # Use username as state to identify user
+        "state": current_user.username  # Use username as state to identify user
     }
     
     oauth_url = f"https://www.facebook.com/{FACEBOOK_API_VERSION}/dialog/oauth?{urlencode(params)}"
@@ -74,7 +116,7 @@ async def instagram_oauth_callback(
     code: Optional[str] = None,
     state: Optional[str] = None,
     error: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     GET /instagram/callback - OAuth callback handler
@@ -91,7 +133,8 @@ async def instagram_oauth_callback(
         raise HTTPException(status_code=400, detail="State parameter missing")
     
     # Find user by username (state)
-    user = db.query(User).filter(User.username == state).first()
+    result = await db.execute(select(User).where(User.username == state))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -105,7 +148,7 @@ async def instagram_oauth_callback(
             "code": code
         }
         
-        token_response = requests.get(token_url, params=token_params)
+        token_response = await _graph_get(token_url, params=token_params, endpoint="oauth/access_token")
         token_data = token_response.json()
         
         if "error" in token_data:
@@ -122,7 +165,7 @@ async def instagram_oauth_callback(
             "fb_exchange_token": short_lived_token
         }
         
-        long_token_response = requests.get(long_token_url, params=long_token_params)
+        long_token_response = await _graph_get(long_token_url, params=long_token_params, endpoint="oauth/access_token/long_lived")
         long_token_data = long_token_response.json()
         
         if "error" in long_token_data:
@@ -135,7 +178,7 @@ async def instagram_oauth_callback(
         
         # Get Instagram Business Account ID
         accounts_url = f"{INSTAGRAM_API_BASE}/me/accounts"
-        accounts_response = requests.get(accounts_url, params={"access_token": access_token})
+        accounts_response = await _graph_get(accounts_url, params={"access_token": access_token}, endpoint="me/accounts")
         accounts_data = accounts_response.json()
         
         if "error" in accounts_data or not accounts_data.get("data"):
@@ -155,7 +198,7 @@ async def instagram_oauth_callback(
             "fields": "instagram_business_account",
             "access_token": page_access_token
         }
-        instagram_response = requests.get(instagram_accounts_url, params=instagram_params)
+        instagram_response = await _graph_get(instagram_accounts_url, params=instagram_params, endpoint="page/instagram_business_account")
         instagram_data = instagram_response.json()
         
         if "error" in instagram_data or not instagram_data.get("instagram_business_account"):
@@ -172,7 +215,7 @@ async def instagram_oauth_callback(
             "fields": "username,name",
             "access_token": page_access_token
         }
-        ig_account_response = requests.get(ig_account_url, params=ig_account_params)
+        ig_account_response = await _graph_get(ig_account_url, params=ig_account_params, endpoint="instagram_account")
         ig_account_data = ig_account_response.json()
         
         instagram_username = ig_account_data.get("username", "")
@@ -182,9 +225,10 @@ async def instagram_oauth_callback(
         token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in) if expires_in else None
         
         # Save or update connection
-        existing_connection = db.query(InstagramConnection).filter(
+        result = await db.execute(select(InstagramConnection).where(
             InstagramConnection.user_id == user.id
-        ).first()
+        ))
+        existing_connection = result.scalars().first()
         
         if existing_connection:
             existing_connection.instagram_account_id = ig_account_id
@@ -206,7 +250,7 @@ async def instagram_oauth_callback(
             )
             db.add(new_connection)
         
-        db.commit()
+        await db.commit()
         
         return {
             "success": True,
@@ -222,21 +266,17 @@ async def instagram_oauth_callback(
 
 
 @router.get("/status")
-def get_instagram_status(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_instagram_status(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     GET /instagram/status - Check Instagram connection status
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    connection = db.query(InstagramConnection).filter(
-        InstagramConnection.user_id == user.id
-    ).first()
+    result = await db.execute(select(InstagramConnection).where(
+        InstagramConnection.user_id == current_user.id
+    ))
+    connection = result.scalars().first()
     
     if not connection:
         return {
@@ -260,24 +300,20 @@ def get_instagram_status(
 
 
 @router.post("/sync")
-def sync_instagram_messages(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def sync_instagram_messages(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     POST /instagram/sync - Manually sync Instagram messages
     
     Fetches conversations from Instagram and creates/updates chats in the database
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    connection = db.query(InstagramConnection).filter(
-        InstagramConnection.user_id == user.id,
+    result = await db.execute(select(InstagramConnection).where(
+        InstagramConnection.user_id == current_user.id,
         InstagramConnection.is_active == True
-    ).first()
+    ))
+    connection = result.scalars().first()
     
     if not connection:
         raise HTTPException(status_code=400, detail="No active Instagram connection found")
@@ -294,7 +330,7 @@ def sync_instagram_messages(
             "access_token": connection.access_token
         }
         
-        conversations_response = requests.get(conversations_url, params=conversations_params)
+        conversations_response = await _graph_get(conversations_url, params=conversations_params, endpoint="conversations")
         conversations_data = conversations_response.json()
         
         if "error" in conversations_data:
@@ -305,6 +341,8 @@ def sync_instagram_messages(
         
         conversations = conversations_data.get("data", [])
         synced_count = 0
+        chats_changed = False
+        synced_chat_ids, new_messages = set(), 0
         
         for conv in conversations:
             # Get conversation ID
@@ -319,7 +357,7 @@ def sync_instagram_messages(
                 "access_token": connection.access_token
             }
             
-            messages_response = requests.get(messages_url, params=messages_params)
+            messages_response = await _graph_get(messages_url, params=messages_params, endpoint="conversations/messages")
             messages_data = messages_response.json()
             
             if "error" in messages_data:
@@ -340,25 +378,26 @@ def sync_instagram_messages(
                         break
             
             # Find or create chat
-            chat = db.query(Chat).filter(
-                Chat.user_id == user.id,
-                Chat.platform == "Instagram",
-                Chat.customer_name == customer_name
-            ).first()
+            result = await db.execute(synced_chat_query(current_user.id, customer_name))
+            chat = result.scalars().first()
+            before = counters.snapshot(chat)
             
             if not chat:
                 chat = Chat(
-                    user_id=user.id,
+                    user_id=current_user.id,
                     customer_name=customer_name,
                     platform="Instagram",
                     status="unread",
                     last_message_date=datetime.utcnow()
                 )
                 db.add(chat)
-                db.flush()
+                await db.flush()
+                chats_changed = True
+                synced_chat_ids.add(chat.id)
             
             # Add messages (only new ones)
-            existing_message_texts = {msg.text for msg in chat.messages}
+            result = await db.execute(message_texts_query(chat.id))
+            existing_message_texts = set(result.scalars().all())
             
             for msg_data in reversed(messages_list):  # Reverse to get chronological order
                 message_text = msg_data.get("message", "")
@@ -375,16 +414,24 @@ def sync_instagram_messages(
                 if created_time_str:
                     try:
                         created_at = datetime.fromisoformat(created_time_str.replace("Z", "+00:00"))
-                    except:
+                        # Columns are naive UTC; PostgreSQL would otherwise shift
+                        # aware values into the server's timezone
+                        if created_at.tzinfo is not None:
+                            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+                    except ValueError:
                         pass
                 
                 message = Message(
                     chat_id=chat.id,
+                    user_id=current_user.id,
                     text=message_text,
                     sender=sender,
                     created_at=created_at
                 )
                 db.add(message)
+                chats_changed = True
+                synced_chat_ids.add(chat.id)
+                new_messages += 1
                 
                 # Update chat's last message
                 chat.last_message = message_text
@@ -392,11 +439,23 @@ def sync_instagram_messages(
                 if sender == "them":
                     chat.status = "unread"
             
+            if chat.id in synced_chat_ids:
+                # Synced messages can be older than the chat's newest, so
+                # recount from the messages rather than adding them up
+                await db.run_sync(counters.refresh, chat)
+                await db.run_sync(counters.record_change, before, counters.snapshot(chat))
+            
             synced_count += 1
         
         # Update last sync time
         connection.last_sync_at = datetime.utcnow()
-        db.commit()
+        if chats_changed:
+            # New chats/messages change the ETag of the chat GETs (see versions.py)
+            await db.run_sync(versions.bump, current_user.id, "chats")
+        await db.commit()
+        if chats_changed:
+            # One event for the whole sync - open dashboards reload these chats
+            hub.publish(current_user.id, "chats.synced", {"chat_ids": sorted(synced_chat_ids), "messages": new_messages})
         
         return {
             "success": True,
@@ -411,27 +470,23 @@ def sync_instagram_messages(
 
 
 @router.delete("/disconnect")
-def disconnect_instagram(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def disconnect_instagram(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     DELETE /instagram/disconnect - Disconnect Instagram account
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    connection = db.query(InstagramConnection).filter(
-        InstagramConnection.user_id == user.id
-    ).first()
+    result = await db.execute(select(InstagramConnection).where(
+        InstagramConnection.user_id == current_user.id
+    ))
+    connection = result.scalars().first()
     
     if not connection:
         raise HTTPException(status_code=404, detail="No Instagram connection found")
     
     connection.is_active = False
-    db.commit()
+    await db.commit()
     
     return {
         "success": True,
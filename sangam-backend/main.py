@@ -5,13 +5,21 @@ Main FastAPI Application - This is the entry point for the backend
 This file:
 1. Creates the FastAPI app
 2. Sets up CORS (allows frontend to make requests)
-3. Creates database tables on startup
-4. Registers all API routes (auth, orders, chats, catalog)
+3. Applies database migrations on startup
+4. Registers all API routes (auth, orders, chats, catalog, imports, sync, realtime)
 """
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from db import engine, Base
+from db import engine, SessionLocal, dispose_engines
+import migrations
+from auth import hashing, sessions
+from monitoring import sql as sql_monitor
+from monitoring.metrics import MetricsMiddleware
+from monitoring.profiling import ProfilingMiddleware
+from monitoring.routes import router as monitoring_router
 
 # Import all routers
 from auth.routes import router as auth_router
@@ -19,6 +27,11 @@ from orders.routes import router as orders_router
 from chats.routes import router as chats_router
 from catalog.routes import router as catalog_router
 from instagram.routes import router as instagram_router
+from imports.routes import router as imports_router
+from sync.routes import router as sync_router
+from realtime.routes import router as realtime_router
+from realtime import hub as realtime_hub
+from imports import jobs as import_jobs
 
 # Create the FastAPI application
 app = FastAPI(
@@ -37,12 +50,72 @@ def on_startup():
     """
     This function runs when the server starts
     
-    It creates all database tables automatically based on the models
-    If tables already exist, it won't recreate them
+    It applies any pending schema migrations (see migrations/__init__.py)
+    Migrations already applied to this database are skipped
     """
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created/verified")
+    applied = migrations.upgrade(engine)
+    print(f"✅ Database migrated ({len(applied)} new migration(s) applied)")
+
+    # Revocations must survive a restart while their access tokens are live
+    db = SessionLocal()
+    try:
+        sessions.load_revoked_sessions(db)
+        # Import jobs whose worker stopped (no recent heartbeat) will never finish
+        import_jobs.fail_interrupted(db)
+    finally:
+        db.close()
+
+
+_revocation_watcher = None
+_import_watcher = None
+
+
+@app.on_event("startup")
+async def start_revocation_watcher():
+    """Picks up sessions revoked by other workers (see auth/sessions.py)"""
+    global _revocation_watcher
+    _revocation_watcher = asyncio.create_task(sessions.watch_revocations())
+
+
+@app.on_event("startup")
+async def start_import_watcher():
+    """Keeps this worker's queued import jobs alive and fails abandoned ones (see imports/jobs.py)"""
+    global _import_watcher
+    _import_watcher = asyncio.create_task(import_jobs.watch_jobs())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Stops the password hashing worker processes and the import pool, ends live event streams, closes DB connections"""
+    if _revocation_watcher is not None:
+        _revocation_watcher.cancel()
+    if _import_watcher is not None:
+        _import_watcher.cancel()
+    hashing.shutdown_pool()
+    import_jobs.shutdown_pool()
+    realtime_hub.close()
+    await dispose_engines()
+
+
+# ============================================================================
+# SQL INSTRUMENTATION, METRICS AND PROFILING
+# ============================================================================
+
+# The middleware added last runs first, so profiling sits inside the SQL
+# timing (its captures include the request's statement count)
+
+# Runs sampled or admin-requested requests under cProfile - see
+# monitoring/profiling.py (off unless PROFILE_SAMPLE_RATE / the header is used)
+app.add_middleware(ProfilingMiddleware)
+
+# Counts statements and DB time per request (Server-Timing header),
+# logs slow queries and suspected N+1 patterns - see monitoring/sql.py
+sql_monitor.install()
+app.add_middleware(sql_monitor.SQLTimingMiddleware)
 
+# Request count/latency by route template and in-flight requests for
+# GET /metrics - see monitoring/metrics.py
+app.add_middleware(MetricsMiddleware)
 
 # ============================================================================
 # CORS SETUP (Cross-Origin Resource Sharing)
@@ -77,17 +150,23 @@ def root():
             "orders": "/docs#/orders",
             "chats": "/docs#/chats",
             "catalog": "/docs#/catalog",
-            "instagram": "/docs#/instagram"
+            "instagram": "/docs#/instagram",
+            "imports": "/docs#/imports",
+            "metrics": "/metrics"
         }
     }
 
 
 # Register all routers
 # This connects all the endpoints we created in routes.py files
-app.include_router(auth_router)      # /signup, /login, /users/me
+app.include_router(auth_router)      # /signup, /login, /token/*, /users/me
 app.include_router(orders_router)     # /orders/* (all order endpoints)
 app.include_router(chats_router)      # /chats/* (all chat endpoints)
 app.include_router(catalog_router)   # /catalog/* (all catalog endpoints)
 app.include_router(instagram_router)  # /instagram/* (Instagram integration endpoints)
+app.include_router(imports_router)    # /imports/* (CSV import job progress)
+app.include_router(sync_router)       # /sync (changes since a cursor)
+app.include_router(realtime_router)   # /ws, /events (live events)
+app.include_router(monitoring_router)  # /metrics (Prometheus), /admin/profiles
 
 # Note: The /users/me endpoint is already in auth_router, so we don't need it here
\ No newline at end of file
@@ -0,0 +1,104 @@
+# migrations/__init__.py
+"""
+Versioned schema migrations.
+
+Each vNNN_*.py module has a DESCRIPTION and an upgrade(connection) function.
+MIGRATIONS lists them in order; applied versions are recorded in the
+schema_migrations table, so each one runs exactly once per database.
+
+Migrations run automatically on startup (main.on_startup) and can also be
+run by hand:
+
+    python -m migrations            # apply pending migrations
+    python -m migrations status     # show applied / pending versions
+    python -m migrations explain    # check route queries use indexes (SQLite)
+
+To change the schema: update models.py, then add the next vNNN module and
+append it to MIGRATIONS. A migration never imports models or app code: it
+declares the tables it creates as they are at that version and does its
+backfills in its own SQL, so what it does can't change once it has shipped.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+from migrations import (
+    v001_baseline,
+    v002_query_indexes,
+    v003_order_counters,
+    v004_order_list_indexes,
+    v005_order_rollups,
+    v006_import_jobs,
+    v007_order_search,
+    v008_collection_versions,
+    v009_sync,
+    v010_message_pages,
+    v011_chat_counters,
+    v012_session_revocations,
+    v013_order_search_owner,
+    v014_import_heartbeats,
+)
+
+MIGRATIONS = [
+    (1, v001_baseline),
+    (2, v002_query_indexes),
+    (3, v003_order_counters),
+    (4, v004_order_list_indexes),
+    (5, v005_order_rollups),
+    (6, v006_import_jobs),
+    (7, v007_order_search),
+    (8, v008_collection_versions),
+    (9, v009_sync),
+    (10, v010_message_pages),
+    (11, v011_chat_counters),
+    (12, v012_session_revocations),
+    (13, v013_order_search_owner),
+    (14, v014_import_heartbeats),
+]
+
+# Kept out of models.Base so it is never part of the app's own schema
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(connection) -> set:
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine) -> list:
+    """Applies pending migrations in order, each in its own transaction"""
+    applied = []
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+
+    for version, module in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                # Only one worker migrates at a time; the others wait, then skip
+                connection.execute(text("SELECT pg_advisory_xact_lock(8251)"))
+                if version in applied_versions(connection):
+                    continue
+            module.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version,
+                description=module.DESCRIPTION,
+                applied_at=datetime.utcnow(),
+            ))
+        applied.append(version)
+    return applied
+
+
+def status(engine) -> list:
+    """(version, description, applied?) for every known migration"""
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+    return [(version, module.DESCRIPTION, version in done) for version, module in MIGRATIONS]
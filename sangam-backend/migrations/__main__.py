@@ -0,0 +1,49 @@
+# migrations/__main__.py
+"""
+Command line for the migrations:
+
+    python -m migrations             apply pending migrations
+    python -m migrations status      list applied / pending migrations
+    python -m migrations explain     check route queries use indexes (SQLite)
+
+Run from the sangam-backend folder; DATABASE_URL selects the database.
+"""
+
+import sys
+
+import migrations
+from db import engine
+
+
+def main(argv: list) -> int:
+    command = argv[0] if argv else "upgrade"
+
+    if command == "upgrade":
+        applied = migrations.upgrade(engine)
+        print(f"Applied {len(applied)} migration(s): {applied}" if applied else "Database is up to date")
+        return 0
+
+    if command == "status":
+        for version, description, applied in migrations.status(engine):
+            print(f"{version:03d}  {'applied' if applied else 'pending':8}  {description}")
+        return 0
+
+    if command == "explain":
+        from migrations import explain
+
+        migrations.upgrade(engine)
+        failed = 0
+        for route, plan, scans in explain.check(engine):
+            print(f"{'FULL SCAN' if scans else 'ok':9}  {route}")
+            for step in plan:
+                print(f"           {step}")
+            failed += bool(scans)
+        print(f"\n{failed} quer{'y' if failed == 1 else 'ies'} without an index")
+        return 1 if failed else 0
+
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,130 @@
+# migrations/explain.py
+"""
+Checks that the routes' queries are served by an index.
+
+Runs EXPLAIN QUERY PLAN (SQLite) for every list/lookup query the routes
+make and reports any step that scans a whole table instead of searching
+an index (or has to sort every matching row). The statements come from
+the routes' own query functions (orders.routes.list_query() with every
+SORT_COLUMNS entry and order_filters() filter, chats.routes.messages_query(),
+the sync feeds...), so a change to a route's query is checked as it is.
+
+Used by tests/test_query_plans.py and by `python -m migrations explain`,
+which exits non-zero if a query falls back to a full scan or sort.
+"""
+
+import inspect
+from datetime import datetime
+
+from sqlalchemy import select
+
+from catalog import routes as catalog_routes
+from chats import counters
+from chats import routes as chat_routes
+from imports import routes as import_routes
+from instagram import routes as instagram_routes
+from models import Message
+from orders import routes as order_routes
+from sync import changes as sync_changes
+
+USER_ID = 1
+SOME_DATE = datetime(2024, 1, 1)
+
+# A cursor position value for each sort column of GET /orders/
+SORT_POSITIONS = {"order_date": SOME_DATE, "amount": 10.0, "customer_name": "M"}
+
+
+def _order_filter_names() -> list:
+    """The equality filters of GET /orders/ (the order_filters() parameters)"""
+    return [name for name in inspect.signature(order_routes.order_filters).parameters if not name.startswith("date_")]
+
+
+def route_queries() -> list:
+    """(route, statement) for every query shape the routes use"""
+    queries = []
+
+    # GET /orders/ - every sort column both ways, first and next page
+    for sort, value in SORT_POSITIONS.items():
+        for order in ("desc", "asc"):
+            route = f"GET /orders/?sort={sort}&order={order}"
+            queries.append((route, order_routes.list_query(USER_ID, sort, order, []).limit(51)))
+            position = {"value": value, "id": 100}
+            queries.append((f"{route} (next page)", order_routes.list_query(USER_ID, sort, order, [], position).limit(51)))
+    queries.append(("GET /orders/?all=true", order_routes.list_query(USER_ID, "order_date", "desc", [])))
+
+    # ... and every filter, with the default sort
+    for name in _order_filter_names():
+        conditions = order_routes.order_filters(**{name: "x"})
+        route = f"GET /orders/?{name}="
+        queries.append((route, order_routes.list_query(USER_ID, "order_date", "desc", conditions).limit(51)))
+        position = {"value": SOME_DATE, "id": 100}
+        queries.append((f"{route} (next page)", order_routes.list_query(USER_ID, "order_date", "desc", conditions, position).limit(51)))
+        queries.append((f"GET /orders/export?{name}=", order_routes.export_query(USER_ID, conditions)))
+    dates = order_routes.order_filters(date_from=SOME_DATE, date_to=datetime(2024, 2, 1))
+    queries.append(("GET /orders/?date_from=&date_to=", order_routes.list_query(USER_ID, "order_date", "desc", dates).limit(51)))
+    queries.append(("GET /orders/export", order_routes.export_query(USER_ID, [])))
+    queries.append(("GET /orders/export?date_from=&date_to=", order_routes.export_query(USER_ID, dates)))
+    queries.append(("GET /orders/{id}", order_routes.owned_order(1, USER_ID)))
+
+    # Chats and messages
+    queries += [
+        ("GET /chats/", chat_routes.summary_query(USER_ID)),
+        ("GET /chats/?include_messages=true", chat_routes.chats_query(USER_ID)),
+        # What selectinload(Chat.messages) runs for the chats above
+        ("chat messages (selectinload)", select(Message).where(Message.chat_id.in_([1, 2]))),
+        ("GET /chats/counters", counters.totals_query(USER_ID)),
+        ("GET /chats/{id}", chat_routes.owned_chat(1, USER_ID)),
+        ("GET /chats/{id}/messages", chat_routes.messages_query(1, USER_ID).limit(51)),
+        ("GET /chats/{id}/messages (older page)", chat_routes.messages_query(
+            1, USER_ID, {"created_at": SOME_DATE, "id": 100}
+        ).limit(51)),
+        ("GET /chats/export", chat_routes.export_query(USER_ID)),
+        ("POST /instagram/sync (find chat)", instagram_routes.synced_chat_query(USER_ID, "x")),
+        ("POST /instagram/sync (existing messages)", instagram_routes.message_texts_query(1)),
+    ]
+
+    # Catalog and imports
+    queries += [
+        ("GET /catalog/", catalog_routes.catalog_query(USER_ID)),
+        ("GET /catalog/{id}", catalog_routes.owned_item(1, USER_ID)),
+        ("GET /catalog/export", catalog_routes.export_query(USER_ID)),
+        ("GET /imports/", import_routes.jobs_query(USER_ID, 20)),
+        ("GET /imports/{id}/errors", import_routes.errors_query(1, 0, 100)),
+    ]
+
+    # GET /sync - every feed, from the start and from a cursor
+    for name in sync_changes.FEEDS:
+        queries.append((f"GET /sync ({name})", sync_changes.feed_query(name, USER_ID, None).limit(501)))
+        queries.append((f"GET /sync ({name}, next page)", sync_changes.feed_query(name, USER_ID, (SOME_DATE, 100)).limit(501)))
+    return queries
+
+
+def query_plan(connection, statement) -> list:
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan: list) -> list:
+    """
+    Plan steps that read a whole table ("SCAN orders" rather than
+    "SEARCH ... USING INDEX"), or sort all matching rows before LIMIT
+    ("USE TEMP B-TREE FOR ORDER BY") because no index has the right order
+    """
+    return [
+        step for step in plan
+        if (step.startswith("SCAN ") and "USING" not in step) or step.startswith("USE TEMP B-TREE FOR ORDER BY")
+    ]
+
+
+def check(engine) -> list:
+    """Returns (route, plan, scans) for every route query"""
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError("The EXPLAIN check only understands SQLite query plans")
+    results = []
+    with engine.connect() as connection:
+        for route, statement in route_queries():
+            plan = query_plan(connection, statement)
+            results.append((route, plan, full_scans(plan)))
+    return results
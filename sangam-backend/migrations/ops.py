@@ -0,0 +1,63 @@
+# migrations/ops.py
+"""
+Idempotent schema operations used by the migration scripts.
+
+Databases created with the old Base.metadata.create_all() may already have
+some of these objects, so every operation checks first instead of failing.
+Migrations depend on these functions, so they must keep doing exactly what
+they do now.
+"""
+
+from sqlalchemy import Column, inspect, text
+
+
+def has_table(connection, table_name: str) -> bool:
+    return inspect(connection).has_table(table_name)
+
+
+def has_column(connection, table_name: str, column_name: str) -> bool:
+    return any(c["name"] == column_name for c in inspect(connection).get_columns(table_name))
+
+
+def create_table(connection, table):
+    """Creates a Table (and its indexes) if it doesn't exist yet"""
+    table.create(connection, checkfirst=True)
+
+
+def add_column(connection, table_name: str, column: Column):
+    """ALTER TABLE ... ADD COLUMN, skipped if the column already exists"""
+    if has_column(connection, table_name, column.name):
+        return
+    column_type = column.type.compile(dialect=connection.dialect)
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}"
+    if column.server_default is not None:
+        default = column.server_default.arg
+        default = default.text if hasattr(default, "text") else f"'{default}'"
+        ddl += f" DEFAULT {default}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    connection.execute(text(ddl))
+
+
+def create_index(connection, name: str, table_name: str, columns: list, unique: bool = False):
+    """CREATE INDEX IF NOT EXISTS (supported by SQLite and PostgreSQL)"""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    connection.execute(text(
+        f"CREATE {kind} IF NOT EXISTS {name} ON {table_name} ({', '.join(columns)})"
+    ))
+
+
+def drop_index(connection, name: str):
+    connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def app_datetime(connection, expression: str) -> str:
+    """
+    SQL for a datetime expression in the text format SQLAlchemy writes on
+    SQLite ("2024-05-01 10:00:00.000000"). CURRENT_TIMESTAMP leaves out the
+    microseconds, and the two formats sort wrongly against each other.
+    """
+    if connection.dialect.name == "sqlite":
+        # %f is seconds with milliseconds; pad to microseconds
+        return f"strftime('%Y-%m-%d %H:%M:%f', {expression}) || '000'"
+    return expression
@@ -0,0 +1,112 @@
+# migrations/v001_baseline.py
+"""
+Baseline schema - the tables the app created with Base.metadata.create_all()
+before migrations existed, frozen as they were then. Later columns and
+tables come from the migrations that introduced them. Existing databases
+are left untouched.
+"""
+
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text, func
+
+from migrations import ops
+
+DESCRIPTION = "baseline tables"
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+)
+
+orders = Table(
+    "orders", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("order_id", String, unique=True, index=True, nullable=False),
+    Column("tracking_id", String, nullable=True),
+    Column("customer_name", String, nullable=False),
+    Column("customer_contact", String, nullable=True),
+    Column("product", String, nullable=False),
+    Column("category", String, nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("payment_method", String, nullable=False),
+    Column("payment_status", String, nullable=False),
+    Column("payment_date", DateTime, nullable=True),
+    Column("delivery_status", String, nullable=False),
+    Column("source", String, nullable=False),
+    Column("process_status", String, nullable=True),
+    Column("order_date", DateTime, server_default=func.now(), nullable=False),
+    Column("note", Text, nullable=True),
+    Column("rating", Integer, nullable=True),
+)
+
+chats = Table(
+    "chats", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("customer_name", String, nullable=False),
+    Column("platform", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("last_message", Text, nullable=True),
+    Column("last_message_date", DateTime, server_default=func.now(), nullable=False),
+)
+
+messages = Table(
+    "messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("chat_id", Integer, ForeignKey("chats.id"), nullable=False),
+    Column("text", Text, nullable=False),
+    Column("sender", String, nullable=False),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+)
+
+catalog_items = Table(
+    "catalog_items", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("name", String, nullable=False),
+    Column("image_url", String, nullable=False),
+    Column("price", Float, nullable=False),
+    Column("category", String, nullable=False),
+    Column("stock", Integer, nullable=False),
+    Column("sold", Integer, nullable=False),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime, server_default=func.now(), nullable=False),
+)
+
+instagram_connections = Table(
+    "instagram_connections", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, unique=True),
+    Column("instagram_account_id", String, nullable=False),
+    Column("instagram_username", String, nullable=True),
+    Column("instagram_account_name", String, nullable=True),
+    Column("access_token", Text, nullable=False),
+    Column("token_expires_at", DateTime, nullable=True),
+    Column("is_active", Boolean, nullable=False),
+    Column("last_sync_at", DateTime, nullable=True),
+    Column("connected_at", DateTime, server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime, server_default=func.now(), nullable=False),
+)
+
+sessions = Table(
+    "sessions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("family_id", Integer, nullable=True, index=True),
+    Column("token_hash", String, nullable=False),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("revoked_at", DateTime, nullable=True),
+    Column("replaced_by_id", Integer, nullable=True),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
+
+    # Older databases were created before orders.process_status existed
+    ops.add_column(connection, "orders", Column("process_status", String, nullable=True, server_default="production"))
@@ -0,0 +1,23 @@
+# migrations/v002_query_indexes.py
+"""
+Composite indexes that match the routes' query shapes. Every query is
+scoped by user (or chat), so the scoping column leads each index and the
+sort/filter column follows it.
+"""
+
+from migrations import ops
+
+DESCRIPTION = "composite indexes for per-user queries"
+
+
+def upgrade(connection):
+    # GET /orders/ - a user's orders by date
+    ops.create_index(connection, "ix_orders_user_id_order_date", "orders", ["user_id", "order_date"])
+    # GET /chats/ - a user's chats, newest first
+    ops.create_index(connection, "ix_chats_user_id_last_message_date", "chats", ["user_id", "last_message_date"])
+    # Instagram sync - find the chat for a customer
+    ops.create_index(connection, "ix_chats_user_id_platform_customer_name", "chats", ["user_id", "platform", "customer_name"])
+    # Loading a chat's messages in order
+    ops.create_index(connection, "ix_messages_chat_id_created_at", "messages", ["chat_id", "created_at"])
+    # GET /catalog/ - a user's items, optionally by category
+    ops.create_index(connection, "ix_catalog_items_user_id_category", "catalog_items", ["user_id", "category"])
@@ -0,0 +1,60 @@
+# migrations/v003_order_counters.py
+"""
+Per-user order number counters.
+
+Creates order_counters and backfills it with the highest ORD-NNN number
+each user already has. Also replaces the global unique index on
+orders.order_id with a per-user one - every shop starts at ORD-001, so the
+old index rejected the first order of every user but one.
+"""
+
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table, text
+
+from migrations import ops
+
+DESCRIPTION = "order_counters table, per-user unique order ids"
+
+metadata = MetaData()
+
+# Only referenced by the foreign key below; not created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+order_counters = Table(
+    "order_counters", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("last_number", Integer, nullable=False),
+)
+
+
+def parse_order_number(order_id):
+    """ORD-042 -> 42; None for ids not in that format"""
+    if not order_id or not order_id.startswith("ORD-"):
+        return None
+    try:
+        return int(order_id[len("ORD-"):])
+    except ValueError:
+        return None
+
+
+def upgrade(connection):
+    ops.create_table(connection, order_counters)
+
+    # Backfill: highest parsable number per user (one pass over order ids)
+    last_numbers = {}
+    rows = connection.execution_options(yield_per=1000).execute(text("SELECT user_id, order_id FROM orders"))
+    for user_id, order_id in rows:
+        number = parse_order_number(order_id)
+        if number is not None and number > last_numbers.get(user_id, 0):
+            last_numbers[user_id] = number
+
+    existing = set(connection.execute(text("SELECT user_id FROM order_counters")).scalars())
+    new_rows = [
+        {"user_id": user_id, "last_number": number}
+        for user_id, number in last_numbers.items()
+        if user_id not in existing
+    ]
+    if new_rows:
+        connection.execute(order_counters.insert(), new_rows)
+
+    ops.drop_index(connection, "ix_orders_order_id")
+    ops.create_index(connection, "ix_orders_user_id_order_id", "orders", ["user_id", "order_id"], unique=True)
@@ -0,0 +1,29 @@
+# migrations/v004_order_list_indexes.py
+"""
+Indexes for the keyset-paginated GET /orders/.
+
+Pages continue after (sort column, id), so every sortable column gets a
+(user_id, column, id) index, and every filter gets (user_id, filter,
+order_date, id) for the default newest-first listing. The v002
+(user_id, order_date) index is a prefix of the new one and is dropped.
+"""
+
+from migrations import ops
+
+DESCRIPTION = "indexes for paginated/filtered order lists"
+
+SORT_INDEXES = {
+    "ix_orders_user_id_order_date_id": ["user_id", "order_date", "id"],
+    "ix_orders_user_id_amount_id": ["user_id", "amount", "id"],
+    "ix_orders_user_id_customer_name_id": ["user_id", "customer_name", "id"],
+}
+
+FILTER_COLUMNS = ["delivery_status", "payment_status", "process_status", "source", "category"]
+
+
+def upgrade(connection):
+    for name, columns in SORT_INDEXES.items():
+        ops.create_index(connection, name, "orders", columns)
+    for column in FILTER_COLUMNS:
+        ops.create_index(connection, f"ix_orders_user_id_{column}_order_date", "orders", ["user_id", column, "order_date", "id"])
+    ops.drop_index(connection, "ix_orders_user_id_order_date")
@@ -0,0 +1,44 @@
+# migrations/v005_order_rollups.py
+"""
+Order analytics rollups - creates order_rollups and fills it from the
+existing orders, one row per (user, day, dimensions) with the order count
+and revenue (see orders/analytics.py).
+"""
+
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, MetaData, String, Table, text
+
+from migrations import ops
+
+DESCRIPTION = "order_rollups table for /orders/analytics"
+
+DIMENSIONS = "source, category, payment_status, delivery_status"
+
+metadata = MetaData()
+
+# Only referenced by the foreign key below; not created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+order_rollups = Table(
+    "order_rollups", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("source", String, primary_key=True),
+    Column("category", String, primary_key=True),
+    Column("payment_status", String, primary_key=True),
+    Column("delivery_status", String, primary_key=True),
+    Column("order_count", Integer, nullable=False),
+    Column("revenue", Float, nullable=False),
+)
+
+
+def upgrade(connection):
+    ops.create_table(connection, order_rollups)
+
+    # SQLite stores dates as "YYYY-MM-DD" text, which date() returns
+    day = "date(order_date)" if connection.dialect.name == "sqlite" else "CAST(order_date AS DATE)"
+    connection.execute(text("DELETE FROM order_rollups"))
+    connection.execute(text(
+        f"INSERT INTO order_rollups (user_id, day, {DIMENSIONS}, order_count, revenue) "
+        f"SELECT user_id, {day}, {DIMENSIONS}, COUNT(*), COALESCE(SUM(amount), 0) FROM orders "
+        f"GROUP BY user_id, {day}, {DIMENSIONS}"
+    ))
@@ -0,0 +1,49 @@
+# migrations/v006_import_jobs.py
+"""
+CSV import jobs - creates import_jobs and import_job_errors
+(see imports/jobs.py).
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, func
+
+from migrations import ops
+
+DESCRIPTION = "import_jobs and import_job_errors tables for CSV imports"
+
+metadata = MetaData()
+
+# Only referenced by the foreign keys below; not created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+import_jobs = Table(
+    "import_jobs", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("kind", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("filename", String, nullable=True),
+    Column("bytes_total", Integer, nullable=False),
+    Column("bytes_processed", Integer, nullable=False),
+    Column("rows_processed", Integer, nullable=False),
+    Column("rows_inserted", Integer, nullable=False),
+    Column("rows_failed", Integer, nullable=False),
+    Column("error", Text, nullable=True),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+    Column("started_at", DateTime, nullable=True),
+    Column("finished_at", DateTime, nullable=True),
+    Index("ix_import_jobs_user_id_id", "user_id", "id"),
+)
+
+import_job_errors = Table(
+    "import_job_errors", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("job_id", Integer, ForeignKey("import_jobs.id"), nullable=False),
+    Column("line", Integer, nullable=False),
+    Column("message", Text, nullable=False),
+    Index("ix_import_job_errors_job_id_line", "job_id", "line"),
+)
+
+
+def upgrade(connection):
+    ops.create_table(connection, import_jobs)
+    ops.create_table(connection, import_job_errors)
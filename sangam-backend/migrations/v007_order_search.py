@@ -0,0 +1,58 @@
+# migrations/v007_order_search.py
+"""
+Order search index - creates the orders_fts FTS5 table (external content:
+the orders table) and its sync triggers, with the tokenizer picked by
+ORDER_SEARCH_TOKENIZER, and indexes the existing orders (see
+orders/search.py). SQLite only; other databases search without an index.
+"""
+
+import os
+
+from sqlalchemy import text
+
+DESCRIPTION = "orders_fts full-text index for /orders/search (SQLite)"
+
+COLUMNS = "customer_name, customer_contact, product, note, tracking_id, order_id"
+NEW_VALUES = "new.customer_name, new.customer_contact, new.product, new.note, new.tracking_id, new.order_id"
+OLD_VALUES = "old.customer_name, old.customer_contact, old.product, old.note, old.tracking_id, old.order_id"
+
+TOKENIZERS = {
+    "unicode61": "unicode61 remove_diacritics 2",
+    "trigram": "trigram",
+}
+
+
+def upgrade(connection):
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'orders_fts'"
+    )).scalar()
+    if exists is not None:
+        return
+
+    tokenizer = os.getenv("ORDER_SEARCH_TOKENIZER", "unicode61").strip().lower()
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"Unknown search tokenizer '{tokenizer}' (expected one of {', '.join(TOKENIZERS)})")
+
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE orders_fts USING fts5({COLUMNS}, "
+        f"content='orders', content_rowid='id', tokenize='{TOKENIZERS[tokenizer]}')"
+    ))
+    connection.execute(text(
+        "INSERT INTO orders_fts(orders_fts, rank) VALUES ('rank', 'bm25(5.0, 2.0, 3.0, 1.0, 10.0, 10.0)')"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_ai AFTER INSERT ON orders BEGIN "
+        f"INSERT INTO orders_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_ad AFTER DELETE ON orders BEGIN "
+        f"INSERT INTO orders_fts(orders_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_au AFTER UPDATE OF {COLUMNS} ON orders BEGIN "
+        f"INSERT INTO orders_fts(orders_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); "
+        f"INSERT INTO orders_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    ))
+    connection.execute(text("INSERT INTO orders_fts(orders_fts) VALUES ('rebuild')"))
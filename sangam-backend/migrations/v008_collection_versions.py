@@ -0,0 +1,27 @@
+# migrations/v008_collection_versions.py
+"""
+Change versions - creates collection_versions (see versions.py). Users
+without a row are at version 0.
+"""
+
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+
+from migrations import ops
+
+DESCRIPTION = "collection_versions table for ETags on GET routes"
+
+metadata = MetaData()
+
+# Only referenced by the foreign key below; not created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+collection_versions = Table(
+    "collection_versions", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("collection", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def upgrade(connection):
+    ops.create_table(connection, collection_versions)
@@ -0,0 +1,77 @@
+# migrations/v009_sync.py
+"""
+Change tracking for GET /sync - updated_at on orders, chats and messages,
+messages.user_id (copied from the chat), the tombstones table, and
+(user_id, updated_at, id) indexes.
+
+Existing rows get updated_at from the closest timestamp they have
+(order_date, last_message_date, created_at). SQLite can't add a NOT NULL
+column without a constant default, so there the new columns stay
+nullable; the app always sets them.
+
+SQLite stores datetimes as text, and CURRENT_TIMESTAMP ("2024-05-01
+10:00:00") sorts differently from the app's own values ("2024-05-01
+10:00:00.000000") at equal seconds. Backfilled values and the existing
+catalog_items.updated_at are rewritten in the app's format, so cursor
+comparisons are exact.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, text
+
+from migrations import ops
+
+DESCRIPTION = "updated_at columns and tombstones for /sync"
+
+# table -> column the backfill copies
+BACKFILL = {
+    "orders": "order_date",
+    "chats": "last_message_date",
+    "messages": "created_at",
+}
+
+metadata = MetaData()
+
+# Only referenced by the foreign key below; not created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+tombstones = Table(
+    "tombstones", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("collection", String, nullable=False),
+    Column("entity_id", Integer, nullable=False),
+    Column("deleted_at", DateTime, nullable=False),
+    Index("ix_tombstones_user_id_deleted_at_id", "user_id", "deleted_at", "id"),
+)
+
+INDEXES = {
+    "ix_orders_user_id_updated_at_id": ("orders", ["user_id", "updated_at", "id"]),
+    "ix_chats_user_id_updated_at_id": ("chats", ["user_id", "updated_at", "id"]),
+    "ix_messages_user_id_updated_at_id": ("messages", ["user_id", "updated_at", "id"]),
+    "ix_catalog_items_user_id_updated_at_id": ("catalog_items", ["user_id", "updated_at", "id"]),
+}
+
+
+def upgrade(connection):
+    for table_name, source in BACKFILL.items():
+        ops.add_column(connection, table_name, Column("updated_at", DateTime, nullable=True))
+        connection.execute(text(
+            f"UPDATE {table_name} SET updated_at = {ops.app_datetime(connection, source)} "
+            f"WHERE updated_at IS NULL"
+        ))
+
+    ops.add_column(connection, "messages", Column("user_id", Integer, nullable=True))
+    connection.execute(text(
+        "UPDATE messages SET user_id = (SELECT chats.user_id FROM chats WHERE chats.id = messages.chat_id) "
+        "WHERE user_id IS NULL"
+    ))
+
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(
+            f"UPDATE catalog_items SET updated_at = {ops.app_datetime(connection, 'updated_at')} "
+            f"WHERE length(updated_at) = 19"
+        ))
+
+    ops.create_table(connection, tombstones)
+    for name, (table_name, columns) in INDEXES.items():
+        ops.create_index(connection, name, table_name, columns)
@@ -0,0 +1,27 @@
+# migrations/v010_message_pages.py
+"""
+Index for GET /chats/{id}/messages - pages of a chat's messages continue
+after (created_at, id), newest first, so the index is (chat_id,
+created_at, id). The v002 (chat_id, created_at) index is a prefix of it
+and is dropped.
+
+On SQLite, created_at values written by CURRENT_TIMESTAMP (no
+microseconds) are rewritten in the app's format so they compare exactly
+against page cursors.
+"""
+
+from sqlalchemy import text
+
+from migrations import ops
+
+DESCRIPTION = "(chat_id, created_at, id) index for paginated chat messages"
+
+
+def upgrade(connection):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(
+            f"UPDATE messages SET created_at = {ops.app_datetime(connection, 'created_at')} "
+            f"WHERE length(created_at) = 19"
+        ))
+    ops.create_index(connection, "ix_messages_chat_id_created_at_id", "messages", ["chat_id", "created_at", "id"])
+    ops.drop_index(connection, "ix_messages_chat_id_created_at")
@@ -0,0 +1,57 @@
+# migrations/v011_chat_counters.py
+"""
+Chat counters - message_count, unread_count, last_sender and
+first_message_at on chats, and the chat_unread_counters table, all
+filled from the existing messages (see chats/counters.py).
+
+unread_count is the number of customer messages since the business last
+replied, while the chat is unread; chat_unread_counters sums the unread
+chats and their unread_count per user and platform.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, text
+
+from migrations import ops
+
+DESCRIPTION = "chat counters and chat_unread_counters for /chats/counters"
+
+metadata = MetaData()
+
+# Only referenced by the foreign key below; not created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+chat_unread_counters = Table(
+    "chat_unread_counters", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("platform", String, primary_key=True),
+    Column("unread_chats", Integer, nullable=False),
+    Column("unread_messages", Integer, nullable=False),
+)
+
+LAST_REPLY = "(SELECT MAX(r.created_at) FROM messages r WHERE r.chat_id = chats.id AND r.sender = 'me')"
+
+
+def upgrade(connection):
+    ops.add_column(connection, "chats", Column("message_count", Integer, nullable=False, server_default="0"))
+    ops.add_column(connection, "chats", Column("unread_count", Integer, nullable=False, server_default="0"))
+    ops.add_column(connection, "chats", Column("last_sender", String, nullable=True))
+    ops.add_column(connection, "chats", Column("first_message_at", DateTime, nullable=True))
+    ops.create_table(connection, chat_unread_counters)
+
+    connection.execute(text(
+        "UPDATE chats SET "
+        "message_count = (SELECT COUNT(*) FROM messages m WHERE m.chat_id = chats.id), "
+        "first_message_at = (SELECT MIN(m.created_at) FROM messages m WHERE m.chat_id = chats.id), "
+        "last_sender = (SELECT m.sender FROM messages m WHERE m.chat_id = chats.id "
+        "ORDER BY m.created_at DESC, m.id DESC LIMIT 1), "
+        "unread_count = CASE WHEN status = 'unread' THEN "
+        "(SELECT COUNT(*) FROM messages m WHERE m.chat_id = chats.id AND m.sender = 'them' "
+        f"AND ({LAST_REPLY} IS NULL OR m.created_at > {LAST_REPLY})) "
+        "ELSE 0 END"
+    ))
+    connection.execute(text("DELETE FROM chat_unread_counters"))
+    connection.execute(text(
+        "INSERT INTO chat_unread_counters (user_id, platform, unread_chats, unread_messages) "
+        "SELECT user_id, platform, COUNT(*), SUM(unread_count) FROM chats "
+        "WHERE status = 'unread' GROUP BY user_id, platform"
+    ))
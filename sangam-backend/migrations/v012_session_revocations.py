@@ -0,0 +1,13 @@
+# migrations/v012_session_revocations.py
+"""
+Index on sessions.revoked_at - every API worker polls for sessions revoked
+in the last minute or so (auth/sessions.py, watch_revocations()).
+"""
+
+from migrations import ops
+
+DESCRIPTION = "revoked_at index for the revocation sync between workers"
+
+
+def upgrade(connection):
+    ops.create_index(connection, "ix_sessions_revoked_at", "sessions", ["revoked_at"])
@@ -0,0 +1,73 @@
+# migrations/v013_order_search_owner.py
+"""
+Order search per user - rebuilds orders_fts with an owner column (the
+user's token, "u42u"), read through the orders_fts_content view, so a
+search only ranks the user's own orders, and with prefix indexes for
+unicode61 (see orders/search.py). SQLite only; keeps the index's
+tokenizer.
+"""
+
+from sqlalchemy import text
+
+DESCRIPTION = "owner column in orders_fts so searches only rank the user's orders (SQLite)"
+
+SEARCH_COLUMNS = "customer_name, customer_contact, product, note, tracking_id, order_id"
+COLUMNS = SEARCH_COLUMNS + ", owner"
+NEW_VALUES = (
+    "new.customer_name, new.customer_contact, new.product, new.note, new.tracking_id, new.order_id, "
+    "'u' || new.user_id || 'u'"
+)
+OLD_VALUES = (
+    "old.customer_name, old.customer_contact, old.product, old.note, old.tracking_id, old.order_id, "
+    "'u' || old.user_id || 'u'"
+)
+
+TOKENIZERS = {
+    "unicode61": "unicode61 remove_diacritics 2",
+    "trigram": "trigram",
+}
+
+
+def upgrade(connection):
+    if connection.dialect.name != "sqlite":
+        return
+    sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'orders_fts'"
+    )).scalar()
+    view = connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'view' AND name = 'orders_fts_content'"
+    )).scalar()
+    if sql is None or view is not None:
+        return
+    tokenizer = "trigram" if "trigram" in sql else "unicode61"
+
+    for name in ("orders_fts_ai", "orders_fts_ad", "orders_fts_au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    connection.execute(text("DROP TABLE orders_fts"))
+
+    connection.execute(text(
+        f"CREATE VIEW orders_fts_content AS SELECT id, {SEARCH_COLUMNS}, "
+        f"'u' || user_id || 'u' AS owner FROM orders"
+    ))
+    prefix = "prefix='2 3 4', " if tokenizer == "unicode61" else ""
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE orders_fts USING fts5({COLUMNS}, "
+        f"content='orders_fts_content', content_rowid='id', {prefix}tokenize='{TOKENIZERS[tokenizer]}')"
+    ))
+    connection.execute(text(
+        "INSERT INTO orders_fts(orders_fts, rank) VALUES ('rank', 'bm25(5.0, 2.0, 3.0, 1.0, 10.0, 10.0, 0.0)')"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_ai AFTER INSERT ON orders BEGIN "
+        f"INSERT INTO orders_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_ad AFTER DELETE ON orders BEGIN "
+        f"INSERT INTO orders_fts(orders_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_au AFTER UPDATE OF {SEARCH_COLUMNS}, user_id ON orders BEGIN "
+        f"INSERT INTO orders_fts(orders_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); "
+        f"INSERT INTO orders_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    ))
+    connection.execute(text("INSERT INTO orders_fts(orders_fts) VALUES ('rebuild')"))
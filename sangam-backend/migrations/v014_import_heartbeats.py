@@ -0,0 +1,17 @@
+# migrations/v014_import_heartbeats.py
+"""
+Import job heartbeats - import_jobs.heartbeat_at, refreshed by the worker
+process that has the job, so a worker starting up only fails the jobs of
+workers that are gone (see imports/jobs.py).
+"""
+
+from sqlalchemy import Column, DateTime
+
+from migrations import ops
+
+DESCRIPTION = "heartbeat_at on import_jobs so only abandoned jobs are failed"
+
+
+def upgrade(connection):
+    ops.add_column(connection, "import_jobs", Column("heartbeat_at", DateTime, nullable=True))
+    ops.create_index(connection, "ix_import_jobs_status_heartbeat_at", "import_jobs", ["status", "heartbeat_at"])
@@ -10,7 +10,9 @@ SQLAlchemy uses these models to:
 2. Query data easily
 3. Handle relationships between tables
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
@@ -49,7 +51,7 @@ class Order(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Order identification
-    order_id = Column(String, unique=True, index=True, nullable=False)  # e.g., "ORD-001"
+    order_id = Column(String, nullable=False)  # e.g., "ORD-001" - unique per user
     tracking_id = Column(String, nullable=True)  # Shipping tracking number
     
     # Customer information
@@ -78,8 +80,104 @@ class Order(Base):
     note = Column(Text, nullable=True)  # Optional notes about the order
     rating = Column(Integer, nullable=True)  # Customer rating (1-5)
     
+    # Last change - GET /sync sends the orders changed since a cursor
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
     # Relationship: link back to the user who owns this order
     user = relationship("User", back_populates="orders")
+    
+    # Composite indexes matching how orders are queried (always per user).
+    # GET /orders/ pages by (sort column, id), so each sort column has one,
+    # and each filter has one in the default newest-first order.
+    __table_args__ = (
+        Index("ix_orders_user_id_order_date_id", "user_id", "order_date", "id"),
+        Index("ix_orders_user_id_amount_id", "user_id", "amount", "id"),
+        Index("ix_orders_user_id_customer_name_id", "user_id", "customer_name", "id"),
+        Index("ix_orders_user_id_delivery_status_order_date", "user_id", "delivery_status", "order_date", "id"),
+        Index("ix_orders_user_id_payment_status_order_date", "user_id", "payment_status", "order_date", "id"),
+        Index("ix_orders_user_id_process_status_order_date", "user_id", "process_status", "order_date", "id"),
+        Index("ix_orders_user_id_source_order_date", "user_id", "source", "order_date", "id"),
+        Index("ix_orders_user_id_category_order_date", "user_id", "category", "order_date", "id"),
+        # Each shop numbers its own orders, so ORD-001 exists once per user
+        Index("ix_orders_user_id_order_id", "user_id", "order_id", unique=True),
+        # GET /sync: the user's orders in change order
+        Index("ix_orders_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
+
+
+class OrderCounter(Base):
+    """
+    OrderCounter model - the last order number handed out per user
+
+    Creating an order advances this row in the same transaction as the
+    insert (see orders/numbering.py), so the next "ORD-NNN" costs one
+    statement instead of scanning all of the user's orders, and two
+    concurrent creates can never get the same number.
+    """
+    __tablename__ = "order_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_number = Column(Integer, nullable=False, default=0)
+
+
+class OrderRollup(Base):
+    """
+    OrderRollup model - order count and revenue per user, day and dimension
+
+    One row per (user, day, source, category, payment_status,
+    delivery_status) combination that has orders. Kept up to date by the
+    order routes (see orders/analytics.py), so /orders/analytics reads a
+    handful of pre-aggregated rows instead of every order.
+    """
+    __tablename__ = "order_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    source = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    payment_status = Column(String, primary_key=True)
+    delivery_status = Column(String, primary_key=True)
+
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)  # sum of order amounts
+
+
+class CollectionVersion(Base):
+    """
+    CollectionVersion model - a change counter per user and collection
+
+    collection is "orders", "chats" (chats and their messages) or
+    "catalog". Every write advances the counter in the same transaction
+    (see versions.py), and GET routes derive their ETag from it, so an
+    unchanged list is answered with 304 without loading any rows.
+    """
+    __tablename__ = "collection_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """
+    Tombstone model - records that a row was deleted
+
+    Deleted rows can't show up in a "changed since" query, so every delete
+    path leaves a tombstone and GET /sync sends them to clients as
+    deletions. collection is "orders", "chats" or "catalog"; deleting a
+    chat also removes its messages, which clients drop with the chat.
+    """
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    collection = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)  # id of the deleted row
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_user_id_deleted_at_id", "user_id", "deleted_at", "id"),
+    )
 
 
 class Chat(Base):
@@ -103,9 +201,47 @@ class Chat(Base):
     last_message = Column(Text, nullable=True)
     last_message_date = Column(DateTime, server_default=func.now(), nullable=False)
     
+    # Last change to the chat itself (its messages have their own)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Counters kept up to date on every write (see chats/counters.py), so
+    # badges and counts never need the messages
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Customer messages since the business last replied (0 while the chat is read)
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_sender = Column(String, nullable=True)  # sender of the newest message: "me" or "them"
+    first_message_at = Column(DateTime, nullable=True)
+    
     # Relationship: one chat has many messages
     messages = relationship("Message", back_populates="chat", cascade="all, delete-orphan")
     user = relationship("User", back_populates="chats")
+    
+    __table_args__ = (
+        # Chat list: user's chats, newest first
+        Index("ix_chats_user_id_last_message_date", "user_id", "last_message_date"),
+        # Instagram sync: find an existing chat with a customer
+        Index("ix_chats_user_id_platform_customer_name", "user_id", "platform", "customer_name"),
+        # GET /sync: the user's chats in change order
+        Index("ix_chats_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
+
+
+class ChatUnreadCounter(Base):
+    """
+    ChatUnreadCounter model - unread chats and messages per user and platform
+
+    The sum of the user's chats' unread counts, adjusted in the same
+    transaction as every chat write (see chats/counters.py), so the unread
+    badges (GET /chats/counters) are a read of a few rows however many
+    chats there are.
+    """
+    __tablename__ = "chat_unread_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    platform = Column(String, primary_key=True)
+
+    unread_chats = Column(Integer, nullable=False, default=0)  # chats with status "unread"
+    unread_messages = Column(Integer, nullable=False, default=0)  # their unread_count, summed
 
 
 class Message(Base):
@@ -118,16 +254,29 @@ class Message(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     chat_id = Column(Integer, ForeignKey("chats.id"), nullable=False)
+    # Owner of the chat, copied here so per-user message queries (GET /sync)
+    # don't have to go through chats
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Message content
     text = Column(Text, nullable=False)
     sender = Column(String, nullable=False)  # "me" (business) or "them" (customer)
     
-    # Timestamp - automatically set when message is created
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    # Timestamp - automatically set when message is created (in Python, so
+    # SQLite stores one text format and page cursors compare exactly)
+    created_at = Column(DateTime, server_default=func.now(), default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationship: link back to the chat this message belongs to
     chat = relationship("Chat", back_populates="messages")
+    
+    __table_args__ = (
+        # Messages of a chat in time order (GET /chats/{id}/messages pages by
+        # (created_at, id))
+        Index("ix_messages_chat_id_created_at_id", "chat_id", "created_at", "id"),
+        # GET /sync: the user's messages in change order
+        Index("ix_messages_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
 
 
 class CatalogItem(Base):
@@ -154,10 +303,19 @@ class CatalogItem(Base):
     
     # Timestamps
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    # Set in Python rather than by the database, so on SQLite every value has
+    # the same text format and sorts correctly against GET /sync cursors
+    updated_at = Column(DateTime, server_default=func.now(), default=datetime.utcnow,
+                        onupdate=datetime.utcnow, nullable=False)
     
     # Relationship: link back to the user who owns this catalog item
     user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_catalog_items_user_id_category", "user_id", "category"),
+        # GET /sync: the user's items in change order
+        Index("ix_catalog_items_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
 
 
 class InstagramConnection(Base):
@@ -191,3 +349,89 @@ class InstagramConnection(Base):
     
     # Relationship: link back to the user
     user = relationship("User")
+
+
+class UserSession(Base):
+    """
+    UserSession model - one row per issued refresh token
+
+    The refresh token handed to the client is "<session id>.<secret>".
+    Only an HMAC of the secret is stored, so a refresh costs one primary
+    key lookup plus one HMAC - never a bcrypt check.
+
+    Every refresh rotates the token: the old row points at its replacement
+    via replaced_by_id, and all rows from the same login share a family_id
+    so a reused (stolen) token can revoke the whole chain.
+    """
+    __tablename__ = "sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(Integer, nullable=True, index=True)  # id of the first session of this login
+
+    token_hash = Column(String, nullable=False)  # HMAC-SHA256 of the secret part
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True, index=True)  # set on logout or reuse detection
+    replaced_by_id = Column(Integer, nullable=True)  # set when rotated
+
+    # Relationship: link back to the user
+    user = relationship("User")
+
+
+class ImportJob(Base):
+    """
+    ImportJob model - one file import (POST /orders/import, /catalog/import,
+    /chats/import)
+
+    The upload is saved to a temporary file and imported in the background
+    (see imports/jobs.py). The counters are updated after every chunk, so
+    GET /imports/{id} shows the progress while the job runs.
+    """
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # orders, catalog, chats
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    filename = Column(String, nullable=True)
+
+    bytes_total = Column(Integer, nullable=False, default=0)  # size of the uploaded file
+    bytes_processed = Column(Integer, nullable=False, default=0)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)  # why the whole job failed, if it did
+
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Last sign of life from the worker process that has the job; jobs whose
+    # worker went away are failed once it is too old
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_import_jobs_user_id_id", "user_id", "id"),
+        # Sweep for pending/running jobs without a recent heartbeat
+        Index("ix_import_jobs_status_heartbeat_at", "status", "heartbeat_at"),
+    )
+
+
+class ImportJobError(Base):
+    """
+    ImportJobError model - a row (CSV record or NDJSON line) rejected by an import
+
+    line is the line number in the uploaded file (the header is line 1).
+    Only the first IMPORT_MAX_ERRORS errors of a job are stored; the job's
+    rows_failed counts all of them.
+    """
+    __tablename__ = "import_job_errors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("import_jobs.id"), nullable=False)
+    line = Column(Integer, nullable=False)
+    message = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_import_job_errors_job_id_line", "job_id", "line"),
+    )
@@ -0,0 +1,10 @@
+# monitoring/__init__.py
+"""
+Request and database instrumentation.
+
+    sql.py        per-request SQL statement counts, N+1 detection, slow-query
+                  log and the Server-Timing response header
+    metrics.py    Prometheus counters/gauges/histograms and the request middleware
+    profiling.py  opt-in cProfile captures of sampled / admin-requested requests
+    routes.py     GET /metrics, /admin/profiles
+"""
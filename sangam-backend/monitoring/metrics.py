@@ -0,0 +1,333 @@
+# monitoring/metrics.py
+"""
+Prometheus metrics without an extra dependency.
+
+A small registry of counters, gauges and histograms rendered in the
+Prometheus text format by GET /metrics (monitoring/routes.py):
+
+    sangam_http_requests_total{method,route,status}
+    sangam_http_request_duration_seconds{method,route,status}   histogram
+    sangam_http_requests_in_flight
+    sangam_threadpool_threads_busy / _threads_total / _queue_depth
+    sangam_password_hash_queue_depth
+    sangam_token_cache_hits_total / _misses_total / _entries
+    sangam_db_pool_checked_out / _overflow / _size{engine}
+    sangam_realtime_connections / _events_total{type} / _resyncs_total
+    sangam_graph_api_request_duration_seconds{endpoint,status}  histogram
+
+Requests are labelled by route template ("/orders/{order_id}"), never by
+the raw path, so the number of series stays bounded.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, List
+
+# Prometheus' default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GRAPH_API_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, key, "", value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels):
+        """For a count kept elsewhere (e.g. a cache's hits), sampled by a collector"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # per-bucket counts (non-cumulative, last one is +Inf), sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+                samples.append((f"{self.name}_sum", key, "", total))
+                samples.append((f"{self.name}_count", key, "", cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []  # called before rendering to refresh sampled gauges
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "sangam_http_requests_total", "HTTP requests handled",
+    ("method", "route", "status"),
+))
+http_request_duration = registry.register(Histogram(
+    "sangam_http_request_duration_seconds", "Time to handle an HTTP request",
+    ("method", "route", "status"),
+))
+http_in_flight = registry.register(Gauge(
+    "sangam_http_requests_in_flight", "HTTP requests currently being handled",
+))
+threadpool_busy = registry.register(Gauge(
+    "sangam_threadpool_threads_busy", "Worker threads running sync routes/dependencies",
+))
+threadpool_total = registry.register(Gauge(
+    "sangam_threadpool_threads_total", "Worker thread limit",
+))
+threadpool_queue = registry.register(Gauge(
+    "sangam_threadpool_queue_depth", "Calls waiting for a free worker thread",
+))
+password_hash_queue = registry.register(Gauge(
+    "sangam_password_hash_queue_depth", "Password hashing jobs running or waiting",
+))
+token_cache_hits = registry.register(Counter(
+    "sangam_token_cache_hits_total", "Access tokens found in the verified-token cache (no JWT decode)",
+))
+token_cache_misses = registry.register(Counter(
+    "sangam_token_cache_misses_total", "Access tokens not in the verified-token cache (decoded and verified)",
+))
+token_cache_entries = registry.register(Gauge(
+    "sangam_token_cache_entries", "Verified tokens currently cached",
+))
+db_pool_checked_out = registry.register(Gauge(
+    "sangam_db_pool_checked_out", "Connections currently checked out of the pool",
+    ("engine",),
+))
+db_pool_overflow = registry.register(Gauge(
+    "sangam_db_pool_overflow", "Connections open beyond pool_size (negative while the pool is filling)",
+    ("engine",),
+))
+db_pool_size = registry.register(Gauge(
+    "sangam_db_pool_size", "Configured pool_size",
+    ("engine",),
+))
+realtime_connections = registry.register(Gauge(
+    "sangam_realtime_connections", "Open /ws and /events connections",
+))
+realtime_events_total = registry.register(Counter(
+    "sangam_realtime_events_total", "Live events published",
+    ("type",),
+))
+realtime_resyncs_total = registry.register(Counter(
+    "sangam_realtime_resyncs_total", "Events dropped for a slow connection (replaced by a resync event)",
+))
+graph_api_duration = registry.register(Histogram(
+    "sangam_graph_api_request_duration_seconds", "Outbound Facebook Graph API calls",
+    ("endpoint", "status"),
+    buckets=GRAPH_API_BUCKETS,
+))
+
+
+# ----------------------------------------------------------------------------
+# Sampled gauges
+# ----------------------------------------------------------------------------
+
+def _collect_threadpool():
+    from anyio import to_thread
+
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        return  # not inside an event loop
+    stats = limiter.statistics()
+    threadpool_busy.set(stats.borrowed_tokens)
+    threadpool_total.set(stats.total_tokens)
+    threadpool_queue.set(stats.tasks_waiting)
+
+
+def _collect_password_hashing():
+    from auth import hashing
+
+    password_hash_queue.set(hashing.queue_depth())
+
+
+def _collect_token_cache():
+    from auth import utils
+
+    stats = utils.token_cache_stats()
+    token_cache_hits.set_total(stats["hits"])
+    token_cache_misses.set_total(stats["misses"])
+    token_cache_entries.set(stats["size"])
+
+
+def _collect_db_pools():
+    import db
+
+    engines = {
+        "primary": db.engine,
+        "read": db.read_engine,
+        "async": db.async_engine.sync_engine,
+        "async_read": db.async_read_engine.sync_engine,
+    }
+    seen = set()
+    for label, engine in engines.items():
+        pool = engine.pool
+        if id(pool) in seen:
+            continue  # read engine is the primary when there is no replica
+        seen.add(id(pool))
+        # Only QueuePool-style pools have sizing; SQLite :memory: pools don't
+        for gauge, attribute in ((db_pool_checked_out, "checkedout"), (db_pool_overflow, "overflow"), (db_pool_size, "size")):
+            if hasattr(pool, attribute):
+                gauge.set(getattr(pool, attribute)(), engine=label)
+
+
+def _collect_realtime():
+    from realtime import hub
+
+    realtime_connections.set(hub.connection_count())
+
+
+registry.add_collector(_collect_threadpool)
+registry.add_collector(_collect_password_hashing)
+registry.add_collector(_collect_token_cache)
+registry.add_collector(_collect_db_pools)
+registry.add_collector(_collect_realtime)
+
+
+# ----------------------------------------------------------------------------
+# Graph API timing
+# ----------------------------------------------------------------------------
+
+def observe_graph_call(endpoint: str, seconds: float, status):
+    """
+    endpoint is a fixed name chosen by the caller ("conversations/messages"),
+    not derived from the URL - Graph API ids are opaque strings, and one
+    label value per conversation would grow without bound
+    """
+    graph_api_duration.observe(seconds, endpoint=endpoint, status=str(status))
+
+
+# ----------------------------------------------------------------------------
+# ASGI middleware
+# ----------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """Counts and times every HTTP request by route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500  # if the app raises before responding
+        http_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", "unmatched"),
+                "status": str(status),
+            }
+            http_requests_total.inc(**labels)
+            http_request_duration.observe(time.perf_counter() - started, **labels)
@@ -0,0 +1,171 @@
+# monitoring/profiling.py
+"""
+Opt-in request profiling for production traffic.
+
+A request is profiled when either
+- it is picked by sampling (PROFILE_SAMPLE_RATE, e.g. 0.01 = 1% of requests), or
+- it carries the X-Sangam-Profile: 1 header AND a bearer token of an admin
+  (SANGAM_ADMIN_USERS) - so an admin can reproduce a tenant's slow page.
+
+Profiled requests run under cProfile. Each capture is saved in PROFILE_DIR
+as <id>.prof (pstats format - open with snakeviz, or turn into a flamegraph
+with flameprof / gprof2dot) plus <id>.json with the route, user id, status,
+duration and SQL statement count. Admins list and download them through
+/admin/profiles (monitoring/routes.py). Only the newest PROFILE_MAX_FILES
+captures are kept.
+
+cProfile follows the event loop thread, so while a request is profiled any
+other coroutine running at the same time also shows up in its profile. Only
+one request is profiled at a time; others are simply not sampled meanwhile.
+
+    PROFILE_SAMPLE_RATE   fraction of requests to profile (default 0 = off)
+    PROFILE_DIR           where captures are stored (default ./profiles)
+    PROFILE_MAX_FILES     captures kept (default 200)
+"""
+
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from auth import utils
+from monitoring import sql as sql_monitor
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_HEADER = b"x-sangam-profile"
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+# cProfile hooks the whole thread, so profiles must not overlap
+_active = threading.Lock()
+
+
+def _bearer_claims(headers: dict) -> Optional[dict]:
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return utils.claims_from_token(token)
+
+
+def _requested(headers: dict, claims: Optional[dict]) -> bool:
+    """True if the request asks to be profiled and is allowed to"""
+    return headers.get(PROFILE_HEADER, b"") in (b"1", b"true") and utils.is_admin(claims)
+
+
+def profile_path(profile_id: str, extension: str) -> Optional[str]:
+    """File of a capture, or None if the id isn't a valid capture id"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{extension}")
+
+
+def _save(profiler: cProfile.Profile, info: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(profile_path(info["id"], "prof"))
+    with open(profile_path(info["id"], "json"), "w") as f:
+        json.dump(info, f)
+    _prune()
+
+
+def _prune():
+    captures = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in captures[:-PROFILE_MAX_FILES] if PROFILE_MAX_FILES > 0 else []:
+        profile_id = name[:-len(".json")]
+        for extension in ("json", "prof"):
+            try:
+                os.remove(profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit: int = 100) -> List[dict]:
+    """Metadata of stored captures, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # being written or pruned right now
+    return profiles
+
+
+class ProfilingMiddleware:
+    """
+    Runs sampled / admin-requested HTTP requests under cProfile.
+    Must sit inside SQLTimingMiddleware so the SQL count is available.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        claims = None
+        if PROFILE_HEADER in headers:
+            claims = _bearer_claims(headers)
+            wanted = _requested(headers, claims)
+        else:
+            wanted = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+        if not wanted or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                profiler.disable()
+        finally:
+            _active.release()
+
+        if claims is None:
+            claims = _bearer_claims(headers)
+        stats = sql_monitor.current_stats()
+        route = scope.get("route")
+        info = {
+            "id": profile_id,
+            "captured_at": datetime.utcnow().isoformat(),
+            "method": scope["method"],
+            "route": getattr(route, "path", "unmatched"),
+            "path": scope["path"],
+            "status": status,
+            "user_id": claims.get("user_id") if claims else None,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "sql_count": stats.count if stats is not None else None,
+            "sql_ms": round(stats.duration * 1000, 2) if stats is not None else None,
+            "trigger": "header" if PROFILE_HEADER in headers else "sample",
+        }
+        await run_in_threadpool(_save, profiler, info)
@@ -0,0 +1,61 @@
+# monitoring/routes.py
+"""
+Monitoring endpoints.
+
+GET /metrics is scraped by Prometheus. Set METRICS_TOKEN to require
+`Authorization: Bearer <token>` on it (configure the same token as the
+scrape job's bearer_token).
+
+/admin/profiles lists and downloads request profiles captured by
+monitoring/profiling.py. Admin users only (SANGAM_ADMIN_USERS).
+"""
+
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from auth.utils import get_current_admin, Principal
+from monitoring import metrics, profiling
+
+router = APIRouter(tags=["monitoring"])
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: str = Header(default="")):
+    """GET /metrics - Prometheus text format"""
+    if METRICS_TOKEN and not hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/admin/profiles")
+async def get_profiles(
+    limit: int = Query(100, ge=1, le=1000),
+    admin: Principal = Depends(get_current_admin)
+):
+    """
+    GET /admin/profiles - Captured request profiles, newest first
+
+    Each entry has the id, route, user id, status, duration and SQL count.
+    """
+    return profiling.list_profiles(limit)
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    admin: Principal = Depends(get_current_admin)
+):
+    """
+    GET /admin/profiles/{profile_id} - Download one capture (.prof, pstats format)
+
+    View with `snakeviz <file>.prof` or `python -m pstats <file>.prof`.
+    """
+    path = profiling.profile_path(profile_id, "prof")
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
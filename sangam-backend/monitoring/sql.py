@@ -0,0 +1,195 @@
+# monitoring/sql.py
+"""
+Per-request SQL instrumentation.
+
+Engine events time every statement. While a request is being handled the
+statements are also added to that request's RequestStats (held in a
+context variable, so it follows the request into the threadpool and into
+SQLAlchemy's async greenlets). When the response starts:
+
+- the count and total DB time go out in a Server-Timing header, e.g.
+  `Server-Timing: db;dur=4.2;desc="3 queries", app;dur=11.8`
+  (visible in the browser devtools Timing tab)
+- a statement shape seen N_PLUS_ONE_THRESHOLD or more times in one request
+  is logged as a suspected N+1 (one query per row instead of one query)
+
+Independently of requests, any statement slower than SLOW_QUERY_MS is
+written to the slow-query log.
+
+    SQL_INSTRUMENTATION     switch the whole thing on/off (default true)
+    SLOW_QUERY_MS           slow-query threshold in ms (default 200)
+    SLOW_QUERY_LOG          file for the slow-query / N+1 log (default stderr)
+    N_PLUS_ONE_THRESHOLD    repeats of one statement shape per request (default 5)
+    SERVER_TIMING           add the Server-Timing header (default true)
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+SQL_INSTRUMENTATION = _env_bool("SQL_INSTRUMENTATION", True)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SERVER_TIMING = _env_bool("SERVER_TIMING", True)
+
+logger = logging.getLogger("sangam.sql")
+
+
+class RequestStats:
+    """SQL statements issued while handling one request"""
+
+    __slots__ = ("route", "count", "duration", "shapes")
+
+    def __init__(self, route: str = ""):
+        self.route = route
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list:
+        """(shape, count) for statement shapes repeated at least threshold times"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("sql_request_stats", default=None)
+
+# Placeholder styles of the drivers we use: ? (sqlite), %(name)s (psycopg2), $1 (asyncpg)
+_PARAM = re.compile(r"\?|%\(\w+\)s|\$\d+")
+_PARAM_LIST = re.compile(r"\?(\s*,\s*\?)+")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Statement with parameters and literals normalized, so the same query
+    with different values (or IN lists of different length) compares equal
+    """
+    shape = _PARAM.sub("?", statement)
+    shape = _PARAM_LIST.sub("?", shape)
+    shape = _NUMBER.sub("N", shape)
+    return " ".join(shape.split())
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def start_request(route: str = ""):
+    """Starts collecting for the current context; returns a token for end_request()"""
+    return _current.set(RequestStats(route))
+
+
+def end_request(token) -> RequestStats:
+    stats = _current.get()
+    _current.reset(token)
+    for shape, n in stats.repeated():
+        logger.warning("N+1 suspected: %s ran the same statement %d times: %s", stats.route, n, shape[:300])
+    return stats
+
+
+# ----------------------------------------------------------------------------
+# Engine events
+# ----------------------------------------------------------------------------
+
+# The start time lives on the statement's execution context, not on the
+# connection: a statement that fails never reaches after_cursor_execute, and
+# its start time then goes away with the context instead of staying behind
+# on a pooled connection
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._sangam_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_sangam_started", None)
+    if started is None:
+        return  # instrumentation was installed while the statement ran
+    duration = time.perf_counter() - started
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+    if duration * 1000 >= SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "-"
+        logger.warning("Slow query (%.1f ms) in %s: %s", duration * 1000, route, " ".join(statement.split())[:1000])
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(SLOW_QUERY_LOG) if SLOW_QUERY_LOG else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def install():
+    """Times statements on every engine (sync engines and the ones behind async engines)"""
+    if not SQL_INSTRUMENTATION or event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    _configure_logger()
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ----------------------------------------------------------------------------
+# ASGI middleware
+# ----------------------------------------------------------------------------
+
+def server_timing(stats: RequestStats, elapsed: float) -> str:
+    return (
+        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} quer{"y" if stats.count == 1 else "ies"}", '
+        f"app;dur={elapsed * 1000:.1f}"
+    )
+
+
+class SQLTimingMiddleware:
+    """
+    Collects RequestStats for each HTTP request and adds the Server-Timing
+    header. Plain ASGI (not BaseHTTPMiddleware) so the context variable set
+    here is the one the endpoint sees.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = start_request(f"{scope['method']} {scope['path']}")
+        stats = _current.get()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and SERVER_TIMING:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request(token)
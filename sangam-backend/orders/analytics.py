@@ -0,0 +1,265 @@
+# orders/analytics.py
+"""
+Order analytics rollups.
+
+order_rollups holds the order count and revenue for every (user, day,
+source, category, payment_status, delivery_status) combination. The order
+routes apply a +1 / -1 delta here in the same transaction as each insert,
+update or delete, so GET /orders/analytics aggregates at most one row per
+day and dimension value - the cost doesn't grow with the number of orders.
+
+If the rollups ever drift from the orders table (a bug, a manual edit),
+recompute them from scratch:
+
+    python -m orders.analytics check      # report drift, exit 1 if any
+    python -m orders.analytics rebuild    # recompute and replace
+"""
+
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import bindparam, delete, func, select
+
+from db import dialect_insert
+from models import Order, OrderRollup
+
+DIMENSIONS = ("source", "category", "payment_status", "delivery_status")
+
+# Differences below this are float rounding, not drift
+REVENUE_TOLERANCE = 0.01
+
+
+def snapshot(order) -> Optional[dict]:
+    """The fields of an order that decide its rollup row and contribution"""
+    if order is None:
+        return None
+    order_date = order.order_date or datetime.utcnow()
+    return {
+        "user_id": order.user_id,
+        "day": order_date.date(),
+        "source": order.source,
+        "category": order.category,
+        "payment_status": order.payment_status,
+        "delivery_status": order.delivery_status,
+        "amount": order.amount or 0.0,
+    }
+
+
+def _key(values: dict) -> tuple:
+    return (values["user_id"], values["day"]) + tuple(values[d] for d in DIMENSIONS)
+
+
+def _dialect_name(db) -> str:
+    # db is a Session (routes, import jobs) or a Connection (commands, migrations)
+    return (db.get_bind().dialect if hasattr(db, "get_bind") else db.dialect).name
+
+
+def _upsert(dialect_name: str):
+    """INSERT a rollup row, or add its count/revenue to the existing one"""
+    table = OrderRollup.__table__
+    statement = dialect_insert(dialect_name)(table)
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            "order_count": table.c.order_count + statement.excluded.order_count,
+            "revenue": table.c.revenue + statement.excluded.revenue,
+        },
+    )
+
+
+# Removes a rollup row whose orders are all gone
+_delete_empty = delete(OrderRollup.__table__).where(
+    *(OrderRollup.__table__.c[name] == bindparam(f"key_{name}") for name in ("user_id", "day") + DIMENSIONS),
+    OrderRollup.__table__.c.order_count <= 0,
+)
+
+
+def record_changes(db, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Applies (before, after) snapshot pairs to the rollups: (None, new) for a
+    created order, (old, new) for an update, (old, None) for a delete.
+    Deltas for the same row are merged first, and all rows go in one
+    executemany upsert (plus one executemany delete if any count went
+    down), so a batch costs at most two statements. The caller commits.
+    """
+    deltas = defaultdict(lambda: [0, 0.0])
+    for before, after in changes:
+        if before is not None:
+            delta = deltas[_key(before)]
+            delta[0] -= 1
+            delta[1] -= before["amount"]
+        if after is not None:
+            delta = deltas[_key(after)]
+            delta[0] += 1
+            delta[1] += after["amount"]
+
+    rows, shrunk = [], []
+    for key, (count, revenue) in deltas.items():
+        if count == 0 and revenue == 0:
+            continue
+        row = dict(zip(("user_id", "day") + DIMENSIONS, key))
+        rows.append({**row, "order_count": count, "revenue": revenue})
+        if count < 0:
+            shrunk.append({f"key_{name}": value for name, value in row.items()})
+    if rows:
+        db.execute(_upsert(_dialect_name(db)), rows)
+    if shrunk:
+        db.execute(_delete_empty, shrunk)
+
+
+def record_change(db, before: Optional[dict], after: Optional[dict]):
+    """record_changes() for a single order"""
+    record_changes(db, [(before, after)])
+
+
+# ----------------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------------
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())  # Monday
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def summarize(
+    db,
+    user_id: int,
+    period: str = "day",
+    group_by: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[dict]:
+    """
+    Order count, revenue and average value per period (and per value of the
+    group_by dimension), oldest period first
+    """
+    columns = [OrderRollup.day]
+    if group_by:
+        columns.append(OrderRollup.__table__.c[group_by])
+    query = (
+        select(*columns, func.sum(OrderRollup.order_count), func.sum(OrderRollup.revenue))
+        .where(OrderRollup.user_id == user_id)
+        .group_by(*columns)
+    )
+    if date_from is not None:
+        query = query.where(OrderRollup.day >= date_from)
+    if date_to is not None:
+        query = query.where(OrderRollup.day <= date_to)
+
+    # At most one row per day and group value - bucket them into weeks/months here
+    buckets = defaultdict(lambda: [0, 0.0])
+    for row in db.execute(query):
+        group = row[1] if group_by else None
+        bucket = buckets[(period_start(row[0], period), group)]
+        bucket[0] += row[-2]
+        bucket[1] += row[-1]
+
+    return [
+        {
+            "period_start": start,
+            "group": group,
+            "order_count": count,
+            "revenue": round(revenue, 2),
+            "average_value": round(revenue / count, 2) if count else 0.0,
+        }
+        for (start, group), (count, revenue) in sorted(buckets.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+    ]
+
+
+# ----------------------------------------------------------------------------
+# Rebuild / drift check
+# ----------------------------------------------------------------------------
+
+def compute(db, user_id: Optional[int] = None) -> Dict[tuple, list]:
+    """Rollups recomputed from the orders table: key -> [count, revenue]"""
+    orders = Order.__table__
+    query = select(orders.c.user_id, orders.c.order_date, orders.c.amount, *(orders.c[d] for d in DIMENSIONS))
+    if user_id is not None:
+        query = query.where(orders.c.user_id == user_id)
+
+    totals = defaultdict(lambda: [0, 0.0])
+    for row in db.execute(query.execution_options(yield_per=1000)):
+        key = (row.user_id, row.order_date.date()) + tuple(getattr(row, d) for d in DIMENSIONS)
+        totals[key][0] += 1
+        totals[key][1] += row.amount or 0.0
+    return totals
+
+
+def stored(db, user_id: Optional[int] = None) -> Dict[tuple, list]:
+    """Rollups as currently stored: key -> [count, revenue]"""
+    table = OrderRollup.__table__
+    query = select(table)
+    if user_id is not None:
+        query = query.where(table.c.user_id == user_id)
+    return {
+        (row.user_id, row.day) + tuple(getattr(row, d) for d in DIMENSIONS): [row.order_count, row.revenue]
+        for row in db.execute(query)
+    }
+
+
+def drift(db, user_id: Optional[int] = None) -> List[tuple]:
+    """(key, stored [count, revenue] or None, expected or None) for every row that differs"""
+    expected = compute(db, user_id)
+    actual = stored(db, user_id)
+    differences = []
+    for key in sorted(set(expected) | set(actual), key=repr):
+        want, have = expected.get(key), actual.get(key)
+        if want is None or have is None or want[0] != have[0] or abs(want[1] - have[1]) > REVENUE_TOLERANCE:
+            differences.append((key, have, want))
+    return differences
+
+
+def rebuild(db, user_id: Optional[int] = None) -> int:
+    """Replaces the rollups with ones recomputed from orders; returns the row count (caller commits)"""
+    table = OrderRollup.__table__
+    totals = compute(db, user_id)
+    statement = delete(table)
+    if user_id is not None:
+        statement = statement.where(table.c.user_id == user_id)
+    db.execute(statement)
+    rows = [
+        {**dict(zip(("user_id", "day") + DIMENSIONS, key)), "order_count": count, "revenue": revenue}
+        for key, (count, revenue) in totals.items()
+    ]
+    if rows:
+        db.execute(table.insert(), rows)
+    return len(rows)
+
+
+def main(argv: list) -> int:
+    import argparse
+
+    import migrations
+    from db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m orders.analytics")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="only this user's rollups")
+    args = parser.parse_args(argv)
+
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        differences = drift(connection, args.user_id)
+        for key, have, want in differences[:50]:
+            print(f"drift {key}: stored={have} expected={want}")
+        if len(differences) > 50:
+            print(f"... and {len(differences) - 50} more")
+        print(f"{len(differences)} rollup row(s) drifted")
+
+        if args.command == "rebuild":
+            count = rebuild(connection, args.user_id)
+            print(f"Rebuilt {count} rollup row(s)")
+            return 0
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,116 @@
+# orders/bulk.py
+"""
+Set-based bulk order changes for POST /orders/bulk.
+
+A whole batch is applied in one transaction (one commit, so one fsync on
+SQLite) with a fixed number of statements:
+
+- creates: one counter upsert reserving all order numbers, then one
+  multi-row INSERT ... RETURNING
+- updates: one UPDATE ... WHERE id IN (...) per distinct set of changes
+  (e.g. 200 orders marked Shipped = one statement)
+- deletes: one DELETE ... WHERE id IN (...) and one multi-row insert of
+  their tombstones (for GET /sync)
+- one SELECT of the existing rows, used for not_found results and to move
+  the analytics rollups - locked until commit (db.begin_write()), so a
+  concurrent change can't slip in between it and the writes
+
+Every statement is scoped to the user, so ids of other users' orders come
+back as not_found.
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from db import begin_write
+from models import Order
+from orders import analytics, numbering
+from sync import changes as sync_changes
+import schemas
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))  # per list (create/update/delete)
+
+
+def _new_order_row(user_id: int, order_id: str, data: schemas.OrderCreate, now: datetime) -> dict:
+    """Column values for a created order - same defaults as POST /orders/"""
+    values = data.dict()
+    values["process_status"] = values.get("process_status") or "production"
+    return {**values, "user_id": user_id, "order_id": order_id, "order_date": now}
+
+
+def apply(db: Session, user_id: int, request: schemas.OrderBulkRequest) -> dict:
+    """
+    Applies a bulk request and returns the per-item results
+    (an OrderBulkResponse body). The caller commits.
+    """
+    results = {"created": [], "updated": [], "deleted": []}
+    changes = []  # (before, after) snapshots for the analytics rollups
+
+    # Existing rows for every update/delete, in one query
+    touched_ids = [item.id for item in request.update] + list(request.delete)
+    existing = {}
+    if touched_ids:
+        begin_write(db)
+        rows = db.execute(select(Order.__table__).where(
+            Order.user_id == user_id,
+            Order.id.in_(touched_ids),
+        ).with_for_update())
+        existing = {row.id: row for row in rows}
+
+    # Creates
+    if request.create:
+        now = datetime.utcnow()
+        first_number = numbering.reserve_order_numbers(db, user_id, len(request.create))
+        rows = [
+            _new_order_row(user_id, numbering.format_order_id(first_number + i), data, now)
+            for i, data in enumerate(request.create)
+        ]
+        inserted = db.execute(
+            insert(Order).returning(Order.id, Order.order_id, sort_by_parameter_order=True),
+            rows,
+        ).all()
+        for index, (row, (new_id, order_id)) in enumerate(zip(rows, inserted)):
+            results["created"].append({"index": index, "id": new_id, "order_id": order_id, "status": "created"})
+            changes.append((None, analytics.snapshot(SimpleNamespace(**row))))
+
+    # Updates - grouped by identical change sets
+    groups = defaultdict(list)  # ((field, value), ...) -> ids
+    for index, item in enumerate(request.update):
+        row = existing.get(item.id)
+        if row is None:
+            results["updated"].append({"index": index, "id": item.id, "status": "not_found"})
+            continue
+        values = item.dict(exclude_unset=True, exclude={"id"})
+        if values:
+            groups[tuple(sorted(values.items()))].append(item.id)
+            changes.append((analytics.snapshot(row), analytics.snapshot(SimpleNamespace(**{**row._asdict(), **values}))))
+        results["updated"].append({"index": index, "id": item.id, "order_id": row.order_id, "status": "updated"})
+
+    for values, ids in groups.items():
+        db.execute(
+            update(Order.__table__)
+            .where(Order.user_id == user_id, Order.id.in_(ids))
+            .values(dict(values))
+        )
+
+    # Deletes
+    delete_ids = []
+    for index, order_id in enumerate(request.delete):
+        row = existing.get(order_id)
+        if row is None:
+            results["deleted"].append({"index": index, "id": order_id, "status": "not_found"})
+            continue
+        delete_ids.append(order_id)
+        changes.append((analytics.snapshot(row), None))
+        results["deleted"].append({"index": index, "id": order_id, "order_id": row.order_id, "status": "deleted"})
+    if delete_ids:
+        db.execute(delete(Order.__table__).where(Order.user_id == user_id, Order.id.in_(delete_ids)))
+        sync_changes.record_deletes(db, user_id, "orders", delete_ids)
+
+    analytics.record_changes(db, changes)
+    return results
@@ -0,0 +1,63 @@
+# orders/numbering.py
+"""
+Per-user order numbers ("ORD-001", "ORD-002", ...).
+
+The last number used by each user lives in order_counters. Reserving a
+number is a single upsert that increments the row and returns the new
+value, run in the same transaction as the order insert:
+
+- it doesn't depend on how many orders the user has
+- the row stays locked until commit, so concurrent creates for the same
+  user get consecutive numbers instead of duplicates
+- if the insert fails and the transaction rolls back, so does the counter
+
+Numbers are never reused, even after an order is deleted.
+"""
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from db import dialect_insert
+from models import OrderCounter
+
+ORDER_ID_PREFIX = "ORD-"
+
+
+def format_order_id(number: int) -> str:
+    return f"{ORDER_ID_PREFIX}{str(number).zfill(3)}"
+
+
+def parse_order_number(order_id: Optional[str]) -> Optional[int]:
+    """ORD-042 -> 42; None for ids not in that format"""
+    if not order_id or not order_id.startswith(ORDER_ID_PREFIX):
+        return None
+    try:
+        return int(order_id[len(ORDER_ID_PREFIX):])
+    except ValueError:
+        return None
+
+
+def reserve_statement(dialect_name: str, user_id: int, count: int = 1):
+    """INSERT ... ON CONFLICT DO UPDATE that advances a user's counter by count"""
+    insert = dialect_insert(dialect_name)
+    table = OrderCounter.__table__
+    return (
+        insert(table)
+        .values(user_id=user_id, last_number=count)
+        .on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={"last_number": table.c.last_number + count},
+        )
+        .returning(table.c.last_number)
+    )
+
+
+def reserve_order_numbers(db: Session, user_id: int, count: int = 1) -> int:
+    """
+    Reserves count consecutive numbers for the user and returns the first.
+    The caller commits (together with the orders that use them).
+    """
+    statement = reserve_statement(db.get_bind().dialect.name, user_id, count)
+    last_number = db.execute(statement).scalar_one()
+    return last_number - count + 1
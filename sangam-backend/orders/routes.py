@@ -3,7 +3,12 @@
 Orders API Routes - Handle all order-related operations
 
 This file defines the API endpoints for orders:
-- GET /orders - Get all orders for the current user
+- GET /orders - Get the user's orders (paginated, filterable, sortable)
+- GET /orders/search - Full-text search (customer, product, note, tracking id, order id)
+- GET /orders/export - Stream the orders as CSV/NDJSON
+- GET /orders/analytics - Revenue and order counts per day/week/month
+- POST /orders/bulk - Create/update/delete many orders in one transaction
+- POST /orders/import - Import orders from a CSV file (background job)
 - GET /orders/{order_id} - Get a specific order
 - POST /orders - Create a new order
 - PUT /orders/{order_id} - Update an existing order
@@ -17,10 +22,12 @@ How it works:
 5. Function returns the data as JSON
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+from datetime import date, datetime
 
 # Import database and auth utilities
 # Note: We use relative imports with .. to go up one directory level
@@ -28,78 +35,259 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from db import get_db
-from auth.utils import get_current_user
-from models import Order, User
+from db import begin_write, get_async_db, get_async_read_db
+from auth.utils import get_current_principal, Principal
+from models import Order
+from orders import analytics, bulk, numbering, search
+from imports import jobs as import_jobs
+from realtime import hub
+from sync import changes as sync_changes
+import exports
+import pagination
 import schemas
+import versions
 
 # Create a router - this groups all order-related endpoints
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
-def generate_order_id(db: Session, user_id: int) -> str:
+async def generate_order_id(db: AsyncSession, user_id: int) -> str:
     """
     Helper function to generate a unique order ID like "ORD-001"
     
-    How it works:
-    1. Get all existing order_ids for this user
-    2. Find the highest number
-    3. Add 1 to get the next number
-    4. Format it as "ORD-XXX" with leading zeros
+    The next number comes from the user's row in order_counters, advanced
+    atomically in this transaction (see orders/numbering.py), so this is
+    one statement no matter how many orders the user already has.
     
     This ensures uniqueness even if orders are deleted.
     """
-    # Get all orders for this user
-    user_orders = db.query(Order).filter(Order.user_id == user_id).all()
-    
-    # Find the highest order number
-    max_num = 0
-    for order in user_orders:
-        if order.order_id and order.order_id.startswith("ORD-"):
-            try:
-                num = int(order.order_id.split("-")[1])
-                max_num = max(max_num, num)
-            except (ValueError, IndexError):
-                pass
-    
-    # Return next available order ID
-    return f"ORD-{str(max_num + 1).zfill(3)}"
-
-
-@router.get("/", response_model=List[schemas.OrderResponse])
-def get_orders(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    number = await db.run_sync(numbering.reserve_order_numbers, user_id)
+    return numbering.format_order_id(number)
+
+
+def order_filters(
+    delivery_status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    process_status: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> list:
+    """
+    WHERE conditions for the order list filters
+    (each one has an index on (user_id, column, order_date))
+    """
+    conditions = []
+    columns = {
+        Order.delivery_status: delivery_status,
+        Order.payment_status: payment_status,
+        Order.process_status: process_status,
+        Order.source: source,
+        Order.category: category,
+    }
+    for column, value in columns.items():
+        if value is not None:
+            conditions.append(column == value)
+    if date_from is not None:
+        conditions.append(Order.order_date >= date_from)
+    if date_to is not None:
+        conditions.append(Order.order_date <= date_to)
+    return conditions
+
+
+# Columns GET /orders/ can sort by. Each has an index on (user_id, column, id)
+SORT_COLUMNS = {
+    "order_date": Order.order_date,
+    "amount": Order.amount,
+    "customer_name": Order.customer_name,
+}
+
+
+def list_query(user_id: int, sort: str, order: str, conditions: list, position: Optional[dict] = None):
+    """
+    GET /orders/: the user's orders matching conditions (order_filters()),
+    sorted, continuing after a decoded cursor position if there is one
+    """
+    sort_column = SORT_COLUMNS[sort]
+    descending = order == "desc"
+    query = select(Order).where(Order.user_id == user_id, *conditions)
+
+    # id breaks ties, so the order (and the cursor position) is always exact
+    if descending:
+        query = query.order_by(sort_column.desc(), Order.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Order.id.asc())
+
+    if position is not None:
+        query = query.where(pagination.after((sort_column, Order.id), (position["value"], position["id"]), descending))
+    return query
+
+
+def owned_order(order_id: int, user_id: int):
+    """One order, if it belongs to the user"""
+    return select(Order).where(Order.id == order_id, Order.user_id == user_id)
+
+
+@router.get(
+    "/",
+    response_model=Union[schemas.OrderPage, List[schemas.OrderResponse]],
+    dependencies=[Depends(versions.etag("orders"))],
+)
+async def get_orders(
+    limit: int = Query(50, ge=1, le=500, description="Orders per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: Literal["order_date", "amount", "customer_name"] = "order_date",
+    order: Literal["asc", "desc"] = "desc",
+    delivery_status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    process_status: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, description="order_date on or after"),
+    date_to: Optional[datetime] = Query(None, description="order_date on or before"),
+    return_all: bool = Query(False, alias="all", description="Return every matching order as a plain list (no pagination)"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    GET /orders - Get all orders for the current user
+    GET /orders - Get the current user's orders, one page at a time
     
     What happens:
     1. Gets the current user from the JWT token (automatic via Depends)
-    2. Queries the database for all orders belonging to that user
-    3. Returns the orders as a JSON list
+    2. Applies the filters and sorts (newest first by default)
+    3. Continues after the cursor position (keyset pagination - no OFFSET)
+    4. Returns {items, next_cursor, has_more}
     
-    Returns: List of all orders for the logged-in user
+    all=true returns the plain list of every matching order instead, the
+    way this endpoint used to work (kept for older clients).
+    
+    Returns: OrderPage, or a list of orders when all=true
     """
-    # Get username from the token
-    username = current_user["username"]
+    conditions = order_filters(delivery_status, payment_status, process_status, source, category, date_from, date_to)
+
+    if return_all:
+        result = await db.execute(list_query(current_user.id, sort, order, conditions))
+        return result.scalars().all()
+
+    position = None
+    if cursor:
+        position = pagination.decode_cursor(cursor)
+        if position.get("sort") != sort or position.get("order") != order or "id" not in position:
+            # A cursor only makes sense for the ordering it was made for
+            raise pagination.invalid_cursor
+
+    result = await db.execute(list_query(current_user.id, sort, order, conditions, position).limit(limit + 1))
+    orders, next_cursor = pagination.page(
+        result.scalars().all(),
+        limit,
+        lambda last: {"sort": sort, "order": order, "value": getattr(last, sort), "id": last.id},
+    )
+    return schemas.OrderPage(items=orders, next_cursor=next_cursor, has_more=next_cursor is not None)
+
+
+@router.get("/search", response_model=schemas.OrderPage, dependencies=[Depends(versions.etag("orders"))])
+async def search_orders(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find - each one matches as a prefix"),
+    limit: int = Query(20, ge=1, le=100, description="Orders per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /orders/search - Find orders by customer, contact, product, note,
+    tracking id or order id
     
-    # Find the user in the database
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    What happens:
+    1. The query is matched against the full-text index (see orders/search.py)
+    2. Every term must match; "lam" finds "Lamp", "ord-012" finds ORD-012
+    3. Results come best match first, one page at a time
     
-    # Get all orders for this user
-    orders = db.query(Order).filter(Order.user_id == user.id).all()
+    Returns: OrderPage - pass next_cursor back (with the same q) for more
+    """
+    try:
+        orders, next_cursor = await db.run_sync(search.search, current_user.id, q, limit, cursor)
+    except search.SearchTermTooShort as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return schemas.OrderPage(items=orders, next_cursor=next_cursor, has_more=next_cursor is not None)
+
+
+# Columns of an order export, in file order
+EXPORT_COLUMNS = [
+    "id", "order_id", "order_date", "customer_name", "customer_contact", "product",
+    "category", "amount", "payment_method", "payment_status", "payment_date",
+    "delivery_status", "source", "process_status", "tracking_id", "note", "rating",
+]
+
+
+def export_query(user_id: int, conditions: list):
+    """GET /orders/export: the EXPORT_COLUMNS of the matching orders, oldest first"""
+    table = Order.__table__
+    return (
+        select(*(table.c[name] for name in EXPORT_COLUMNS))
+        .where(Order.user_id == user_id, *conditions)
+        .order_by(Order.order_date, Order.id)
+    )
+
+
+@router.get("/export")
+async def export_orders(
+    format: exports.ExportFormat = "csv",
+    gzip: bool = Query(False, description="Compress the download (.gz)"),
+    delivery_status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    process_status: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    GET /orders/export - Download the user's orders as CSV or NDJSON
     
-    return orders
+    Takes the same filters as GET /orders/. Rows are streamed in chunks
+    straight from the database (see exports.py), so any number of orders
+    can be exported without loading them all into memory.
+    """
+    conditions = order_filters(delivery_status, payment_status, process_status, source, category, date_from, date_to)
+    return exports.export_response(export_query(current_user.id, conditions), EXPORT_COLUMNS, format, "orders", gzip)
+
+
+@router.get("/analytics", response_model=schemas.OrderAnalytics, dependencies=[Depends(versions.etag("orders"))])
+async def get_order_analytics(
+    period: Literal["day", "week", "month"] = "day",
+    group_by: Optional[Literal["source", "category", "payment_status", "delivery_status"]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /orders/analytics - Revenue, order count and average order value
+    
+    Grouped by day, week or month, and optionally by source, category,
+    payment_status or delivery_status. Read from the order_rollups table
+    (see orders/analytics.py), so the cost doesn't depend on how many
+    orders the user has.
+    """
+    buckets = await db.run_sync(analytics.summarize, current_user.id, period, group_by, date_from, date_to)
+    total_orders = sum(b["order_count"] for b in buckets)
+    total_revenue = round(sum(b["revenue"] for b in buckets), 2)
+    return schemas.OrderAnalytics(
+        period=period,
+        group_by=group_by,
+        buckets=buckets,
+        total_orders=total_orders,
+        total_revenue=total_revenue,
+    )
 
 
-@router.get("/{order_id}", response_model=schemas.OrderResponse)
-def get_order(
+@router.get("/{order_id}", response_model=schemas.OrderResponse, dependencies=[Depends(versions.etag("orders"))])
+async def get_order(
     order_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     GET /orders/{order_id} - Get a specific order by ID
@@ -110,16 +298,9 @@ def get_order(
     Returns: The order if found and belongs to the user
     Raises 404 if order not found or doesn't belong to user
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Find the order and make sure it belongs to this user
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == user.id
-    ).first()
+    result = await db.execute(owned_order(order_id, current_user.id))
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -131,10 +312,10 @@ def get_order(
 
 
 @router.post("/", response_model=schemas.OrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(
+async def create_order(
     order_data: schemas.OrderCreate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     POST /orders - Create a new order
@@ -149,17 +330,12 @@ def create_order(
     Request body: OrderCreate schema (customer_name, product, amount, etc.)
     Returns: The newly created order
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Generate unique order ID
-    order_id = generate_order_id(db, user.id)
+    order_id = await generate_order_id(db, current_user.id)
     
     # Create new order object
     new_order = Order(
-        user_id=user.id,
+        user_id=current_user.id,
         order_id=order_id,
         customer_name=order_data.customer_name,
         customer_contact=order_data.customer_contact,
@@ -180,20 +356,106 @@ def create_order(
     
     # Add to database session
     db.add(new_order)
+    # Count it in the analytics rollups (same transaction)
+    await db.run_sync(analytics.record_change, None, analytics.snapshot(new_order))
+    # Changes the ETag of the user's orders GETs (see versions.py)
+    await db.run_sync(versions.bump, current_user.id, "orders")
     # Save to database
-    db.commit()
+    await db.commit()
     # Refresh to get auto-generated fields
-    db.refresh(new_order)
+    await db.refresh(new_order)
+    # Live update for the user's open dashboards (see realtime/hub.py)
+    hub.publish(current_user.id, "order.created", schemas.OrderResponse.model_validate(new_order))
     
     return new_order
 
 
+@router.post("/bulk", response_model=schemas.OrderBulkResponse)
+async def bulk_orders(
+    request: schemas.OrderBulkRequest,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    POST /orders/bulk - Create, update and delete many orders at once
+    
+    What happens:
+    1. Checks the batch (size limit, no id updated/deleted twice)
+    2. Applies all creates, updates and deletes with set-based statements
+       (see orders/bulk.py)
+    3. Commits once - either the whole batch is saved or nothing is
+    
+    Request body: {create: [...], update: [{id, ...fields}], delete: [ids]}
+    Returns: per-item results; ids that don't exist (or belong to another
+    user) are reported as not_found and skipped
+    """
+    for name in ("create", "update", "delete"):
+        if len(getattr(request, name)) > bulk.BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {bulk.BULK_MAX_ITEMS} items per list ({name})"
+            )
+    touched_ids = [item.id for item in request.update] + list(request.delete)
+    if len(touched_ids) != len(set(touched_ids)):
+        raise HTTPException(
+            status_code=400,
+            detail="Each order id may appear only once across update and delete"
+        )
+
+    try:
+        results = await db.run_sync(bulk.apply, current_user.id, request)
+        await db.run_sync(versions.bump, current_user.id, "orders")
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Bulk request rejected by the database (e.g. a required field set to null) - nothing was changed"
+        )
+    
+    changed = {
+        name: [item["id"] for item in results[name] if item["status"] == name]
+        for name in ("created", "updated", "deleted")
+    }
+    if any(changed.values()):
+        hub.publish(current_user.id, "orders.changed", changed)
+    return results
+
+
+@router.post(
+    "/import",
+    response_model=schemas.ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=import_jobs.CSV_REQUEST_BODY,
+)
+async def import_orders(
+    request: Request,
+    filename: Optional[str] = Query(None, description="Original file name, shown in the job"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    POST /orders/import - Import orders from a CSV file
+    
+    What happens:
+    1. The CSV file (the raw request body) is saved to a temporary file
+    2. The header is checked for the required OrderCreate columns
+    3. The import job is returned right away; the rows are validated and
+       inserted in the background (see imports/jobs.py)
+    
+    Order numbers continue the user's ORD-NNN sequence. An order_date column
+    is optional (defaults to the import time); id/order_id columns are ignored.
+    Returns: the job - poll GET /imports/{id} for progress and row errors
+    """
+    return await import_jobs.start(request, db, current_user.id, "orders", filename)
+
+
 @router.put("/{order_id}", response_model=schemas.OrderResponse)
-def update_order(
+async def update_order(
     order_id: int,
     order_data: schemas.OrderUpdate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     PUT /orders/{order_id} - Update an existing order
@@ -206,16 +468,11 @@ def update_order(
     Request body: OrderUpdate schema (all fields optional)
     Returns: The updated order
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Find the order
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == user.id
-    ).first()
+    # Find the order, locked until commit: the rollup delta below must start
+    # from the row as it is, not as a concurrent request is about to leave it
+    await db.run_sync(begin_write)
+    result = await db.execute(owned_order(order_id, current_user.id).with_for_update())
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -226,21 +483,27 @@ def update_order(
     # Update only fields that were provided
     # order_data.dict(exclude_unset=True) returns only fields that were sent
     update_data = order_data.dict(exclude_unset=True)
+    before = analytics.snapshot(order)
     for field, value in update_data.items():
         setattr(order, field, value)  # Dynamically set the attribute
     
+    # Move the order between analytics rollup rows if needed
+    await db.run_sync(analytics.record_change, before, analytics.snapshot(order))
+    
     # Save changes
-    db.commit()
-    db.refresh(order)
+    await db.run_sync(versions.bump, current_user.id, "orders")
+    await db.commit()
+    await db.refresh(order)
+    hub.publish(current_user.id, "order.updated", schemas.OrderResponse.model_validate(order))
     
     return order
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_order(
+async def delete_order(
     order_id: int,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     DELETE /orders/{order_id} - Delete an order
@@ -250,16 +513,11 @@ def delete_order(
     2. Deletes it from the database
     3. Returns 204 No Content (success, no response body)
     """
-    username = current_user["username"]
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Find the order
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == user.id
-    ).first()
+    # Find the order, locked until commit: the rollup delta below must start
+    # from the row as it is, not as a concurrent request is about to leave it
+    await db.run_sync(begin_write)
+    result = await db.execute(owned_order(order_id, current_user.id).with_for_update())
+    order = result.scalars().first()
     
     if not order:
         raise HTTPException(
@@ -267,9 +525,13 @@ def delete_order(
             detail="Order not found or you don't have permission to delete it"
         )
     
-    # Delete from database
-    db.delete(order)
-    db.commit()
+    # Delete from database (and from the analytics rollups)
+    await db.run_sync(analytics.record_change, analytics.snapshot(order), None)
+    await db.delete(order)
+    await db.run_sync(sync_changes.record_deletes, current_user.id, "orders", [order.id])
+    await db.run_sync(versions.bump, current_user.id, "orders")
+    await db.commit()
+    hub.publish(current_user.id, "order.deleted", {"id": order_id})
     
     return None  # 204 No Content
 
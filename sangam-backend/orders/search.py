@@ -0,0 +1,319 @@
+# orders/search.py
+"""
+Full-text order search for GET /orders/search.
+
+On SQLite, orders_fts is an FTS5 index over the order's customer_name,
+customer_contact, product, note, tracking_id and order_id. It is an
+external-content table: it holds only the index and reads the text from
+orders (through the orders_fts_content view). Triggers on orders keep it
+in sync, so every write path (the routes, POST /orders/bulk, CSV imports,
+manual SQL) is covered.
+
+The index holds every shop's orders, so each row also gets an owner token
+("u42u" for user 42) and every search matches it too: FTS5 then only ranks
+the rows of the searching user, skipping through the term's matches
+instead of scoring every shop's and discarding most of them (bm25 still
+counts each term's matches over the whole index once per search, for its
+term weights - a read of one doclist, nothing is scored). With
+unicode61, prefixes of up to 4 characters have index entries of their own
+(PREFIX_INDEXES), so the common short prefix terms are skipped through the
+same way rather than expanded into every matching word first.
+
+Two tokenizers are supported:
+
+    unicode61 (default)   word search, each term matches as a prefix
+                          ("lam" finds "lamp", "ord-012" finds ORD-012)
+    trigram               substring search ("amp" finds "lamp"); terms need
+                          at least 3 characters and the index is larger
+
+ORDER_SEARCH_TOKENIZER picks the tokenizer when the index is first created
+(migration v007). To switch an existing database, or to repair the index
+(restart the API afterwards - each process caches the tokenizer in use):
+
+    python -m orders.search rebuild [--tokenizer trigram]
+    python -m orders.search check      # integrity check, exit 1 if broken
+
+Results are ranked with bm25, weighting order_id, tracking_id and the
+customer name above the product and note. Other databases (PostgreSQL)
+have no FTS5, so there the search falls back to case-insensitive
+substring matching over the same columns, newest first.
+"""
+
+import os
+import re
+import sys
+import threading
+import weakref
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import column, literal_column, or_, select, table, text
+
+from models import Order
+import pagination
+
+SEARCH_COLUMNS = ("customer_name", "customer_contact", "product", "note", "tracking_id", "order_id")
+
+# bm25 weight of each column above, in the same order
+RANK_WEIGHTS = (5.0, 2.0, 3.0, 1.0, 10.0, 10.0)
+
+# Extra indexed column: the owner token of the order's user (see owner_token())
+OWNER_COLUMN = "owner"
+
+TOKENIZERS = {
+    "unicode61": "unicode61 remove_diacritics 2",
+    "trigram": "trigram",
+}
+
+# Prefix lengths indexed for unicode61 prefix queries ("lam*")
+PREFIX_INDEXES = "2 3 4"
+
+ORDER_SEARCH_TOKENIZER = os.getenv("ORDER_SEARCH_TOKENIZER", "unicode61").strip().lower()
+
+# Shortest term the trigram tokenizer can find
+TRIGRAM_MIN_LENGTH = 3
+
+orders_fts = table("orders_fts", column("rowid"), column("rank"))
+
+
+class SearchTermTooShort(ValueError):
+    pass
+
+
+def owner_token(user_id: int) -> str:
+    """
+    "u42u" - a single token for unicode61, and with the u on both sides no
+    other user's token contains it, so trigram matches it exactly too
+    """
+    return f"u{user_id}u"
+
+
+def _owner_sql(row: str) -> str:
+    return f"'u' || {row}user_id || 'u'"
+
+
+# ----------------------------------------------------------------------------
+# Index management (SQLite only)
+# ----------------------------------------------------------------------------
+
+# engine -> tokenizer of its index, so searches don't read sqlite_master
+_tokenizers = weakref.WeakKeyDictionary()
+_tokenizers_lock = threading.Lock()
+
+
+def current_tokenizer(connection) -> Optional[str]:
+    """Tokenizer of the existing index, or None if there is no index"""
+    if connection.dialect.name != "sqlite":
+        return None
+    sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'orders_fts'"
+    )).scalar()
+    if sql is None:
+        return None
+    return "trigram" if "trigram" in sql else "unicode61"
+
+
+def cached_tokenizer(connection) -> Optional[str]:
+    """current_tokenizer(), looked up once per engine"""
+    engine = connection.engine
+    with _tokenizers_lock:
+        if engine in _tokenizers:
+            return _tokenizers[engine]
+    tokenizer = current_tokenizer(connection)
+    with _tokenizers_lock:
+        _tokenizers[engine] = tokenizer
+    return tokenizer
+
+
+def _forget_tokenizer(connection):
+    with _tokenizers_lock:
+        _tokenizers.pop(connection.engine, None)
+
+
+def drop(connection):
+    for name in ("orders_fts_ai", "orders_fts_ad", "orders_fts_au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    connection.execute(text("DROP TABLE IF EXISTS orders_fts"))
+    connection.execute(text("DROP VIEW IF EXISTS orders_fts_content"))
+    _forget_tokenizer(connection)
+
+
+def create(connection, tokenizer: str = ORDER_SEARCH_TOKENIZER):
+    """Creates the index and its sync triggers, then indexes the existing orders"""
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"Unknown search tokenizer '{tokenizer}' (expected one of {', '.join(TOKENIZERS)})")
+    columns = ", ".join(SEARCH_COLUMNS + (OWNER_COLUMN,))
+    new_values = ", ".join([f"new.{c}" for c in SEARCH_COLUMNS] + [_owner_sql("new.")])
+    old_values = ", ".join([f"old.{c}" for c in SEARCH_COLUMNS] + [_owner_sql("old.")])
+    # The owner column never counts towards the rank
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS + (0.0,))
+
+    # The content the index reads on 'rebuild': the orders plus their owner token
+    connection.execute(text(
+        f"CREATE VIEW orders_fts_content AS SELECT id, {', '.join(SEARCH_COLUMNS)}, "
+        f"{_owner_sql('')} AS {OWNER_COLUMN} FROM orders"
+    ))
+    # trigram searches match substrings, never prefixes
+    prefix = f"prefix='{PREFIX_INDEXES}', " if tokenizer == "unicode61" else ""
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE orders_fts USING fts5({columns}, "
+        f"content='orders_fts_content', content_rowid='id', {prefix}tokenize='{TOKENIZERS[tokenizer]}')"
+    ))
+    # Stored in the index, so "ORDER BY rank" uses these weights
+    connection.execute(text(f"INSERT INTO orders_fts(orders_fts, rank) VALUES ('rank', 'bm25({weights})')"))
+
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_ai AFTER INSERT ON orders BEGIN "
+        f"INSERT INTO orders_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_ad AFTER DELETE ON orders BEGIN "
+        f"INSERT INTO orders_fts(orders_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    # Only edits of the searched columns touch the index (not status changes)
+    connection.execute(text(
+        f"CREATE TRIGGER orders_fts_au AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)}, user_id ON orders BEGIN "
+        f"INSERT INTO orders_fts(orders_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO orders_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text("INSERT INTO orders_fts(orders_fts) VALUES ('rebuild')"))
+    _forget_tokenizer(connection)
+
+
+def rebuild(connection, tokenizer: Optional[str] = None) -> str:
+    """
+    Drops and recreates the index (keeping its tokenizer unless one is
+    given) and reindexes every order. Returns the tokenizer used.
+    """
+    tokenizer = tokenizer or current_tokenizer(connection) or ORDER_SEARCH_TOKENIZER
+    drop(connection)
+    create(connection, tokenizer)
+    return tokenizer
+
+
+def check(connection):
+    """Raises if the index doesn't match the orders table"""
+    connection.execute(text("INSERT INTO orders_fts(orders_fts, rank) VALUES ('integrity-check', 1)"))
+
+
+# ----------------------------------------------------------------------------
+# Searching
+# ----------------------------------------------------------------------------
+
+def _quote(term: str) -> str:
+    """An FTS5 string - the term is matched literally, never parsed as syntax"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def match_expression(q: str, tokenizer: str, user_id: int) -> Optional[str]:
+    """
+    FTS5 MATCH expression for a search box query: the user's owner token,
+    and all terms in the searched columns. None if the query has nothing
+    to search for.
+    """
+    if tokenizer == "trigram":
+        terms = q.split()
+        if any(len(term) < TRIGRAM_MIN_LENGTH for term in terms):
+            raise SearchTermTooShort(f"Search terms need at least {TRIGRAM_MIN_LENGTH} characters")
+        terms = [_quote(term) for term in terms]
+    else:
+        # unicode61 splits on punctuation, so "ORD-012" is searched as ORD* 012*
+        terms = [_quote(term) + "*" for term in re.findall(r"\w+", q)]
+    if not terms:
+        return None
+    return (
+        f"{OWNER_COLUMN} : {_quote(owner_token(user_id))} "
+        f"AND {{{' '.join(SEARCH_COLUMNS)}}} : ({' '.join(terms)})"
+    )
+
+
+def _fts_search(db, user_id: int, q: str, tokenizer: str, limit: int, offset: int) -> list:
+    expression = match_expression(q, tokenizer, user_id)
+    if expression is None:
+        return []
+    query = (
+        select(Order)
+        .join(orders_fts, orders_fts.c.rowid == Order.id)
+        .where(literal_column("orders_fts").op("MATCH")(expression), Order.user_id == user_id)
+        .order_by(orders_fts.c.rank, Order.id)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    return db.execute(query).scalars().all()
+
+
+def _like_search(db, user_id: int, q: str, limit: int, position: Optional[dict]) -> list:
+    query = select(Order).where(Order.user_id == user_id)
+    for term in q.split():
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.where(or_(*(getattr(Order, c).ilike(pattern, escape="\\") for c in SEARCH_COLUMNS)))
+    if position is not None:
+        query = query.where(pagination.after((Order.order_date, Order.id), (position["value"], position["id"]), True))
+    query = query.order_by(Order.order_date.desc(), Order.id.desc()).limit(limit + 1)
+    return db.execute(query).scalars().all()
+
+
+def search(db, user_id: int, q: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Order], Optional[str]]:
+    """
+    One page of the user's orders matching q, best match first, and the
+    cursor of the next page. db is a sync Session (called via run_sync).
+
+    Ranked pages continue at an offset: bm25 scores every match anyway, so
+    a keyset position would save nothing.
+    """
+    position = pagination.decode_cursor(cursor) if cursor else None
+    if position is not None and position.get("q") != q:
+        # A cursor only continues the search it was made for
+        raise pagination.invalid_cursor
+
+    tokenizer = cached_tokenizer(db.connection())
+    if tokenizer is not None:
+        offset = position.get("offset", 0) if position else 0
+        if not isinstance(offset, int) or offset < 0:
+            raise pagination.invalid_cursor
+        rows = _fts_search(db, user_id, q, tokenizer, limit, offset)
+        return pagination.page(rows, limit, lambda last: {"q": q, "offset": offset + limit})
+
+    if position is not None and ("value" not in position or "id" not in position):
+        raise pagination.invalid_cursor
+    rows = _like_search(db, user_id, q, limit, position)
+    return pagination.page(rows, limit, lambda last: {"q": q, "value": last.order_date, "id": last.id})
+
+
+def main(argv: list) -> int:
+    import argparse
+
+    import migrations
+    from db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m orders.search")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--tokenizer", choices=list(TOKENIZERS), default=None,
+                        help="switch the index to this tokenizer (default: keep the current one)")
+    args = parser.parse_args(argv)
+
+    if engine.dialect.name != "sqlite":
+        print("Order search uses FTS5 on SQLite only - other databases search without an index")
+        return 0
+
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        if args.command == "rebuild":
+            tokenizer = rebuild(connection, args.tokenizer)
+            count = connection.execute(text("SELECT count(*) FROM orders")).scalar()
+            print(f"Rebuilt the order search index ({tokenizer}) for {count} order(s)")
+            return 0
+        try:
+            check(connection)
+        except Exception as error:
+            print(f"Order search index is out of sync: {error}")
+            print("Run: python -m orders.search rebuild")
+            return 1
+        print(f"Order search index OK ({current_tokenizer(connection)})")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
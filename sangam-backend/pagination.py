@@ -0,0 +1,73 @@
+# pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+Instead of OFFSET, each page continues after the last row of the previous
+one: WHERE (sort_column, id) < (last_value, last_id). With an index on
+(user_id, sort_column, id) the database seeks straight to that point, so
+page 500 costs the same as page 1, and rows inserted meanwhile don't shift
+pages around.
+
+The position is handed to the client as an opaque cursor string (URL-safe
+base64 of a small JSON object). Clients must not build cursors themselves.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+invalid_cursor = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor",
+)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps({k: _encode_value(v) for k, v in data.items()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Cursor string -> dict; raises a 400 for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("cursor is not an object")
+        return {k: _decode_value(v) for k, v in data.items()}
+    except (ValueError, TypeError):
+        raise invalid_cursor
+
+
+def after(columns: tuple, values: tuple, descending: bool):
+    """WHERE clause for rows after the given position in (columns) order"""
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+def page(rows: List[Any], limit: int, cursor_for: Callable[[Any], dict]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Splits rows fetched with LIMIT limit + 1 into (page rows, next cursor).
+    The extra row only tells us whether there is a next page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(cursor_for(rows[-1]))
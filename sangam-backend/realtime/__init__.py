@@ -0,0 +1,7 @@
+# realtime/__init__.py
+"""
+Live events pushed to the dashboard instead of polling.
+
+    hub.py      per-user in-process pub/sub; write paths call hub.publish()
+    routes.py   GET /ws (WebSocket) and GET /events (Server-Sent Events)
+"""
@@ -0,0 +1,189 @@
+# realtime/hub.py
+"""
+In-process pub/sub hub for live events (GET /ws, GET /events).
+
+Each open connection subscribes for its user and gets a bounded queue.
+Write paths call publish(user_id, type, data) after their commit; the
+event is encoded to JSON once and put on the queue of each of that user's
+connections, and the connection's own task sends it.
+
+Publishing never waits for a client. If a connection's queue is full (a
+slow or stalled client), its backlog is dropped and replaced by a single
+{"type": "resync"} event - the client then catches up with GET /sync
+instead of the server buffering events for it without limit.
+
+Idle connections cost no timers of their own: one heartbeat task wakes
+every EVENT_HEARTBEAT_SECONDS, queues a "ping" for each connection that
+had no event since the last beat, and cancels connections whose send has
+been blocked for more than EVENT_SEND_TIMEOUT_SECONDS.
+
+The hub lives in one process: with several server processes, a client
+only gets the events published by the process it is connected to.
+
+    EVENT_QUEUE_SIZE                 events buffered per connection (default 100)
+    EVENT_MAX_CONNECTIONS_PER_USER   open connections per user (default 20)
+    EVENT_HEARTBEAT_SECONDS          quiet time before a ping (default 25)
+    EVENT_SEND_TIMEOUT_SECONDS       a send blocked this long ends the connection (default 10)
+"""
+
+import asyncio
+import json
+import os
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from monitoring import metrics
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_MAX_CONNECTIONS_PER_USER = int(os.getenv("EVENT_MAX_CONNECTIONS_PER_USER", "20"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "25"))
+EVENT_SEND_TIMEOUT_SECONDS = float(os.getenv("EVENT_SEND_TIMEOUT_SECONDS", "10"))
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+def encode(event_type: str, data: Any = None) -> str:
+    """An event as the JSON text sent to clients"""
+    return json.dumps({"type": event_type, "data": jsonable_encoder(data)}, separators=(",", ":"))
+
+
+RESYNC = encode("resync")
+PING = encode("ping")
+CLOSE = None  # queue sentinel: the server is shutting down
+
+
+class Subscriber:
+    """
+    One open connection's event queue. A connection that wants to be
+    cancelled when a send stalls sets task, and sending_since (loop time)
+    while each send is in progress.
+    """
+
+    __slots__ = ("user_id", "queue", "active", "task", "sending_since")
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(queue_size)
+        self.active = False  # got an event since the last heartbeat
+        self.task: Optional[asyncio.Task] = None
+        self.sending_since: Optional[float] = None
+
+    def offer(self, payload: Optional[str]):
+        self.active = True
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Too far behind - everything queued is replaced by "resync"
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if payload is CLOSE:
+                self.queue.put_nowait(CLOSE)
+                return
+            self.queue.put_nowait(RESYNC)
+            metrics.realtime_resyncs_total.inc()
+
+    async def next(self) -> Optional[str]:
+        """The next event to send (None once the hub closes)"""
+        return await self.queue.get()
+
+
+class Hub:
+    def __init__(
+        self,
+        queue_size: int = EVENT_QUEUE_SIZE,
+        max_per_user: int = EVENT_MAX_CONNECTIONS_PER_USER,
+        heartbeat_seconds: float = EVENT_HEARTBEAT_SECONDS,
+        send_timeout_seconds: float = EVENT_SEND_TIMEOUT_SECONDS,
+    ):
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self.heartbeat_seconds = heartbeat_seconds
+        self.send_timeout_seconds = send_timeout_seconds
+        self._subscribers: Dict[int, Set[Subscriber]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        """Registers a connection (call from the event loop)"""
+        subscribers = self._subscribers[user_id]
+        if len(subscribers) >= self.max_per_user:
+            if not subscribers:
+                del self._subscribers[user_id]
+            raise TooManyConnections(f"At most {self.max_per_user} live connections per user")
+        self._loop = asyncio.get_running_loop()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = self._loop.create_task(self._beat())
+        subscriber = Subscriber(user_id, self.queue_size)
+        subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.user_id]
+
+    def connection_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, user_id: int, event_type: str, data: Any = None):
+        """
+        Sends an event to every open connection of the user. Call it after
+        the write has committed. Safe to call from worker threads (e.g.
+        import jobs): delivery is then handed to the event loop.
+        """
+        metrics.realtime_events_total.inc(type=event_type)
+        if user_id not in self._subscribers:
+            return  # nobody listening - skip the encoding
+        payload = encode(event_type, data)
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._deliver(user_id, payload)
+        elif self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, user_id, payload)
+
+    def _deliver(self, user_id: int, payload: Optional[str]):
+        for subscriber in tuple(self._subscribers.get(user_id, ())):
+            subscriber.offer(payload)
+
+    def heartbeat(self):
+        """One beat: ping quiet connections, cancel stalled ones"""
+        stalled_before = self._loop.time() - self.send_timeout_seconds
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in subscribers:
+                sending_since = subscriber.sending_since
+                if sending_since is not None and sending_since < stalled_before and subscriber.task:
+                    subscriber.task.cancel()
+                elif not subscriber.active and subscriber.queue.empty():
+                    subscriber.offer(PING)
+                subscriber.active = False
+
+    async def _beat(self):
+        while self._subscribers:
+            await asyncio.sleep(self.heartbeat_seconds)
+            self.heartbeat()
+
+    def close(self):
+        """Ends every connection (server shutdown)"""
+        for user_id in list(self._subscribers):
+            self._deliver(user_id, CLOSE)
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+
+
+# The process-wide hub
+_hub = Hub()
+subscribe = _hub.subscribe
+unsubscribe = _hub.unsubscribe
+publish = _hub.publish
+connection_count = _hub.connection_count
+close = _hub.close
@@ -0,0 +1,187 @@
+# realtime/routes.py
+"""
+Live event routes
+
+Endpoints:
+- WebSocket /ws - The current user's events as JSON text frames
+- GET /events - The same events as Server-Sent Events (fallback where
+  WebSockets are blocked, e.g. by a proxy)
+
+Browsers can't set an Authorization header on either, so the access token
+may also be passed as ?token=. Every event is a JSON object
+{"type": ..., "data": ...}:
+
+    message.created     data: the new message (MessageResponse)
+    chat.created        data: the chat without messages (SyncChat)
+    chat.updated        data: the chat without messages (SyncChat) - status, last message
+    chat.deleted        data: {"id"}
+    chats.synced        data: {"chat_ids", "messages"} - Instagram sync added messages
+    order.created       data: the order (OrderResponse)
+    order.updated       data: the order (OrderResponse)
+    order.deleted       data: {"id"}
+    orders.changed      data: {"created", "updated", "deleted"} - ids from POST /orders/bulk
+    import.finished     data: the import job (ImportJobResponse)
+    ping                sent after EVENT_HEARTBEAT_SECONDS without events
+    resync              events were dropped (connection too slow) - catch up with GET /sync
+    expired             the access token expired or was revoked - the connection ends
+    error               the connection was refused (SSE only; WebSockets get a close code)
+
+The token is re-checked with every ping. See realtime/hub.py for the
+queue, heartbeat and timeout settings.
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from db import AsyncReadSessionLocal
+from auth.utils import claims_from_token, get_current_principal, Principal
+from realtime import hub
+
+router = APIRouter(tags=["realtime"])
+
+EXPIRED = hub.encode("expired")
+
+
+def _token(headers, token: Optional[str]) -> Optional[str]:
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return token
+
+
+async def authenticate(token: Optional[str]) -> Optional[Principal]:
+    """
+    The user of an access token, or None. Uses a short session of its own:
+    a connection stays open for hours and must not hold a database
+    connection all that time.
+    """
+    claims = claims_from_token(token) if token else None
+    if claims is None:
+        return None
+    async with AsyncReadSessionLocal() as db:
+        try:
+            return await get_current_principal(claims, db)
+        except HTTPException:
+            return None
+
+
+async def events(subscriber: hub.Subscriber, token: str) -> AsyncIterator[str]:
+    """
+    The payloads to send on one connection: the user's events, and a ping
+    when there were none for a while. Ends when the hub closes, or after
+    sending "expired" once the token is no longer valid.
+    """
+    while True:
+        payload = await subscriber.next()
+        if payload is hub.CLOSE:
+            return
+        if payload is hub.PING and claims_from_token(token) is None:
+            yield EXPIRED
+            return
+        yield payload
+
+
+async def _send_events(websocket: WebSocket, subscriber: hub.Subscriber, token: str):
+    # A client that stopped reading fills the socket buffer and blocks the
+    # send; the hub's heartbeat then cancels this task
+    loop = asyncio.get_running_loop()
+    subscriber.task = asyncio.current_task()
+    async for payload in events(subscriber, token):
+        subscriber.sending_since = loop.time()
+        await websocket.send_text(payload)
+        subscriber.sending_since = None
+    await websocket.close(code=status.WS_1001_GOING_AWAY)
+
+
+async def _receive_until_closed(websocket: WebSocket):
+    """Reads (and ignores) client frames until the client disconnects"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws")
+async def websocket_events(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="Access token (if no Authorization header)"),
+):
+    """
+    WebSocket /ws - Live events for the current user
+
+    Rejected with close code 1008 if the token is invalid, 1013 if the user
+    already has EVENT_MAX_CONNECTIONS_PER_USER connections open.
+    """
+    token = _token(websocket.headers, token)
+    principal = await authenticate(token)
+    if principal is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        return
+    try:
+        subscriber = hub.subscribe(principal.id)
+    except hub.TooManyConnections as error:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(error))
+        return
+
+    try:
+        await websocket.accept()
+        sender = asyncio.create_task(_send_events(websocket, subscriber, token))
+        receiver = asyncio.create_task(_receive_until_closed(websocket))
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not task.cancelled():
+                task.exception()  # retrieved: a failed send just ends the connection
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+@router.get("/events")
+async def sse_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token (EventSource can't send headers)"),
+):
+    """
+    GET /events - Live events for the current user as Server-Sent Events
+
+    Each event is one `data:` line with the same JSON as on /ws. Use it with
+    the browser's EventSource, which reconnects by itself.
+    """
+    token = _token(request.headers, token)
+    principal = await authenticate(token)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    async def stream():
+        # Subscribed only once the response is streaming, so the finally
+        # below is sure to run
+        try:
+            subscriber = hub.subscribe(principal.id)
+        except hub.TooManyConnections as error:
+            yield f"data: {hub.encode('error', str(error))}\n\n"
+            return
+        try:
+            yield "retry: 5000\n\n"  # EventSource reconnect delay (ms)
+            async for payload in events(subscriber, token):
+                yield f"data: {payload}\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # No caching, and no buffering by nginx-style proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
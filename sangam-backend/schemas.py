@@ -18,7 +18,7 @@ This is different from models.py:
 
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 
 # ============================================================================
@@ -75,17 +75,84 @@ class OrderUpdate(BaseModel):
 class OrderResponse(OrderBase):
     """
     Schema for order responses
-    Includes the auto-generated fields (id, order_id, order_date)
+    Includes the auto-generated fields (id, order_id, order_date, updated_at)
     """
     id: int
     order_id: str
     order_date: datetime
+    updated_at: Optional[datetime] = None
     
     class Config:
         """Tells Pydantic to read from ORM objects (SQLAlchemy models)"""
         from_attributes = True
 
 
+class OrderPage(BaseModel):
+    """
+    One page of GET /orders/
+    Pass next_cursor back as ?cursor= to get the next page (None = last page)
+    """
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+class OrderBulkUpdate(OrderUpdate):
+    """One partial update in POST /orders/bulk - the order's database id plus the fields to change"""
+    id: int
+
+
+class OrderBulkRequest(BaseModel):
+    """
+    Body of POST /orders/bulk - everything runs in one transaction
+    Updates that change the same fields to the same values become one UPDATE
+    """
+    create: List[OrderCreate] = []
+    update: List[OrderBulkUpdate] = []
+    delete: List[int] = []  # database ids
+
+
+class OrderBulkItemResult(BaseModel):
+    """Outcome of one item of a bulk request"""
+    index: int  # position in the request list
+    id: Optional[int] = None
+    order_id: Optional[str] = None
+    status: str  # created, updated, deleted, not_found
+
+
+class OrderBulkResponse(BaseModel):
+    created: List[OrderBulkItemResult]
+    updated: List[OrderBulkItemResult]
+    deleted: List[OrderBulkItemResult]
+
+
+class OrderImportRow(OrderCreate):
+    """
+    One CSV row of POST /orders/import
+    order_date may be given to keep the dates of orders moved from another
+    system; rows without it get the import time
+    """
+    order_date: Optional[datetime] = None
+
+
+class OrderAnalyticsBucket(BaseModel):
+    """Aggregates for one period (and one group value, if grouped)"""
+    period_start: date  # first day of the day/week (Monday)/month
+    group: Optional[str] = None  # value of the group_by dimension
+    order_count: int
+    revenue: float
+    average_value: float
+
+
+class OrderAnalytics(BaseModel):
+    """Response of GET /orders/analytics"""
+    period: str
+    group_by: Optional[str] = None
+    buckets: List[OrderAnalyticsBucket]
+    total_orders: int
+    total_revenue: float
+
+
 # ============================================================================
 # CHAT SCHEMAS
 # ============================================================================
@@ -106,11 +173,22 @@ class MessageResponse(MessageBase):
     id: int
     chat_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
 
+class MessagePage(BaseModel):
+    """
+    One page of GET /chats/{id}/messages, newest message first
+    Pass next_cursor back as ?before= to get older messages (None = oldest page)
+    """
+    items: List[MessageResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
 class ChatBase(BaseModel):
     """Base schema with common chat fields"""
     customer_name: str
@@ -131,17 +209,58 @@ class ChatUpdate(BaseModel):
     last_message: Optional[str] = None
 
 
+class ChatSummary(ChatBase):
+    """One chat in the GET /chats/ list - no messages, but how many are unread"""
+    id: int
+    last_message: Optional[str] = None
+    last_message_date: datetime
+    unread_count: int = 0
+    message_count: int = 0
+    last_sender: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ChatResponse(ChatBase):
     """Schema for chat responses - includes messages"""
     id: int
     last_message: Optional[str] = None
     last_message_date: datetime
+    message_count: int = 0
+    unread_count: int = 0
+    last_sender: Optional[str] = None
+    first_message_at: Optional[datetime] = None
     messages: List[MessageResponse] = []  # List of messages in this chat
     
     class Config:
         from_attributes = True
 
 
+class MessageImportRow(MessageBase):
+    """A message of an imported chat; created_at keeps the original time (default: the import time)"""
+    created_at: Optional[datetime] = None
+
+
+class ChatImportRow(ChatBase):
+    """One line of POST /chats/import (NDJSON) - a chat with its messages"""
+    messages: List[MessageImportRow] = []
+
+
+class PlatformUnread(BaseModel):
+    """Unread chats and messages on one platform"""
+    platform: str
+    unread_chats: int
+    unread_messages: int
+
+
+class ChatCounters(BaseModel):
+    """GET /chats/counters - the unread badges, per platform and in total"""
+    unread_chats: int = 0
+    unread_messages: int = 0
+    platforms: List[PlatformUnread] = []  # only platforms with unread chats
+
+
 # ============================================================================
 # CATALOG SCHEMAS
 # ============================================================================
@@ -180,3 +299,81 @@ class CatalogItemResponse(CatalogItemBase):
     class Config:
         from_attributes = True
 
+
+
+# ============================================================================
+# IMPORT SCHEMAS
+# ============================================================================
+
+class ImportJobResponse(BaseModel):
+    """
+    An import job (POST /orders/import, /catalog/import, /chats/import)
+    Poll GET /imports/{id} until status is completed or failed
+    """
+    id: int
+    kind: str  # orders, catalog, chats
+    status: str  # pending, running, completed, failed
+    filename: Optional[str] = None
+    bytes_total: int
+    bytes_processed: int
+    rows_processed: int
+    rows_inserted: int
+    rows_failed: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ImportJobErrorResponse(BaseModel):
+    """A rejected row - line is the line number in the file (a CSV header is line 1)"""
+    line: int
+    message: str
+
+    class Config:
+        from_attributes = True
+
+
+# ============================================================================
+# SYNC SCHEMAS
+# ============================================================================
+
+class SyncChat(ChatBase):
+    """A changed chat in GET /sync - without messages (they are synced separately)"""
+    id: int
+    last_message: Optional[str] = None
+    last_message_date: datetime
+    message_count: int = 0
+    unread_count: int = 0
+    last_sender: Optional[str] = None
+    first_message_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncDeletion(BaseModel):
+    """A deleted row: collection is orders, chats (with its messages) or catalog"""
+    collection: str
+    id: int
+    deleted_at: datetime
+
+
+class SyncResponse(BaseModel):
+    """
+    Changes since a GET /sync cursor
+    Apply them (drop the deleted ids, then upsert the rows by id), store
+    next_cursor and pass it back as ?since=; while has_more is true, call
+    again right away.
+    """
+    orders: List[OrderResponse] = []
+    chats: List[SyncChat] = []
+    messages: List[MessageResponse] = []
+    catalog: List[CatalogItemResponse] = []
+    deleted: List[SyncDeletion] = []
+    next_cursor: str
+    has_more: bool = False
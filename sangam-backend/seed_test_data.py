@@ -15,6 +15,7 @@ sys.path.append(str(Path(__file__).parent))
 from sqlalchemy.orm import Session
 from db import SessionLocal
 from models import User, Chat, Message, Order, CatalogItem
+from chats import counters
 from datetime import datetime, timedelta
 import random
 
@@ -83,6 +84,7 @@ def create_test_chats(db: Session, user_id: int, num_chats: int = 10):
         for j, (text, sender) in enumerate(messages_to_add):
             message = Message(
                 chat_id=chat.id,
+                user_id=user_id,
                 text=text,
                 sender=sender,
                 created_at=chat.last_message_date + timedelta(minutes=j * 10)
@@ -95,6 +97,8 @@ def create_test_chats(db: Session, user_id: int, num_chats: int = 10):
         
         chats_created.append(chat)
     
+    # Message and unread counters for the new chats (see chats/counters.py)
+    counters.rebuild(db, user_id)
     db.commit()
     print(f"✅ Created {len(chats_created)} chats with messages")
     return chats_created
@@ -0,0 +1,8 @@
+# sync/__init__.py
+"""
+Delta sync - GET /sync sends a client everything that changed since its
+last call: orders, chats, messages and catalog items, plus deletions.
+
+    changes.py  updated_at / tombstone feeds and the sync cursor
+    routes.py   GET /sync
+"""
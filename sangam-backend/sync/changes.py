@@ -0,0 +1,124 @@
+# sync/changes.py
+"""
+Changes since a sync cursor.
+
+Orders, chats, messages and catalog items carry updated_at, set on every
+insert and update. Deletes leave a row in tombstones (record_deletes(),
+called by every delete path). Each of these five feeds is read in
+(updated_at, id) order from its own index, continuing after the position
+the cursor holds for it - so a sync costs the same however much history
+there is, and a page boundary never splits or repeats a row.
+
+The cursor is opaque to clients: URL-safe base64 JSON with one
+[timestamp, id] position per feed.
+
+A transaction that is still running when a sync reads a feed can commit
+later with an updated_at *before* the position the sync hands out, and
+would be missed. So once a feed is caught up, its position is held back
+to SYNC_SETTLE_SECONDS ago: rows changed in the last few seconds are sent
+again by the next sync. Clients apply changes by id, so that is harmless.
+Once nothing changes, the cursor stops moving and GET /sync answers 304.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from models import CatalogItem, Chat, Message, Order, Tombstone
+import pagination
+
+SYNC_SETTLE_SECONDS = int(os.getenv("SYNC_SETTLE_SECONDS", "10"))
+
+# feed -> (model, change timestamp column); the order is the response's
+FEEDS = {
+    "orders": (Order, Order.updated_at),
+    "chats": (Chat, Chat.updated_at),
+    "messages": (Message, Message.updated_at),
+    "catalog": (CatalogItem, CatalogItem.updated_at),
+    "deleted": (Tombstone, Tombstone.deleted_at),
+}
+
+# Tombstone collections (a chat's messages go with it)
+DELETABLE = ("orders", "chats", "catalog")
+
+Position = Tuple[datetime, int]
+
+
+def record_deletes(db, user_id: int, collection: str, ids: Iterable[int]):
+    """
+    Leaves a tombstone for each deleted row (caller commits, together with
+    the delete). db is a sync Session - routes call it via run_sync.
+    """
+    if collection not in DELETABLE:
+        raise ValueError(f"Unknown collection '{collection}'")
+    rows = [{"user_id": user_id, "collection": collection, "entity_id": entity_id} for entity_id in ids]
+    if rows:
+        db.execute(insert(Tombstone), rows)
+
+
+def decode_positions(cursor: str) -> Dict[str, Position]:
+    """Cursor -> {feed: (timestamp, id)}; raises a 400 if malformed"""
+    data = pagination.decode_cursor(cursor)
+    positions = {}
+    for name, value in data.items():
+        if name not in FEEDS:
+            raise pagination.invalid_cursor
+        try:
+            timestamp, row_id = value
+            positions[name] = (datetime.fromisoformat(timestamp), int(row_id))
+        except (TypeError, ValueError):
+            raise pagination.invalid_cursor
+    return positions
+
+
+def encode_positions(positions: Dict[str, Optional[Position]]) -> str:
+    return pagination.encode_cursor({
+        name: [position[0].isoformat(), position[1]]
+        for name, position in positions.items() if position is not None
+    })
+
+
+def feed_query(name: str, user_id: int, position: Optional[Position]):
+    """One feed's rows in (timestamp, id) order, after position if there is one"""
+    model, timestamp = FEEDS[name]
+    query = select(model).where(model.user_id == user_id)
+    if position is not None:
+        query = query.where(pagination.after((timestamp, model.id), position, False))
+    return query.order_by(timestamp, model.id)
+
+
+def changes(db, user_id: int, since: Optional[str], limit: int) -> dict:
+    """
+    Up to limit changed rows per feed after the since cursor (None = from
+    the beginning), the next cursor and whether any feed has more.
+    A SyncResponse body; db is a sync Session (called via run_sync).
+    """
+    positions = decode_positions(since) if since else {}
+    settled = (datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS), 0)
+
+    result = {"has_more": False}
+    next_positions = {}
+    for name, (model, timestamp) in FEEDS.items():
+        position = positions.get(name)
+        rows = db.execute(feed_query(name, user_id, position).limit(limit + 1)).scalars().all()
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            position = (getattr(rows[-1], timestamp.key), rows[-1].id)
+        if not more and position is not None and position > settled:
+            # Caught up - re-read the last few seconds next time (see above)
+            position = settled
+
+        result["has_more"] = result["has_more"] or more
+        next_positions[name] = position
+        result[name] = rows
+
+    result["deleted"] = [
+        {"collection": row.collection, "id": row.entity_id, "deleted_at": row.deleted_at}
+        for row in result["deleted"]
+    ]
+    result["next_cursor"] = encode_positions(next_positions)
+    return result
@@ -0,0 +1,44 @@
+# sync/routes.py
+"""
+Sync API Route
+
+Endpoints:
+- GET /sync - Everything that changed since the client's last sync
+
+A client starts with GET /sync (no cursor: a full snapshot, page by page),
+then keeps calling GET /sync?since=<next_cursor>. See sync/changes.py.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from db import get_async_read_db
+from auth.utils import get_current_principal, Principal
+from sync import changes
+import schemas
+import versions
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("/", response_model=schemas.SyncResponse, dependencies=[Depends(versions.etag("orders", "chats", "catalog"))])
+async def sync(
+    since: Optional[str] = Query(None, description="next_cursor of the previous sync (omit for a full sync)"),
+    limit: int = Query(500, ge=1, le=1000, description="Rows per collection"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    GET /sync - Changed and deleted orders, chats, messages and catalog items
+
+    Apply deleted first, then upsert the rows by id. Store next_cursor and
+    send it as ?since= next time; while has_more is true, call again right
+    away. Nothing changed since the cursor answers 304 (send If-None-Match).
+    """
+    return await db.run_sync(changes.changes, current_user.id, since, limit)
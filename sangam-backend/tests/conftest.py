@@ -0,0 +1,61 @@
+# tests/conftest.py
+"""
+Shared fixtures for the backend tests.
+
+The tests run against DATABASE_URL. Without it they use a fresh SQLite
+file in a temporary directory. To run them against PostgreSQL:
+
+    createdb sangam_test
+    DATABASE_URL=postgresql://localhost/sangam_test python -m pytest
+
+Every test signs up users of its own, so the same database can be reused
+between runs. CI runs the suite on both (.github/workflows/backend-tests.yml).
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+# Must be set before the app (and db.py) is imported
+if not os.environ.get("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+ORDER = {
+    "customer_name": "Asha Patel", "product": "Brass Lamp", "category": "Home Decor", "amount": 40.0,
+    "payment_method": "COD", "payment_status": "Unpaid", "delivery_status": "Pending",
+    "source": "Instagram",
+}
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup (migrations) and shutdown run once for the whole session"""
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def sign_up(client) -> dict:
+    """A new user; returns {"id", "username", "headers", "refresh_token"}"""
+    credentials = {"username": f"{uuid.uuid4().hex[:12]}@example.com", "password": "test-password"}
+    response = client.post("/signup", json=credentials)
+    assert response.status_code == 200, response.text
+    user_id = response.json()["id"]
+    response = client.post("/login", json=credentials)
+    assert response.status_code == 200, response.text
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return {"id": user_id, "username": credentials["username"], "headers": headers, "refresh_token": tokens["refresh_token"]}
+
+
+@pytest.fixture
+def user(client) -> dict:
+    return sign_up(client)
@@ -0,0 +1,64 @@
+# tests/test_auth_sessions.py
+"""
+Refresh sessions (auth/sessions.py): rotation, family revocation when a
+rotated refresh token is replayed, logout, and revocations made by another
+worker reaching this one through the revoked-set poll.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import update
+
+import db
+from auth import sessions
+from models import UserSession
+
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_and_the_old_token_is_single_use(client, user):
+    response = refresh(client, user["refresh_token"])
+    assert response.status_code == 200, response.text
+    tokens = response.json()
+    assert tokens["refresh_token"] != user["refresh_token"]
+    assert client.get("/orders/", headers=bearer(tokens)).status_code == 200
+
+    assert refresh(client, user["refresh_token"]).status_code == 401
+
+
+def test_replaying_a_rotated_token_revokes_the_whole_login(client, user):
+    tokens = refresh(client, user["refresh_token"]).json()
+    assert refresh(client, user["refresh_token"]).status_code == 401  # replay
+
+    assert client.get("/orders/", headers=bearer(tokens)).status_code == 401
+    assert client.get("/orders/", headers=user["headers"]).status_code == 401
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_revoke_logs_the_session_out(client, user):
+    assert client.get("/orders/", headers=user["headers"]).status_code == 200
+    response = client.post("/token/revoke", json={"refresh_token": user["refresh_token"]})
+    assert response.status_code == 204
+
+    assert client.get("/orders/", headers=user["headers"]).status_code == 401
+    assert refresh(client, user["refresh_token"]).status_code == 401
+
+
+def test_revocations_by_another_worker_arrive_with_the_poll(client, user):
+    assert client.get("/orders/", headers=user["headers"]).status_code == 200
+    # Another worker logs the user out: the row changes, this worker's set doesn't
+    with db.SessionLocal() as session:
+        session.execute(
+            update(UserSession).where(UserSession.user_id == user["id"]).values(revoked_at=datetime.utcnow())
+        )
+        session.commit()
+        assert client.get("/orders/", headers=user["headers"]).status_code == 200
+
+        assert sessions.sync_revoked_sessions(session) >= 1
+    assert client.get("/orders/", headers=user["headers"]).status_code == 401
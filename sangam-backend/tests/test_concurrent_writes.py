@@ -0,0 +1,63 @@
+# tests/test_concurrent_writes.py
+"""
+Read-modify-write routes under concurrency: parallel requests against the
+same rows must leave the maintained aggregates (order rollups, chat
+counters) equal to what the rows add up to.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+from chats import counters
+from orders import analytics
+from tests.conftest import ORDER
+
+REQUESTS = 40
+
+
+def run_concurrently(calls):
+    # Each thread's request is handed to the app's event loop, so they run interleaved
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        return list(pool.map(lambda call: call(), calls))
+
+
+def test_concurrent_order_updates_keep_rollups_exact(client, user):
+    order = client.post("/orders/", json=ORDER, headers=user["headers"]).json()
+
+    def update(n: int):
+        body = {"delivery_status": ("Shipped", "Pending")[n % 2], "amount": 10.0 + n}
+        return lambda: client.put(f"/orders/{order['id']}", json=body, headers=user["headers"])
+
+    responses = run_concurrently([update(n) for n in range(REQUESTS)])
+    assert [response.text for response in responses if response.status_code != 200] == []
+    with db.engine.connect() as connection:
+        assert analytics.drift(connection, user["id"]) == []
+
+
+def test_concurrent_deletes_of_one_order_count_it_once(client, user):
+    orders = [client.post("/orders/", json=ORDER, headers=user["headers"]).json() for _ in range(REQUESTS // 4)]
+
+    def delete(order: dict):
+        return lambda: client.delete(f"/orders/{order['id']}", headers=user["headers"])
+
+    responses = run_concurrently([delete(order) for order in orders for _ in range(4)])
+    assert sorted({response.status_code for response in responses}) == [204, 404]
+    assert sum(response.status_code == 204 for response in responses) == len(orders)
+    with db.engine.connect() as connection:
+        assert analytics.drift(connection, user["id"]) == []
+
+
+def test_concurrent_messages_keep_chat_counters_exact(client, user):
+    body = {"customer_name": "Ravi", "platform": "WhatsApp", "messages": [{"text": "Hi", "sender": "them"}]}
+    chat = client.post("/chats/create-with-messages", json=body, headers=user["headers"]).json()
+
+    def message(n: int):
+        body = {"text": f"Message {n}", "sender": "me" if n % 5 == 4 else "them"}
+        return lambda: client.post(f"/chats/{chat['id']}/messages", json=body, headers=user["headers"])
+
+    responses = run_concurrently([message(n) for n in range(REQUESTS)])
+    assert [response.text for response in responses if response.status_code != 201] == []
+    with db.engine.connect() as connection:
+        assert counters.drift(connection, user["id"]) == ([], [])
+    summary = client.get(f"/chats/{chat['id']}", headers=user["headers"]).json()
+    assert summary["message_count"] == REQUESTS + 1
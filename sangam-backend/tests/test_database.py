@@ -0,0 +1,169 @@
+# tests/test_database.py
+"""
+The dialect-specific code paths, run against whatever DATABASE_URL points
+at (SQLite by default, PostgreSQL in CI - see conftest.py):
+
+- migrations: a fresh database upgrades once to the models' schema, rows
+  of a baseline database are backfilled; on PostgreSQL concurrent upgrades
+  serialize on the advisory lock
+- dialect_insert() upserts behind the order rollups and chat counters
+- order search: FTS5 on SQLite, the ilike fallback elsewhere
+- exports streamed with yield_per (server-side cursors on asyncpg)
+"""
+
+import json
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+import db
+import exports
+import migrations
+from chats import counters
+from migrations import v001_baseline
+from orders import analytics, search
+from tests.conftest import ORDER, sign_up
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    """An engine on an empty database: a new SQLite file, or a new PostgreSQL schema"""
+    if db.is_sqlite():
+        engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+        yield engine
+        engine.dispose()
+        return
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with db.engine.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(db.DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with db.engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def recorded_versions(engine) -> list:
+    with engine.connect() as connection:
+        return sorted(connection.execute(select(migrations.schema_migrations.c.version)).scalars())
+
+
+def test_upgrade_applies_every_migration_once(fresh_engine):
+    versions = [version for version, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(fresh_engine) == versions
+    assert migrations.upgrade(fresh_engine) == []
+    assert recorded_versions(fresh_engine) == versions
+
+
+def test_upgrade_builds_the_models_schema(fresh_engine):
+    migrations.upgrade(fresh_engine)
+    inspector = inspect(fresh_engine)
+    for table in db.Base.metadata.sorted_tables:
+        assert inspector.has_table(table.name), table.name
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == {column.name for column in table.columns}, table.name
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes, table.name
+
+
+def test_upgrade_backfills_a_baseline_database(fresh_engine):
+    with fresh_engine.begin() as connection:
+        v001_baseline.upgrade(connection)
+        connection.execute(text("INSERT INTO users (id, username, hashed_password) VALUES (1, 'shop', 'x')"))
+        for order_id, product, day in (("ORD-001", "Brass Lamp", "01"), ("ORD-007", "Silk Scarf", "02")):
+            connection.execute(text(
+                "INSERT INTO orders (user_id, order_id, customer_name, product, category, amount, "
+                "payment_method, payment_status, delivery_status, source, order_date) "
+                "VALUES (1, :order_id, 'Asha', :product, 'Art', 40.0, 'COD', 'Paid', 'Pending', 'Instagram', :date)"
+            ), {"order_id": order_id, "product": product, "date": f"2024-05-{day} 10:00:00.000000"})
+        connection.execute(text(
+            "INSERT INTO chats (id, user_id, customer_name, platform, status) VALUES (1, 1, 'Ravi', 'WhatsApp', 'unread')"
+        ))
+        for n, sender in enumerate(("them", "me", "them", "them")):
+            connection.execute(text(
+                "INSERT INTO messages (chat_id, text, sender, created_at) VALUES (1, 'Hi', :sender, :date)"
+            ), {"sender": sender, "date": f"2024-05-01 10:00:0{n}.000000"})
+
+    migrations.upgrade(fresh_engine)
+    with fresh_engine.connect() as connection:
+        assert analytics.drift(connection) == []
+        assert counters.drift(connection) == ([], [])
+        assert counters.totals(connection, 1) == [{"platform": "WhatsApp", "unread_chats": 1, "unread_messages": 2}]
+        assert connection.execute(text("SELECT last_number FROM order_counters WHERE user_id = 1")).scalar() == 7
+        if connection.dialect.name == "sqlite":
+            search.check(connection)
+            match = search.match_expression("lamp", search.current_tokenizer(connection), 1)
+            found = connection.execute(text("SELECT rowid FROM orders_fts WHERE orders_fts MATCH :q"), {"q": match})
+            assert len(found.all()) == 1
+
+
+def test_concurrent_upgrades_wait_for_the_advisory_lock(fresh_engine):
+    if fresh_engine.dialect.name != "postgresql":
+        pytest.skip("the advisory lock is PostgreSQL only")
+
+    applied, errors = [], []
+
+    def upgrade():
+        try:
+            applied.append(migrations.upgrade(fresh_engine))
+        except Exception as error:  # surfaced by the assertion below
+            errors.append(error)
+
+    workers = [threading.Thread(target=upgrade) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    versions = [version for version, _ in migrations.MIGRATIONS]
+    assert sorted(v for result in applied for v in result) == versions
+    assert recorded_versions(fresh_engine) == versions
+
+
+def test_rollup_and_counter_upserts(client, user):
+    # Two orders in the same rollup bucket: the second one is an ON CONFLICT update
+    for amount in (40.0, 60.0):
+        assert client.post("/orders/", json={**ORDER, "amount": amount}, headers=user["headers"]).status_code == 201
+    for name in ("Ravi", "Meena"):
+        body = {"customer_name": name, "platform": "WhatsApp", "messages": [{"text": "Hi", "sender": "them"}]}
+        assert client.post("/chats/create-with-messages", json=body, headers=user["headers"]).status_code == 201
+
+    analytics_body = client.get("/orders/analytics", headers=user["headers"]).json()
+    assert analytics_body["total_orders"] == 2
+    assert analytics_body["total_revenue"] == 100.0
+    assert client.get("/chats/counters", headers=user["headers"]).json()["platforms"] == [
+        {"platform": "WhatsApp", "unread_chats": 2, "unread_messages": 2}
+    ]
+
+    with db.engine.connect() as connection:
+        assert analytics.drift(connection, user["id"]) == []
+        assert counters.drift(connection, user["id"]) == ([], [])
+
+
+def test_order_search(client, user):
+    other = sign_up(client)
+    client.post("/orders/", json={**ORDER, "product": "Brass Lamp"}, headers=user["headers"])
+    client.post("/orders/", json={**ORDER, "product": "Silk Scarf"}, headers=user["headers"])
+    client.post("/orders/", json={**ORDER, "product": "Brass Lamp"}, headers=other["headers"])
+
+    response = client.get("/orders/search", params={"q": "lamp"}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    assert [order["product"] for order in response.json()["items"]] == ["Brass Lamp"]
+
+
+def test_export_streams_in_chunks(client, user, monkeypatch):
+    for n in range(5):
+        client.post("/orders/", json={**ORDER, "customer_name": f"Customer {n}"}, headers=user["headers"])
+    # Two rows per fetch, so the export takes several round trips on the cursor
+    monkeypatch.setattr(exports.stream_rows, "__defaults__", (2,))
+
+    response = client.get("/orders/export", params={"format": "ndjson"}, headers=user["headers"])
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["customer_name"] for row in rows] == [f"Customer {n}" for n in range(5)]
@@ -0,0 +1,52 @@
+# tests/test_import_jobs.py
+"""
+Import jobs across worker processes: a sweep only fails pending/running
+jobs whose heartbeat is stale, and a worker keeps the jobs queued in it
+alive (imports/jobs.py).
+"""
+
+from datetime import datetime, timedelta
+
+import db
+from imports import jobs
+from models import ImportJob
+
+
+def add_job(user_id: int, status: str, heartbeat_age: float) -> int:
+    now = datetime.utcnow()
+    job = ImportJob(
+        user_id=user_id, kind="orders", status=status, bytes_total=1, created_at=now,
+        heartbeat_at=now - timedelta(seconds=heartbeat_age),
+    )
+    with db.SessionLocal() as session:
+        session.add(job)
+        session.commit()
+        return job.id
+
+
+def statuses(*job_ids: int) -> list:
+    with db.SessionLocal() as session:
+        return [session.get(ImportJob, job_id).status for job_id in job_ids]
+
+
+def test_sweep_fails_only_jobs_without_a_recent_heartbeat(user):
+    stale = jobs.IMPORT_STALE_SECONDS + 60
+    live_running = add_job(user["id"], "running", 5)
+    live_pending = add_job(user["id"], "pending", 5)
+    dead_running = add_job(user["id"], "running", stale)
+    dead_pending = add_job(user["id"], "pending", stale)
+
+    with db.SessionLocal() as session:
+        assert jobs.fail_interrupted(session) >= 2
+    assert statuses(live_running, live_pending, dead_running, dead_pending) == ["running", "pending", "failed", "failed"]
+
+
+def test_keep_alive_refreshes_jobs_queued_in_this_worker(user, monkeypatch):
+    queued = add_job(user["id"], "pending", jobs.IMPORT_STALE_SECONDS - 1)
+    monkeypatch.setattr(jobs, "_queued", {queued})
+
+    with db.SessionLocal() as session:
+        jobs.keep_alive(session)
+        heartbeat = session.get(ImportJob, queued).heartbeat_at
+    assert datetime.utcnow() - heartbeat < timedelta(seconds=60)
+    assert statuses(queued) == ["pending"]
@@ -0,0 +1,30 @@
+# tests/test_order_numbers.py
+"""
+Order numbers under concurrency: parallel POST /orders/ for the same users
+must all succeed with distinct, consecutive order ids (orders/numbering.py).
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.conftest import ORDER, sign_up
+
+REQUESTS = 200
+USERS = 2
+
+
+def test_concurrent_creates_get_consecutive_order_ids(client):
+    users = [sign_up(client) for _ in range(USERS)]
+
+    def create(n: int):
+        return n % USERS, client.post("/orders/", json=ORDER, headers=users[n % USERS]["headers"])
+
+    # Each thread's request is handed to the app's event loop, so they run interleaved
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(create, range(REQUESTS)))
+
+    assert [response.text for _, response in results if response.status_code != 201] == []
+    for index in range(USERS):
+        order_ids = [response.json()["order_id"] for user, response in results if user == index]
+        assert [order_id for order_id, n in Counter(order_ids).items() if n > 1] == []
+        assert sorted(order_ids) == [f"ORD-{n:03d}" for n in range(1, REQUESTS // USERS + 1)]
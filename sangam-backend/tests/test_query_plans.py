@@ -0,0 +1,22 @@
+# tests/test_query_plans.py
+"""
+Every route query is served by an index: EXPLAIN QUERY PLAN shows no full
+table scan and no sort of all matching rows (see migrations/explain.py,
+which builds the statements from the routes' own query functions).
+"""
+
+import pytest
+
+import db
+from migrations import explain
+
+ROUTE_QUERIES = explain.route_queries()
+
+
+@pytest.mark.skipif(not db.is_sqlite(), reason="reads SQLite query plans")
+@pytest.mark.parametrize("route, statement", ROUTE_QUERIES, ids=[route for route, _ in ROUTE_QUERIES])
+def test_route_query_uses_an_index(client, route, statement):
+    # client: the app's startup has migrated the database
+    with db.engine.connect() as connection:
+        plan = explain.query_plan(connection, statement)
+    assert explain.full_scans(plan) == [], f"{route}: {plan}"
@@ -0,0 +1,122 @@
+# versions.py
+"""
+Per-user change versions and conditional GETs (ETag / 304).
+
+collection_versions holds one counter per user and collection: "orders",
+"chats" (chats and their messages) and "catalog". Every write path calls
+bump() in the same transaction as the write, so the counter changes
+exactly when the data does.
+
+GET routes declare dependencies=[Depends(versions.etag("orders"))]. That
+dependency reads the counter (one primary-key lookup) and derives an ETag
+from it, the user and the request URL, so every page and filter
+combination has its own tag. If the request's If-None-Match matches, it
+ends right there with a 304 - before any row is loaded or serialized.
+Otherwise the route runs as usual and the ETag goes out with the response.
+
+The counter is read before the route's own query, so a write landing in
+between can only make the ETag older than the data it is sent with; the
+next request then gets a normal 200. A 304 never hides a change.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.utils import get_current_principal, Principal
+from db import dialect_insert, get_async_read_db
+from models import CollectionVersion
+
+COLLECTIONS = ("orders", "chats", "catalog")
+
+# Part of every ETag - bump it when a response format changes, so clients
+# don't keep a cached body in the old shape
+ETAG_GENERATION = 3
+
+# Browsers may keep the response, but must revalidate it every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump_statement(dialect_name: str, user_id: int, collection: str):
+    """Upsert that advances one counter by 1 (creating it at 1)"""
+    table = CollectionVersion.__table__
+    insert = dialect_insert(dialect_name)
+    return (
+        insert(table)
+        .values(user_id=user_id, collection=collection, version=1)
+        .on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.collection],
+            set_={"version": table.c.version + 1},
+        )
+    )
+
+
+def bump(db, user_id: int, *collections: str):
+    """
+    Marks the user's collections as changed (caller commits).
+    db is a Session (routes via run_sync, import jobs) or a Connection.
+    """
+    dialect = db.get_bind().dialect if hasattr(db, "get_bind") else db.dialect
+    for collection in collections:
+        db.execute(bump_statement(dialect.name, user_id, collection))
+
+
+async def current_versions(db: AsyncSession, user_id: int, collections: Iterable[str]) -> Dict[str, int]:
+    """collection -> version (0 if it never changed)"""
+    collections = list(collections)
+    result = await db.execute(
+        select(CollectionVersion.collection, CollectionVersion.version).where(
+            CollectionVersion.user_id == user_id,
+            CollectionVersion.collection.in_(collections),
+        )
+    )
+    stored = dict(result.all())
+    return {collection: stored.get(collection, 0) for collection in collections}
+
+
+def make_etag(user_id: int, versions: Dict[str, int], request: Request) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    state = ",".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    raw = f"{ETAG_GENERATION}|{user_id}|{state}|{request.url.path}?{query}"
+    return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" and "x" are the same tag"""
+    if not if_none_match:
+        return False
+    wanted = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == wanted:
+            return True
+    return False
+
+
+def etag(*collections: str):
+    """
+    Dependency for a GET route whose response depends only on the given
+    collections of the current user: answers 304 if the client's copy is
+    current, otherwise sets ETag on the route's response.
+    """
+    for collection in collections:
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Unknown collection '{collection}'")
+
+    async def check_etag(
+        request: Request,
+        response: Response,
+        current_user: Principal = Depends(get_current_principal),
+        db: AsyncSession = Depends(get_async_read_db),
+    ):
+        versions = await current_versions(db, current_user.id, collections)
+        value = make_etag(current_user.id, versions, request)
+        headers = {"ETag": value, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+        if matches(request.headers.get("if-none-match"), value):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return check_etag
@@ -23,14 +23,49 @@ axiosInstance.interceptors.request.use((config) => {
   return config;
 });
 
-// Handle 401 errors (unauthorized) - redirect to login
+// Exchange the refresh token for a new token pair (no password needed).
+// Concurrent 401s share one refresh call because the refresh token rotates.
+let refreshPromise: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) {
+    return Promise.resolve(null);
+  }
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${API_BASE_URL}/token/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        localStorage.setItem("token", response.data.access_token);
+        localStorage.setItem("refresh_token", response.data.refresh_token);
+        return response.data.access_token as string;
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
+// Handle 401 errors (unauthorized) - try a token refresh once, then redirect to login
 axiosInstance.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const originalRequest = error.config;
+    if (error.response?.status === 401 && originalRequest && !originalRequest._retried) {
+      originalRequest._retried = true;
+      const newToken = await refreshAccessToken();
+      if (newToken) {
+        originalRequest.headers.Authorization = `Bearer ${newToken}`;
+        return axiosInstance(originalRequest);
+      }
+    }
     if (error.response?.status === 401) {
       console.error("❌ 401 Unauthorized - Token expired or invalid");
       console.error("   Redirecting to login...");
       localStorage.removeItem("token");
+      localStorage.removeItem("refresh_token");
       // Only redirect if we're not already on login page
       if (window.location.pathname !== "/login") {
         window.location.href = "/login";
@@ -16,6 +16,10 @@ export interface Chat {
   status: 'read' | 'unread';
   last_message: string | null;
   last_message_date: string;
+  message_count?: number;
+  unread_count?: number;
+  last_sender?: 'me' | 'them' | null;
+  first_message_at?: string | null;
   messages: Message[];
 }
 
@@ -26,6 +30,27 @@ export interface Message {
   text: string;
   sender: 'me' | 'them';
   created_at: string;
+  updated_at?: string;
+}
+
+// One chat in the chat list (GET /chats/ without messages)
+export interface ChatSummary {
+  id: number;
+  customer_name: string;
+  platform: 'WhatsApp' | 'Facebook' | 'Instagram';
+  status: 'read' | 'unread';
+  last_message: string | null;
+  last_message_date: string;
+  unread_count: number; // customer messages since the last reply (0 once read)
+  message_count: number;
+  last_sender: 'me' | 'them' | null;
+}
+
+// Unread badges (GET /chats/counters) - only platforms with unread chats are listed
+export interface ChatCounters {
+  unread_chats: number;
+  unread_messages: number;
+  platforms: { platform: string; unread_chats: number; unread_messages: number }[];
 }
 
 // Type for creating a new chat
@@ -42,10 +67,24 @@ export interface CreateMessageData {
 }
 
 /**
- * Get all chats for the current user
- * GET /chats/
+ * Get all chats for the current user, with all their messages
+ * GET /chats/?include_messages=true
  */
 export const getChats = async (): Promise<Chat[]> => {
+  try {
+    const response = await axiosInstance.get('/chats/', { params: { include_messages: true } });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error fetching chats:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to fetch chats');
+  }
+};
+
+/**
+ * Get the chat list - no messages, so it stays small however long the chats are
+ * GET /chats/
+ */
+export const getChatSummaries = async (): Promise<ChatSummary[]> => {
   try {
     const response = await axiosInstance.get('/chats/');
     return response.data;
@@ -55,6 +94,20 @@ export const getChats = async (): Promise<Chat[]> => {
   }
 };
 
+/**
+ * Get the unread badges without loading any chats
+ * GET /chats/counters
+ */
+export const getChatCounters = async (): Promise<ChatCounters> => {
+  try {
+    const response = await axiosInstance.get('/chats/counters');
+    return response.data;
+  } catch (error: any) {
+    console.error('Error fetching chat counters:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to fetch chat counters');
+  }
+};
+
 /**
  * Get a single chat with all its messages
  * GET /chats/{chat_id}
@@ -110,6 +163,28 @@ export const deleteChat = async (chatId: number): Promise<void> => {
   }
 };
 
+export interface MessagesPage {
+  items: Message[]; // newest first
+  next_cursor: string | null; // pass as `before` to load older messages
+  has_more: boolean;
+}
+
+/**
+ * Get one page of a chat's messages, newest first
+ * GET /chats/{chat_id}/messages?before=&limit=
+ */
+export const getMessagesPage = async (chatId: number, before?: string | null, limit = 50): Promise<MessagesPage> => {
+  try {
+    const response = await axiosInstance.get(`/chats/${chatId}/messages`, {
+      params: { ...(before ? { before } : {}), limit },
+    });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error fetching messages:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to fetch messages');
+  }
+};
+
 /**
  * Add a message to a chat
  * POST /chats/{chat_id}/messages
@@ -0,0 +1,86 @@
+// api/events.ts
+/**
+ * Live Events
+ *
+ * The backend pushes the current user's changes (new messages, orders,
+ * chat status...) over a WebSocket at /ws, or as Server-Sent Events at
+ * /events where WebSockets are blocked. Each event is {type, data}.
+ *
+ * On "resync" (events were dropped) or after a reconnect, catch up with
+ * getChanges() from ./sync - live events are not replayed.
+ */
+
+import axiosInstance from './axiosInstance';
+
+export type LiveEventType =
+  | 'message.created'
+  | 'chat.created'
+  | 'chat.updated'
+  | 'chat.deleted'
+  | 'chats.synced'
+  | 'order.created'
+  | 'order.updated'
+  | 'order.deleted'
+  | 'orders.changed'
+  | 'import.finished'
+  | 'ping'
+  | 'resync'
+  | 'expired'
+  | 'error';
+
+export interface LiveEvent {
+  type: LiveEventType;
+  data: any;
+}
+
+const eventsUrl = (path: string, protocol?: 'ws' | 'wss'): string => {
+  const url = new URL(path, axiosInstance.defaults.baseURL || window.location.origin);
+  if (protocol) {
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+  }
+  url.searchParams.set('token', localStorage.getItem('token') || '');
+  return url.toString();
+};
+
+/**
+ * Listen for live events. Tries the WebSocket first and falls back to SSE
+ * if it never opens. Returns a function that stops listening.
+ * Pings are not passed to onEvent.
+ */
+export const listenForEvents = (
+  onEvent: (event: LiveEvent) => void,
+  onClose?: () => void
+): (() => void) => {
+  let stopped = false;
+  let source: EventSource | null = null;
+
+  const handle = (raw: string) => {
+    const event: LiveEvent = JSON.parse(raw);
+    if (event.type !== 'ping') {
+      onEvent(event);
+    }
+  };
+
+  const socket = new WebSocket(eventsUrl('/ws', 'ws'));
+  let opened = false;
+  socket.onopen = () => {
+    opened = true;
+  };
+  socket.onmessage = (message) => handle(message.data);
+  socket.onclose = () => {
+    if (stopped) return;
+    if (!opened) {
+      // Blocked (e.g. by a proxy) - use Server-Sent Events instead
+      source = new EventSource(eventsUrl('/events'));
+      source.onmessage = (message) => handle(message.data);
+      return;
+    }
+    onClose?.();
+  };
+
+  return () => {
+    stopped = true;
+    socket.close();
+    source?.close();
+  };
+};
@@ -0,0 +1,94 @@
+// api/imports.ts
+/**
+ * Imports API Service
+ *
+ * CSV imports of orders and catalog items, NDJSON imports of chats with
+ * their messages. The file is uploaded as the raw request body; the backend
+ * imports it in the background and returns a job to poll with getImportJob().
+ */
+
+import axiosInstance from './axiosInstance';
+
+export interface ImportJob {
+  id: number;
+  kind: 'orders' | 'catalog' | 'chats';
+  status: 'pending' | 'running' | 'completed' | 'failed';
+  filename: string | null;
+  bytes_total: number;
+  bytes_processed: number; // bytes_processed / bytes_total = progress
+  rows_processed: number;
+  rows_inserted: number;
+  rows_failed: number;
+  error: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+export interface ImportJobError {
+  line: number; // line in the file (a CSV header is line 1)
+  message: string;
+}
+
+const startImport = async (path: string, file: File, contentType = 'text/csv'): Promise<ImportJob> => {
+  try {
+    const response = await axiosInstance.post(path, file, {
+      params: { filename: file.name },
+      headers: { 'Content-Type': contentType },
+    });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error starting import:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to upload the file');
+  }
+};
+
+/**
+ * Import orders from a CSV file
+ * POST /orders/import
+ */
+export const importOrdersCsv = (file: File): Promise<ImportJob> => startImport('/orders/import', file);
+
+/**
+ * Import catalog items from a CSV file
+ * POST /catalog/import
+ */
+export const importCatalogCsv = (file: File): Promise<ImportJob> => startImport('/catalog/import', file);
+
+/**
+ * Import chats with their messages from an NDJSON file - one chat per line:
+ * {"customer_name", "platform", "status"?, "messages": [{"text", "sender", "created_at"?}]}
+ * POST /chats/import
+ */
+export const importChatsNdjson = (file: File): Promise<ImportJob> =>
+  startImport('/chats/import', file, 'application/x-ndjson');
+
+/**
+ * Get an import job (poll until status is completed or failed)
+ * GET /imports/{job_id}
+ */
+export const getImportJob = async (jobId: number): Promise<ImportJob> => {
+  try {
+    const response = await axiosInstance.get(`/imports/${jobId}`);
+    return response.data;
+  } catch (error: any) {
+    console.error('Error fetching import job:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to fetch import job');
+  }
+};
+
+/**
+ * Get the rows an import job rejected, in file order
+ * GET /imports/{job_id}/errors
+ */
+export const getImportJobErrors = async (jobId: number, afterLine = 0, limit = 100): Promise<ImportJobError[]> => {
+  try {
+    const response = await axiosInstance.get(`/imports/${jobId}/errors`, {
+      params: { after_line: afterLine, limit },
+    });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error fetching import errors:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to fetch import errors');
+  }
+};
@@ -50,38 +50,100 @@ export interface UpdateOrderData {
   rating?: number | null;
 }
 
+/**
+ * Transform a backend order (OrderResponse) to the frontend Order type
+ */
+export const toOrder = (order: any): Order => ({
+  id: order.order_id, // Backend uses order_id, frontend expects id
+  orderDate: order.order_date,
+  customerName: order.customer_name,
+  customerContact: order.customer_contact || '',
+  trackingId: order.tracking_id || 'N/A',
+  category: order.category,
+  product: order.product,
+  amount: order.amount,
+  paymentMethod: order.payment_method,
+  paymentStatus: order.payment_status,
+  paymentDate: order.payment_date,
+  deliveryStatus: order.delivery_status,
+  source: order.source,
+  processStatus: order.process_status || 'production',
+  note: order.note,
+  rating: order.rating,
+});
+
 /**
  * Get all orders for the current user
- * GET /orders/
+ * GET /orders/?all=true (unpaginated list - the dashboard filters and sorts locally)
  */
 export const getOrders = async (): Promise<Order[]> => {
   try {
-    const response = await axiosInstance.get('/orders/');
-    // Transform backend response to match frontend Order type
-    return response.data.map((order: any) => ({
-      id: order.order_id, // Backend uses order_id, frontend expects id
-      orderDate: order.order_date,
-      customerName: order.customer_name,
-      customerContact: order.customer_contact || '',
-      trackingId: order.tracking_id || 'N/A',
-      category: order.category,
-      product: order.product,
-      amount: order.amount,
-      paymentMethod: order.payment_method,
-      paymentStatus: order.payment_status,
-      paymentDate: order.payment_date,
-      deliveryStatus: order.delivery_status,
-      source: order.source,
-      processStatus: order.process_status || 'production',
-      note: order.note,
-      rating: order.rating,
-    }));
+    const response = await axiosInstance.get('/orders/', { params: { all: true } });
+    return response.data.map(toOrder);
   } catch (error: any) {
     console.error('Error fetching orders:', error);
     throw new Error(error.response?.data?.detail || 'Failed to fetch orders');
   }
 };
 
+// Query parameters for one page of GET /orders/
+export interface OrdersPageParams {
+  limit?: number;
+  cursor?: string | null;
+  sort?: 'order_date' | 'amount' | 'customer_name';
+  order?: 'asc' | 'desc';
+  delivery_status?: string;
+  payment_status?: string;
+  process_status?: string;
+  source?: string;
+  category?: string;
+  date_from?: string;
+  date_to?: string;
+}
+
+export interface OrdersPage {
+  items: Order[];
+  nextCursor: string | null; // pass as `cursor` to get the next page
+  hasMore: boolean;
+}
+
+/**
+ * Get one page of orders, filtered and sorted on the server
+ * GET /orders/?limit=&cursor=&sort=&order=&...filters
+ */
+export const getOrdersPage = async (params: OrdersPageParams = {}): Promise<OrdersPage> => {
+  try {
+    const response = await axiosInstance.get('/orders/', { params });
+    return {
+      items: response.data.items.map(toOrder),
+      nextCursor: response.data.next_cursor,
+      hasMore: response.data.has_more,
+    };
+  } catch (error: any) {
+    console.error('Error fetching orders page:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to fetch orders');
+  }
+};
+
+/**
+ * Search orders by customer, contact, product, note, tracking id or order id
+ * (best match first; each word matches as a prefix)
+ * GET /orders/search?q=&limit=&cursor=
+ */
+export const searchOrders = async (q: string, cursor: string | null = null, limit = 20): Promise<OrdersPage> => {
+  try {
+    const response = await axiosInstance.get('/orders/search', { params: { q, cursor, limit } });
+    return {
+      items: response.data.items.map(toOrder),
+      nextCursor: response.data.next_cursor,
+      hasMore: response.data.has_more,
+    };
+  } catch (error: any) {
+    console.error('Error searching orders:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to search orders');
+  }
+};
+
 /**
  * Get a single order by ID
  * GET /orders/{order_id}
@@ -89,25 +151,7 @@ export const getOrders = async (): Promise<Order[]> => {
 export const getOrder = async (orderId: number): Promise<Order> => {
   try {
     const response = await axiosInstance.get(`/orders/${orderId}`);
-    const order = response.data;
-    return {
-      id: order.order_id,
-      orderDate: order.order_date,
-      customerName: order.customer_name,
-      customerContact: order.customer_contact || '',
-      trackingId: order.tracking_id || 'N/A',
-      category: order.category,
-      product: order.product,
-      amount: order.amount,
-      paymentMethod: order.payment_method,
-      paymentStatus: order.payment_status,
-      paymentDate: order.payment_date,
-      deliveryStatus: order.delivery_status,
-      source: order.source,
-      processStatus: order.process_status || 'production',
-      note: order.note,
-      rating: order.rating,
-    };
+    return toOrder(response.data);
   } catch (error: any) {
     console.error('Error fetching order:', error);
     throw new Error(error.response?.data?.detail || 'Failed to fetch order');
@@ -123,25 +167,7 @@ export const createOrder = async (orderData: CreateOrderData): Promise<Order> =>
     console.log('📤 API: Creating order with payload:', orderData);
     const response = await axiosInstance.post('/orders/', orderData);
     console.log('✅ API: Order created, response:', response.data);
-    const order = response.data;
-    return {
-      id: order.order_id,
-      orderDate: order.order_date,
-      customerName: order.customer_name,
-      customerContact: order.customer_contact || '',
-      trackingId: order.tracking_id || 'N/A',
-      category: order.category,
-      product: order.product,
-      amount: order.amount,
-      paymentMethod: order.payment_method,
-      paymentStatus: order.payment_status,
-      paymentDate: order.payment_date,
-      deliveryStatus: order.delivery_status,
-      source: order.source,
-      processStatus: order.process_status || 'production',
-      note: order.note,
-      rating: order.rating,
-    };
+    return toOrder(response.data);
   } catch (error: any) {
     console.error('❌ API Error creating order:', error);
     console.error('   Status:', error.response?.status);
@@ -171,25 +197,7 @@ export const createOrder = async (orderData: CreateOrderData): Promise<Order> =>
 export const updateOrder = async (orderId: number, orderData: UpdateOrderData): Promise<Order> => {
   try {
     const response = await axiosInstance.put(`/orders/${orderId}`, orderData);
-    const order = response.data;
-    return {
-      id: order.order_id,
-      orderDate: order.order_date,
-      customerName: order.customer_name,
-      customerContact: order.customer_contact || '',
-      trackingId: order.tracking_id || 'N/A',
-      category: order.category,
-      product: order.product,
-      amount: order.amount,
-      paymentMethod: order.payment_method,
-      paymentStatus: order.payment_status,
-      paymentDate: order.payment_date,
-      deliveryStatus: order.delivery_status,
-      source: order.source,
-      processStatus: order.process_status || 'production',
-      note: order.note,
-      rating: order.rating,
-    };
+    return toOrder(response.data);
   } catch (error: any) {
     console.error('Error updating order:', error);
     throw new Error(error.response?.data?.detail || 'Failed to update order');
@@ -209,3 +217,37 @@ export const deleteOrder = async (orderId: number): Promise<void> => {
   }
 };
 
+
+// Body of POST /orders/bulk (ids are database ids, not "ORD-001" strings)
+export interface BulkOrdersRequest {
+  create?: CreateOrderData[];
+  update?: (UpdateOrderData & { id: number })[];
+  delete?: number[];
+}
+
+export interface BulkOrderItemResult {
+  index: number; // position in the request list
+  id: number | null;
+  order_id: string | null;
+  status: 'created' | 'updated' | 'deleted' | 'not_found';
+}
+
+export interface BulkOrdersResponse {
+  created: BulkOrderItemResult[];
+  updated: BulkOrderItemResult[];
+  deleted: BulkOrderItemResult[];
+}
+
+/**
+ * Create, update and delete many orders in one request (one transaction)
+ * POST /orders/bulk
+ */
+export const bulkOrders = async (request: BulkOrdersRequest): Promise<BulkOrdersResponse> => {
+  try {
+    const response = await axiosInstance.post('/orders/bulk', request);
+    return response.data;
+  } catch (error: any) {
+    console.error('Error in bulk order request:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to apply bulk order changes');
+  }
+};
@@ -0,0 +1,83 @@
+// api/sync.ts
+/**
+ * Sync API Service
+ *
+ * Delta sync: GET /sync returns only what changed since the client's last
+ * call. Keep the returned cursor (e.g. in localStorage) and pass it back on
+ * the next call; without one the backend sends everything, page by page.
+ *
+ * Applying a response: remove the deleted ids first, then upsert every row
+ * by its database id. Rows may be sent more than once - that is expected.
+ */
+
+import axiosInstance from './axiosInstance';
+import type { Message } from './chats';
+
+// Orders as the backend sends them (database id + order_id, snake_case fields)
+export interface SyncOrder {
+  id: number;
+  order_id: string;
+  order_date: string;
+  updated_at: string;
+  [field: string]: any;
+}
+
+// Chats without their messages - messages are synced on their own
+export interface SyncChat {
+  id: number;
+  customer_name: string;
+  platform: 'WhatsApp' | 'Facebook' | 'Instagram';
+  status: 'read' | 'unread';
+  last_message: string | null;
+  last_message_date: string;
+  message_count: number;
+  unread_count: number;
+  last_sender: 'me' | 'them' | null;
+  first_message_at: string | null;
+  updated_at: string;
+}
+
+// Catalog items as the backend sends them (snake_case)
+export interface SyncCatalogItem {
+  id: number;
+  name: string;
+  image_url: string;
+  price: number;
+  category: string;
+  stock: number;
+  sold: number;
+  created_at: string;
+  updated_at: string;
+}
+
+export interface SyncDeletion {
+  collection: 'orders' | 'chats' | 'catalog'; // deleting a chat deletes its messages
+  id: number;
+  deleted_at: string;
+}
+
+export interface SyncResponse {
+  orders: SyncOrder[];
+  chats: SyncChat[];
+  messages: Message[];
+  catalog: SyncCatalogItem[];
+  deleted: SyncDeletion[];
+  next_cursor: string; // pass as `since` next time
+  has_more: boolean; // true: call again right away
+}
+
+/**
+ * Get everything that changed since a cursor (omit it for a full sync)
+ * GET /sync/?since=&limit=
+ */
+export const getChanges = async (since?: string | null, limit = 500): Promise<SyncResponse> => {
+  try {
+    const response = await axiosInstance.get('/sync/', {
+      params: { ...(since ? { since } : {}), limit },
+    });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error syncing changes:', error);
+    throw new Error(error.response?.data?.detail || 'Failed to sync changes');
+  }
+};
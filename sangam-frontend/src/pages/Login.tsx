@@ -115,6 +115,9 @@ const Login: React.FC = () => {
       }
 
       localStorage.setItem("token", response.data.access_token);
+      if (response.data.refresh_token) {
+        localStorage.setItem("refresh_token", response.data.refresh_token);
+      }
       console.log('💾 Token saved to localStorage');
       
       // Small delay to ensure token is saved